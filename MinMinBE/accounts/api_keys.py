@@ -0,0 +1,96 @@
+"""
+Cache of verified API keys.
+
+Checking a key costs a database lookup plus a deliberately slow password
+hash. Once a key has been verified, the SHA-256 digest of the presented
+key is remembered under its prefix in a small in-process LRU and in the
+shared cache, so later requests only compare digests. Saving or deleting
+an ``APIKey`` (e.g. revoking it) drops its entries; other worker processes
+keep their local entry for at most ``LOCAL_TTL`` seconds.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+from rest_framework_api_key.models import APIKey
+
+VERIFIED_KEY = "api_key_verified:{prefix}"
+SHARED_TTL = 60 * 5
+LOCAL_TTL = 30
+LOCAL_MAX_ENTRIES = 1024
+
+# prefix -> (digest, expires_at)
+_local = OrderedDict()
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def _digest(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _local_get(prefix):
+    with _lock:
+        entry = _local.get(prefix)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del _local[prefix]
+            return None
+        _local.move_to_end(prefix)
+        return entry[0]
+
+
+def _local_put(prefix, digest):
+    with _lock:
+        _local[prefix] = (digest, time.monotonic() + LOCAL_TTL)
+        _local.move_to_end(prefix)
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def forget_api_key(prefix):
+    """Drop the cached verification of the key with ``prefix``."""
+    with _lock:
+        _local.pop(prefix, None)
+    cache.delete(VERIFIED_KEY.format(prefix=prefix))
+
+
+def verify_api_key(api_key):
+    """Return True when ``api_key`` (``prefix.key``) is valid and not revoked."""
+    prefix, _, key = api_key.partition(".")
+    if not prefix or not key:
+        return False
+
+    digest = _digest(api_key)
+    if _local_get(prefix) == digest:
+        _stats['local_hits'] += 1
+        return True
+    if cache.get(VERIFIED_KEY.format(prefix=prefix)) == digest:
+        _stats['shared_hits'] += 1
+        _local_put(prefix, digest)
+        return True
+    _stats['misses'] += 1
+
+    try:
+        api_key_obj = APIKey.objects.get(prefix=prefix)
+    except APIKey.DoesNotExist:
+        return False
+    if not api_key_obj.is_valid(api_key) or api_key_obj.revoked:
+        return False
+
+    cache.set(VERIFIED_KEY.format(prefix=prefix), digest, SHARED_TTL)
+    _local_put(prefix, digest)
+    return True
+
+
+def api_key_cache_stats():
+    """Hit and miss counters of this process."""
+    return {
+        'local_hits': _stats['local_hits'],
+        'shared_hits': _stats['shared_hits'],
+        'misses': _stats['misses'],
+        'local_entries': len(_local),
+    }
@@ -1,5 +1,5 @@
 from rest_framework.permissions import BasePermission
-from rest_framework_api_key.models import APIKey
+from .api_keys import verify_api_key
 
 
 class IsCustomer(BasePermission):
@@ -41,16 +41,10 @@ class HasCustomAPIKey(BasePermission):
         if not api_key:
             return False
 
-        # Split the API key into prefix and key
-        prefix, _, key = api_key.partition(".")
-        if not prefix or not key:
-            return False
-
-        # Retrieve the APIKey object using the prefix
-        try:
-            api_key_obj = APIKey.objects.get(prefix=prefix)
-        except APIKey.DoesNotExist:
-            return False
-
-        # Validate the key and check if it's not revoked
-        return api_key_obj.is_valid(api_key) and not api_key_obj.revoked
+        # Verified keys are cached, and the outcome is reused when several
+        # permission checks of the same request evaluate this class
+        verified = getattr(request, '_api_key_verified', None)
+        if verified is None or verified[0] != api_key:
+            verified = (api_key, verify_api_key(api_key))
+            request._api_key_verified = verified
+        return verified[1]
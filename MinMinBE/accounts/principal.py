@@ -0,0 +1,95 @@
+"""
+Cached principal for authenticated requests.
+
+Resolving a token used to load the user row, and most views then loaded
+the user's tenant or branch lazily through ``get_user_tenant`` and
+``get_user_branch``. The principal snapshots the concrete fields of the
+user and of their branch and tenant into the shared cache for a short TTL.
+Authentication rebuilds model instances from the snapshot with those
+relations already attached, so none of these lookups hit the database.
+
+Secrets (password hash, OTP, payment keys) are never cached: they are
+left deferred on the rebuilt instances and load from the database on
+first access. Saving a deferred instance only writes its loaded fields.
+User, branch and tenant changes drop the affected principals.
+"""
+from django.core.cache import cache
+from django.db import router
+from django.db.models.fields.files import FieldFile
+
+from restaurant.branch.models import Branch
+from restaurant.tenant.models import Tenant
+from .models import User
+from .utils import get_user_branch, get_user_tenant
+
+PRINCIPAL_KEY = "auth_principal:{user_id}"
+PRINCIPAL_TTL = 60 * 2
+
+UNCACHED_FIELDS = {
+    User: {'password', 'otp', 'otp_expiry'},
+    Tenant: {'CHAPA_API_KEY', 'CHAPA_PUBLIC_KEY'},
+    Branch: set(),
+}
+
+
+def _snapshot(instance):
+    model = type(instance)
+    skipped = UNCACHED_FIELDS[model]
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.name in skipped:
+            continue
+        value = getattr(instance, field.attname)
+        values[field.attname] = value.name if isinstance(value, FieldFile) else value
+    return values
+
+
+def _restore(model, values):
+    db = router.db_for_read(model)
+    return model.from_db(db, list(values), list(values.values()))
+
+
+def build_principal(user):
+    """Compact, cacheable snapshot of ``user`` with their tenant and branch."""
+    branch = get_user_branch(user)
+    tenant = get_user_tenant(user)
+    return {
+        'user': _snapshot(user),
+        'branch': _snapshot(branch) if branch else None,
+        'tenant': _snapshot(tenant) if tenant else None,
+    }
+
+
+def principal_to_user(principal):
+    """Rebuild a ``User`` whose branch and tenant relations are preloaded."""
+    user = _restore(User, principal['user'])
+    tenant = _restore(Tenant, principal['tenant']) if principal['tenant'] else None
+    branch = _restore(Branch, principal['branch']) if principal['branch'] else None
+
+    if branch is not None:
+        if tenant is not None and branch.tenant_id == tenant.id:
+            Branch.tenant.field.set_cached_value(branch, tenant)
+        User.branch.field.set_cached_value(user, branch)
+    elif user.branch_id is None:
+        User.branch.field.set_cached_value(user, None)
+
+    if user.user_type == 'restaurant':
+        # Caches "no tenant" too, which the reverse accessor reports as missing
+        User._meta.get_field('tenants').set_cached_value(user, tenant)
+    return user
+
+
+def get_cached_user(user_id):
+    """User for ``user_id`` rebuilt from the cached principal, or None on a miss."""
+    principal = cache.get(PRINCIPAL_KEY.format(user_id=user_id))
+    return principal_to_user(principal) if principal else None
+
+
+def cache_principal(user):
+    cache.set(PRINCIPAL_KEY.format(user_id=user.pk), build_principal(user), PRINCIPAL_TTL)
+
+
+def forget_principals(*user_ids):
+    """Drop the cached principals of ``user_ids``."""
+    if user_ids:
+        cache.delete_many([PRINCIPAL_KEY.format(user_id=user_id) for user_id in user_ids])
@@ -1,12 +1,17 @@
 # accounts/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.contrib.auth.hashers import make_password
 import string
 import random
 from minminbe.settings import EMAIL_HOST_USER
+from rest_framework_api_key.models import APIKey
+from restaurant.branch.models import Branch
+from restaurant.tenant.models import Tenant
+from .api_keys import forget_api_key
 from .models import User
+from .principal import forget_principals
 
 @receiver(post_save, sender=User)
 def handle_system_user_otp_verification(sender, instance, created, **kwargs):
@@ -36,4 +41,30 @@ def handle_system_user_otp_verification(sender, instance, created, **kwargs):
         instance.is_active = is_active
         instance.otp = None
         instance.otp_expiry = None
-        instance.save()
\ No newline at end of file
+        instance.save()
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def invalidate_verified_api_key(sender, instance, **kwargs):
+    """Revoking, expiring or deleting a key must not leave it cached as valid."""
+    forget_api_key(instance.prefix)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    forget_principals(instance.pk)
+
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_branch_principals(sender, instance, **kwargs):
+    forget_principals(*User.objects.filter(branch_id=instance.pk).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_principals(sender, instance, **kwargs):
+    branch_users = User.objects.filter(branch__tenant_id=instance.pk).values_list('pk', flat=True)
+    forget_principals(instance.admin_id, *branch_users)
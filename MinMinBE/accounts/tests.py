@@ -1,3 +1,66 @@
 from django.test import TestCase
+from rest_framework_api_key.models import APIKey
 
-# Create your tests here.
+from accounts.api_keys import verify_api_key
+from accounts.models import User
+from accounts.principal import cache_principal, get_cached_user
+from accounts.utils import get_user_tenant
+from core.location import get_user_location, set_user_location, user_location
+from restaurant.tenant.models import Tenant
+
+
+class VerifiedAPIKeyCacheTest(TestCase):
+    def test_revoked_key_is_not_served_from_cache(self):
+        api_key_obj, key = APIKey.objects.create_key(name="Test API Key")
+        self.assertTrue(verify_api_key(key))
+        # Second check is answered from the cache without touching the database
+        with self.assertNumQueries(0):
+            self.assertTrue(verify_api_key(key))
+
+        api_key_obj.revoked = True
+        api_key_obj.save()
+        self.assertFalse(verify_api_key(key))
+
+    def test_malformed_key(self):
+        self.assertFalse(verify_api_key("no-separator"))
+
+
+class CachedPrincipalTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="tenant@test.com", password="password", user_type="restaurant"
+        )
+        self.tenant = Tenant.objects.create(
+            restaurant_name="Test Restaurant", profile="Profile", admin=self.user
+        )
+
+    def test_principal_resolves_tenant_without_queries(self):
+        cache_principal(self.user)
+        with self.assertNumQueries(0):
+            user = get_cached_user(self.user.pk)
+            self.assertEqual(user.user_type, "restaurant")
+            self.assertEqual(get_user_tenant(user).restaurant_name, "Test Restaurant")
+        self.assertIn("password", user.get_deferred_fields())
+
+        # Changing the tenant drops the cached principal
+        self.tenant.restaurant_name = "Renamed"
+        self.tenant.save()
+        self.assertIsNone(get_cached_user(self.user.pk))
+
+
+class UserLocationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="located@test.com", password="password", user_type="customer"
+        )
+
+    def test_location_is_stored_parsed_with_its_cell(self):
+        stored = set_user_location(self.user.pk, "9.0054", "38.7636")
+        self.assertEqual(get_user_location(self.user.pk), stored)
+        self.assertEqual(len(stored.cell), 6)
+        self.assertEqual(stored.coarse_cell(5), stored.cell[:5])
+        self.assertEqual(user_location(self.user), stored)
+
+        # Clients send "null" when location access is denied
+        self.assertIsNone(set_user_location(self.user.pk, "null", None))
+        self.assertIsNone(get_user_location(self.user.pk))
@@ -236,7 +236,7 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
-from core.redis_client import redis_client
+from core.location import set_user_location
 from django.shortcuts import get_object_or_404
 from .serializers import UserSerializer
 from .models import User
@@ -349,11 +349,8 @@ class AllUsersView(ModelViewSet):
                 {'error': 'You are not allowed to modify other users'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        user_id = user.id
-        redis_key = str(user_id)
-
-        # store location for 24 hours
-        redis_client.set(redis_key, f"{latitude},{longitude}", ex=86400)
+        # Stored parsed and snapped to its geo cell for 24 hours; missing coordinates clear it
+        set_user_location(user.id, latitude, longitude)
         serializer = self.get_serializer(user, data=request.data)
         if serializer.is_valid():
             serializer.save()
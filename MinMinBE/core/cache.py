@@ -1,7 +1,79 @@
+"""
+Shared caching helpers.
+
+Tagged keys embed the current generation of every tag they depend on, for
+example ``menu_availability_list:menu_availability@12,tenant:<id>:menu@3:...``.
+Invalidating a tag is a single ``INCR`` of its generation counter: keys
+built from the old generation are simply never read again and expire on
+their own, so writes never have to walk the keyspace. Lookups through
+``get_tagged`` count hits and misses per tag.
+"""
 from django.core.cache import cache
 from rest_framework import viewsets
 from rest_framework.response import Response
 
+from core.redis_client import redis_client
+
+TAG_VERSION_KEY = "cache_tag:{tag}"
+TAG_STATS_KEY = "cache_tag_stats:{tag}"
+
+
+def tag_versions(tags):
+    """Current generation of each tag, fetched in one round trip."""
+    if not tags:
+        return []
+    values = redis_client.mget([TAG_VERSION_KEY.format(tag=tag) for tag in tags])
+    return [int(value or 0) for value in values]
+
+
+def tagged_key(prefix, tags, *parts):
+    """Build a cache key that changes whenever any of ``tags`` is invalidated."""
+    stamp = ",".join(f"{tag}@{version}" for tag, version in zip(tags, tag_versions(tags)))
+    return ":".join([prefix, stamp, *(str(part) for part in parts)])
+
+
+def invalidate_tags(*tags):
+    """Move every tag to a new generation; O(1) per tag regardless of cached keys."""
+    tags = [tag for tag in tags if tag]
+    if not tags:
+        return
+    with redis_client.pipeline(transaction=False) as pipe:
+        for tag in tags:
+            pipe.incr(TAG_VERSION_KEY.format(tag=tag))
+        pipe.execute()
+
+
+def record_cache_lookup(tags, hit):
+    """Count a hit or miss against every tag the looked-up key depends on."""
+    field = 'hits' if hit else 'misses'
+    with redis_client.pipeline(transaction=False) as pipe:
+        for tag in tags:
+            pipe.hincrby(TAG_STATS_KEY.format(tag=tag), field, 1)
+        pipe.execute()
+
+
+def get_tagged(key, tags, default=None):
+    """``cache.get`` that records the outcome in the per-tag statistics."""
+    value = cache.get(key)
+    record_cache_lookup(tags, value is not None)
+    return default if value is None else value
+
+
+def tag_cache_stats(*tags):
+    """Hits, misses and invalidations recorded for each tag."""
+    versions = tag_versions(tags)
+    stats = {}
+    for tag, version in zip(tags, versions):
+        counters = redis_client.hgetall(TAG_STATS_KEY.format(tag=tag))
+        hits, misses = int(counters.get('hits', 0)), int(counters.get('misses', 0))
+        stats[tag] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+            'invalidations': version,
+        }
+    return stats
+
 
 class CachedModelViewSet(viewsets.ModelViewSet):
     """ModelViewSet with basic per-user response caching for GET requests."""
@@ -0,0 +1,71 @@
+"""
+Geohash cells for location-keyed caching.
+
+A customer's coordinates are snapped to the centre of their geohash cell
+so that results computed for one customer (distances, nearby lists) can be
+cached and served to everyone else in the same cell.
+"""
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precision 6 cells are roughly 1.2 km x 0.6 km
+DEFAULT_CELL_PRECISION = 6
+
+
+def geohash_encode(latitude, longitude, precision=DEFAULT_CELL_PRECISION):
+    """Geohash of the cell containing ``(latitude, longitude)``."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(cell):
+    """``(min latitude, min longitude, max latitude, max longitude)`` of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def geohash_center(cell):
+    """``(latitude, longitude)`` of the centre of a geohash cell."""
+    min_lat, min_lon, max_lat, max_lon = geohash_bounds(cell)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def parse_location(value):
+    """
+    Parse a stored ``"lat,lon"`` string. Returns ``(latitude, longitude)``
+    or None when the value is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        latitude_str, longitude_str = value.split(',')
+        if latitude_str in ('null', 'None') or longitude_str in ('null', 'None'):
+            return None
+        return float(latitude_str), float(longitude_str)
+    except (ValueError, TypeError):
+        return None
@@ -0,0 +1,90 @@
+"""
+Last known location of users.
+
+The location is stored once, already parsed and snapped to its geohash
+cell, as a small JSON document under ``user_location:<user id>``. Views
+read it through ``user_location(user)``, which memoizes it on the user
+instance of the request, so a request parses it at most once.
+
+Listings that compute distances should measure them from
+``location.cell_point`` (the centre of the cell) rather than the exact
+point: the result is then identical for every user in the cell and can be
+cached per cell instead of per user. Geohash cells nest, so coarser cells
+are prefixes of ``location.cell``.
+"""
+import json
+from dataclasses import dataclass
+
+from django.contrib.gis.geos import Point
+
+from .geo import DEFAULT_CELL_PRECISION, geohash_center, geohash_encode, parse_location
+from .redis_client import redis_client
+
+LOCATION_KEY = "user_location:{user_id}"
+LOCATION_TTL = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class UserLocation:
+    latitude: float
+    longitude: float
+    cell: str
+
+    @property
+    def point(self):
+        return Point(self.longitude, self.latitude, srid=4326)
+
+    @property
+    def cell_point(self):
+        latitude, longitude = geohash_center(self.cell)
+        return Point(longitude, latitude, srid=4326)
+
+    def coarse_cell(self, precision):
+        """The enclosing cell at a lower ``precision``."""
+        return self.cell[:precision]
+
+
+def make_location(latitude, longitude):
+    """``UserLocation`` for raw coordinates, or None when they are missing or out of range."""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return UserLocation(latitude, longitude, geohash_encode(latitude, longitude, DEFAULT_CELL_PRECISION))
+
+
+def set_user_location(user_id, latitude, longitude):
+    """Store the location of ``user_id``; invalid coordinates clear it. Returns the stored location."""
+    location = make_location(latitude, longitude)
+    if location is None:
+        clear_user_location(user_id)
+        return None
+    payload = json.dumps({'lat': location.latitude, 'lon': location.longitude, 'cell': location.cell})
+    redis_client.set(LOCATION_KEY.format(user_id=user_id), payload, ex=LOCATION_TTL)
+    return location
+
+
+def clear_user_location(user_id):
+    # The bare user id key held the location as a "lat,lon" string before this service
+    redis_client.delete(LOCATION_KEY.format(user_id=user_id), str(user_id))
+
+
+def get_user_location(user_id):
+    """Stored location of ``user_id``, or None."""
+    raw = redis_client.get(LOCATION_KEY.format(user_id=user_id))
+    if raw:
+        data = json.loads(raw)
+        return UserLocation(data['lat'], data['lon'], data['cell'])
+
+    # Locations saved before this service expire within a day
+    legacy = parse_location(redis_client.get(str(user_id)))
+    return make_location(*legacy) if legacy else None
+
+
+def user_location(user):
+    """Location of the request's ``user``, loaded once per user instance."""
+    if not hasattr(user, '_location'):
+        user._location = get_user_location(user.pk) if user.is_authenticated else None
+    return user._location
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import tag_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters and invalidation counts of tagged caches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tags", nargs="+", help="Cache tags to report, e.g. menu_availability")
+
+    def handle(self, *args, **options):
+        for tag, stats in tag_cache_stats(*options["tags"]).items():
+            ratio = "n/a" if stats["hit_ratio"] is None else f"{stats['hit_ratio']:.1%}"
+            self.stdout.write(
+                f"{tag}: hits={stats['hits']} misses={stats['misses']} "
+                f"hit_ratio={ratio} invalidations={stats['invalidations']}"
+            )
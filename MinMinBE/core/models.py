@@ -0,0 +1,60 @@
+from django.db import models
+
+# Written only by ``customer.feedback.ratings`` with queryset updates
+RATING_COLUMNS = (
+    'rating_count', 'rating_sum', 'rating_avg',
+    'service_rating_sum', 'service_rating_count',
+    'food_rating_sum', 'food_rating_count',
+    'wait_rating_sum', 'wait_rating_count',
+    'rating_histogram',
+)
+
+
+class RatingAggregate(models.Model):
+    """
+    Denormalized feedback ratings of a rated object (a menu item or a
+    tenant), maintained by ``customer.feedback.ratings``.
+    """
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    rating_avg = models.FloatField(null=True, blank=True)
+    service_rating_sum = models.PositiveIntegerField(default=0)
+    service_rating_count = models.PositiveIntegerField(default=0)
+    food_rating_sum = models.PositiveIntegerField(default=0)
+    food_rating_count = models.PositiveIntegerField(default=0)
+    wait_rating_sum = models.PositiveIntegerField(default=0)
+    wait_rating_count = models.PositiveIntegerField(default=0)
+    # Count of overall ratings per rounded star value, {"1": n, ..., "5": n}
+    rating_histogram = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # Stale in-memory ratings would overwrite the ones feedback wrote meanwhile
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in RATING_COLUMNS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def average_rating(self):
+        return round(self.rating_avg, 2) if self.rating_count and self.rating_avg is not None else None
+
+    def _dimension_average(self, dimension):
+        count = getattr(self, f'{dimension}_rating_count')
+        return round(getattr(self, f'{dimension}_rating_sum') / count, 2) if count else None
+
+    @property
+    def service_rating_avg(self):
+        return self._dimension_average('service')
+
+    @property
+    def food_rating_avg(self):
+        return self._dimension_average('food')
+
+    @property
+    def wait_rating_avg(self):
+        return self._dimension_average('wait')
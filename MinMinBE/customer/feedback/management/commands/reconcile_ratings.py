@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from customer.feedback.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored menu and tenant rating aggregates from feedback."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report aggregates that drifted without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        drifted = reconcile_ratings(dry_run=options["dry_run"])
+        prefix = "[dry run] " if options["dry_run"] else ""
+        for label, count in drifted.items():
+            self.stdout.write(f"{prefix}{label}: {count} aggregate(s) out of date")
+        self.stdout.write(self.style.SUCCESS("Rating aggregates reconciled."))
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:06
+
+from django.db import migrations
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    from customer.feedback.ratings import reconcile_ratings
+
+    reconcile_ratings(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0001_initial'),
+        ('menu', '0002_menu_rating_aggregates'),
+        ('tenant', '0003_tenant_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,152 @@
+"""
+Incremental maintenance of the rating aggregates stored on ``Menu`` and
+``Tenant`` (see ``core.models.RatingAggregate``).
+
+Each feedback contributes its overall rating, the optional service, food
+and wait ratings and one histogram bucket to the menu and the restaurant
+it refers to. Saving or deleting a feedback removes its previous
+contribution and adds the new one under a row lock, so concurrent reviews
+of the same restaurant cannot lose updates. ``reconcile_ratings``
+recomputes every aggregate from scratch and repairs any drift.
+"""
+from django.db import transaction
+from django.db.models import Count, Sum
+
+DIMENSIONS = ('service', 'food', 'wait')
+
+AGGREGATE_FIELDS = [
+    'rating_count', 'rating_sum', 'rating_avg', 'rating_histogram',
+    *[f'{d}_rating_{part}' for d in DIMENSIONS for part in ('sum', 'count')],
+]
+
+# Feedback foreign key -> rated model, as (feedback field, target model label)
+TARGETS = (('menu_id', 'menu.Menu'), ('restaurant_id', 'tenant.Tenant'))
+
+
+def histogram_bucket(overall_rating):
+    """Star bucket ("1".."5") an overall rating is counted under."""
+    return str(min(5, max(1, int(round(overall_rating)))))
+
+
+def snapshot(feedback):
+    """The parts of ``feedback`` that contribute to aggregates."""
+    return {
+        'menu_id': feedback.menu_id,
+        'restaurant_id': feedback.restaurant_id,
+        'overall_rating': feedback.overall_rating,
+        **{f'{d}_rating': getattr(feedback, f'{d}_rating') for d in DIMENSIONS},
+    }
+
+
+def _apply(row, contribution, sign):
+    row['rating_count'] += sign
+    row['rating_sum'] += sign * contribution['overall_rating']
+    histogram = dict(row['rating_histogram'] or {})
+    bucket = histogram_bucket(contribution['overall_rating'])
+    histogram[bucket] = histogram.get(bucket, 0) + sign
+    if histogram[bucket] <= 0:
+        del histogram[bucket]
+    row['rating_histogram'] = histogram
+    for dimension in DIMENSIONS:
+        value = contribution[f'{dimension}_rating']
+        if value is not None:
+            row[f'{dimension}_rating_sum'] += sign * value
+            row[f'{dimension}_rating_count'] += sign
+    if row['rating_count'] <= 0:
+        row['rating_count'], row['rating_sum'], row['rating_avg'] = 0, 0, None
+    else:
+        row['rating_avg'] = row['rating_sum'] / row['rating_count']
+
+
+def apply_feedback_change(previous=None, current=None):
+    """Move a feedback's contribution from ``previous`` to ``current`` snapshots."""
+    from django.apps import apps
+
+    changes = []
+    for field, label in TARGETS:
+        model = apps.get_model(label)
+        if previous and previous[field]:
+            changes.append((model, previous[field], previous, -1))
+        if current and current[field]:
+            changes.append((model, current[field], current, 1))
+    if not changes:
+        return
+
+    with transaction.atomic():
+        # Lock in a stable order so concurrent feedback cannot deadlock
+        for model, pk, contribution, sign in sorted(changes, key=lambda c: (c[0]._meta.label, str(c[1]), c[3])):
+            row = model.objects.select_for_update().filter(pk=pk).values(*AGGREGATE_FIELDS).first()
+            if row is None:
+                continue
+            _apply(row, contribution, sign)
+            # Plain UPDATE: rating changes must not fire the rated model's save signals
+            model.objects.filter(pk=pk).update(**row)
+
+
+def compute_aggregates(feedback_queryset, field):
+    """Aggregates of every target referenced by ``field``, computed from feedback."""
+    sums = {f'{d}_rating_sum': Sum(f'{d}_rating') for d in DIMENSIONS}
+    counts = {f'{d}_rating_count': Count(f'{d}_rating') for d in DIMENSIONS}
+    rows = (
+        feedback_queryset.filter(**{f'{field}__isnull': False})
+        .values(field)
+        .annotate(rating_count=Count('id'), rating_sum=Sum('overall_rating'), **sums, **counts)
+        .order_by()
+    )
+    aggregates = {}
+    for row in rows:
+        pk = row.pop(field)
+        row = {key: value or 0 for key, value in row.items()}
+        row['rating_avg'] = row['rating_sum'] / row['rating_count'] if row['rating_count'] else None
+        row['rating_histogram'] = {}
+        aggregates[pk] = row
+    for pk, overall_rating in feedback_queryset.filter(
+        **{f'{field}__isnull': False}
+    ).values_list(field, 'overall_rating').iterator():
+        histogram = aggregates[pk]['rating_histogram']
+        bucket = histogram_bucket(overall_rating)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return aggregates
+
+
+def empty_aggregates():
+    return {
+        **{name: 0 for name in AGGREGATE_FIELDS},
+        'rating_avg': None,
+        'rating_histogram': {},
+    }
+
+
+def reconcile_ratings(apps=None, dry_run=False):
+    """
+    Recompute the aggregates of every menu and tenant from feedback.
+    ``apps`` lets migrations pass their historical registry. Returns
+    ``{model label: number of rows that drifted}``.
+    """
+    if apps is None:
+        from django.apps import apps
+
+    feedback_model = apps.get_model('feedback', 'Feedback')
+    drifted = {}
+    for field, label in TARGETS:
+        model = apps.get_model(label)
+        expected = compute_aggregates(feedback_model.objects.all(), field)
+        changed = []
+        for current in model.objects.values('pk', *AGGREGATE_FIELDS).iterator():
+            pk = current.pop('pk')
+            target = expected.get(pk, empty_aggregates())
+            if any(_differs(current[name], target[name]) for name in AGGREGATE_FIELDS):
+                changed.append((pk, target))
+        drifted[label] = len(changed)
+        if not dry_run:
+            for pk, target in changed:
+                model.objects.filter(pk=pk).update(**target)
+    return drifted
+
+
+def _differs(stored, expected):
+    if isinstance(stored, float) or isinstance(expected, float):
+        if stored is None or expected is None:
+            return stored is not expected
+        return abs(stored - expected) > 1e-9
+    return stored != expected
@@ -1,8 +1,26 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from .models import Feedback
+from .ratings import apply_feedback_change, snapshot
 from django.core.mail import send_mail
 
+@receiver(pre_save, sender=Feedback)
+def remember_previous_ratings(sender, instance, **kwargs):
+    """Keep the stored ratings so the aggregates can drop their old contribution."""
+    previous = None
+    if not instance._state.adding:
+        stored = Feedback.objects.filter(pk=instance.pk).first()
+        previous = snapshot(stored) if stored else None
+    instance._previous_ratings = previous
+
+@receiver(post_save, sender=Feedback)
+def update_rating_aggregates(sender, instance, **kwargs):
+    apply_feedback_change(getattr(instance, '_previous_ratings', None), snapshot(instance))
+
+@receiver(post_delete, sender=Feedback)
+def remove_rating_aggregates(sender, instance, **kwargs):
+    apply_feedback_change(previous=snapshot(instance))
+
 @receiver(post_save, sender=Feedback)
 def handle_feedback_save(sender, instance, created, **kwargs):
     """
@@ -12,7 +30,7 @@ def handle_feedback_save(sender, instance, created, **kwargs):
         # New feedback created
         message = (
             f"Dear {instance.customer.full_name},\n\n"
-            f"Thank you for providing your feedback for order {instance.order.id}. "
+            f"Thank you for providing your feedback for order {instance.order_id}. "
             f"We greatly value your input.\n\n"
             f"Your Rating: {instance.overall_rating}\n"
             f"Your Message: {instance.service_rating}\n\n"
@@ -31,7 +49,7 @@ def handle_feedback_save(sender, instance, created, **kwargs):
         admin_message = (
             f"New feedback has been submitted:\n\n"
             f"Customer: {instance.customer.email}\n"
-            f"Order: {instance.order.id}\n"
+            f"Order: {instance.order_id}\n"
             f"Rating: {instance.overall_rating}\n"
             f"Message: {instance.service_rating}\n\n"
         )
@@ -45,7 +63,7 @@ def handle_feedback_save(sender, instance, created, **kwargs):
         # Feedback updated
         message = (
             f"Dear {instance.customer.full_name},\n\n"
-            f"Your feedback for order {instance.order.id} has been updated.\n\n"
+            f"Your feedback for order {instance.order_id} has been updated.\n\n"
             f"Updated Rating: {instance.overall_rating}\n"
             f"Updated Message: {instance.service_rating}\n\n"
             f"Best Regards,\nMinminbe Team"
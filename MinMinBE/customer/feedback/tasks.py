@@ -0,0 +1,16 @@
+import logging
+
+from celery import shared_task
+
+from .ratings import reconcile_ratings
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_rating_aggregates():
+    """Repair any drift between stored rating aggregates and feedback."""
+    drifted = reconcile_ratings()
+    if any(drifted.values()):
+        logger.warning("Repaired drifted rating aggregates: %s", drifted)
+    return drifted
@@ -7,6 +7,7 @@ from .models import Feedback, User, Order
 from restaurant.tenant.models import Tenant
 from restaurant.branch.models import Branch
 from restaurant.table.models import Table
+from customer.feedback.ratings import reconcile_ratings
 
 class FeedbackAPITestCase(APITestCase):
     def setUp(self):
@@ -88,3 +89,48 @@ class FeedbackAPITestCase(APITestCase):
 
 
 
+
+
+class RatingAggregateTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='rater@test.com', password='testpass', user_type='customer')
+        self.owner = User.objects.create_user(email='owner@test.com', password='testpass', user_type='customer')
+        self.tenant = Tenant.objects.create(restaurant_name='Rated Tenant', admin=self.owner)
+
+    def test_aggregates_follow_feedback_changes(self):
+        feedback = Feedback.objects.create(
+            customer=self.user, restaurant=self.tenant, service_rating=4, overall_rating=4.0
+        )
+        Feedback.objects.create(customer=self.user, restaurant=self.tenant, overall_rating=2.0)
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.rating_count, 2)
+        self.assertEqual(self.tenant.average_rating, 3.0)
+        self.assertEqual(self.tenant.service_rating_avg, 4.0)
+        self.assertEqual(self.tenant.rating_histogram, {'4': 1, '2': 1})
+
+        feedback.overall_rating = 5.0
+        feedback.save()
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.average_rating, 3.5)
+        self.assertEqual(self.tenant.rating_histogram, {'5': 1, '2': 1})
+
+        feedback.delete()
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.rating_count, 1)
+        self.assertIsNone(self.tenant.service_rating_avg)
+
+    def test_full_save_keeps_newer_ratings(self):
+        stale = Tenant.objects.get(pk=self.tenant.pk)
+        Feedback.objects.create(customer=self.user, restaurant=self.tenant, overall_rating=4.0)
+        stale.restaurant_name = 'Renamed Tenant'
+        stale.save()
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.restaurant_name, 'Renamed Tenant')
+        self.assertEqual((self.tenant.rating_count, self.tenant.average_rating), (1, 4.0))
+
+    def test_reconcile_repairs_drift(self):
+        Feedback.objects.create(customer=self.user, restaurant=self.tenant, overall_rating=3.0)
+        Tenant.objects.filter(pk=self.tenant.pk).update(rating_count=0, rating_sum=0, rating_avg=None)
+        self.assertEqual(reconcile_ratings()['tenant.Tenant'], 1)
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.average_rating, 3.0)
@@ -1,4 +1,10 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, OutboxMessage
 
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(Notification)
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('kind', 'status')
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0002_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='notif_customer_created_idx'),
+        ),
+    ]
@@ -17,5 +17,57 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's notifications, see ``core.pagination``
+            models.Index(fields=['customer', '-created_at', '-id'], name='notif_customer_created_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.message}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Side effect (email, in-app notification or channel-layer event) recorded
+    in the same transaction as the change that caused it and delivered later
+    by ``customer.notification.tasks.dispatch_notification_outbox``.
+    """
+    KIND_EMAIL = 'email'
+    KIND_NOTIFICATION = 'notification'
+    KIND_CHANNEL = 'channel'
+    KIND_CHOICES = [
+        (KIND_EMAIL, 'Email'),
+        (KIND_NOTIFICATION, 'Notification'),
+        (KIND_CHANNEL, 'Channel'),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When a dispatcher took the message for delivery
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'notification_outbox'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='notif_outbox_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
@@ -0,0 +1,56 @@
+"""
+Helpers for recording side effects in the notification outbox.
+
+Signal handlers build messages with ``email``, ``notification`` and
+``group_message`` and hand them to ``enqueue``. The rows are written in the
+caller's transaction and a dispatch task is scheduled once it commits, so
+request threads never wait on SMTP or the channel layer.
+"""
+from django.db import transaction
+
+from .models import OutboxMessage
+
+
+def email(subject, message, recipients, from_email=None):
+    """Build an email message; returns None when there is nobody to send to."""
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        return None
+    return OutboxMessage(kind=OutboxMessage.KIND_EMAIL, payload={
+        'subject': subject,
+        'message': message,
+        'from_email': from_email,
+        'recipients': recipients,
+    })
+
+
+def notification(customer, message, notification_type):
+    """Build an in-app ``Notification``; ``customer`` may be None for system notices."""
+    return OutboxMessage(kind=OutboxMessage.KIND_NOTIFICATION, payload={
+        'customer_id': str(customer.pk) if customer else None,
+        'message': message,
+        'notification_type': notification_type,
+    })
+
+
+def group_message(group, event):
+    """Build a channel-layer ``group_send`` of ``event`` to ``group``."""
+    return OutboxMessage(kind=OutboxMessage.KIND_CHANNEL, payload={
+        'group': str(group),
+        'event': event,
+    })
+
+
+def _schedule_dispatch():
+    from .tasks import dispatch_notification_outbox
+    dispatch_notification_outbox.delay()
+
+
+def enqueue(*messages):
+    """Persist ``messages`` and dispatch them once the current transaction commits."""
+    messages = [m for m in messages if m is not None]
+    if not messages:
+        return []
+    OutboxMessage.objects.bulk_create(messages)
+    transaction.on_commit(_schedule_dispatch)
+    return messages
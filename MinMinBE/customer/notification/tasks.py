@@ -0,0 +1,159 @@
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_MAX_ATTEMPTS = 5
+# Claimed messages still unsettled after this long (e.g. the worker died) are delivered again
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception as exc:
+        logger.warning("Closing the SMTP connection failed: %s", exc)
+
+
+def _send_emails(messages):
+    """
+    Send the emails of the batch one by one over a shared SMTP connection,
+    reconnecting after a failure. Returns ``{message id: error}``.
+    """
+    connection = get_connection()
+    errors = {}
+    try:
+        for m in messages:
+            email = EmailMessage(
+                subject=m.payload['subject'],
+                body=m.payload['message'],
+                from_email=m.payload.get('from_email') or settings.EMAIL_HOST_USER,
+                to=m.payload['recipients'],
+                connection=connection,
+            )
+            try:
+                if not connection.send_messages([email]):
+                    errors[m.pk] = "Email was not accepted for delivery"
+            except Exception as exc:
+                errors[m.pk] = str(exc)
+                # The next message opens a fresh connection
+                _close_quietly(connection)
+    finally:
+        _close_quietly(connection)
+    return errors
+
+
+def _create_notifications(messages):
+    # One insert: the batch is created or fails as a whole
+    with transaction.atomic():
+        Notification.objects.bulk_create([
+            Notification(
+                customer_id=m.payload.get('customer_id'),
+                message=m.payload['message'],
+                notification_type=m.payload['notification_type'],
+            )
+            for m in messages
+        ])
+    return {}
+
+
+def _fan_out(messages):
+    channel_layer = get_channel_layer()
+    errors = {}
+
+    async def send_all():
+        for m in messages:
+            try:
+                await channel_layer.group_send(m.payload['group'], m.payload['event'])
+            except Exception as exc:
+                errors[m.pk] = str(exc)
+
+    async_to_sync(send_all)()
+    return errors
+
+
+# Each handler delivers its messages and returns ``{message id: error}`` of
+# those that failed; raising fails all of them
+HANDLERS = {
+    OutboxMessage.KIND_EMAIL: _send_emails,
+    OutboxMessage.KIND_NOTIFICATION: _create_notifications,
+    OutboxMessage.KIND_CHANNEL: _fan_out,
+}
+
+
+def _claim(batch_size):
+    """Mark the next pending (or abandoned) messages as being sent, in a short transaction."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboxMessage.STATUS_PENDING)
+                | Q(status=OutboxMessage.STATUS_SENDING, claimed_at__lt=now - OUTBOX_CLAIM_TIMEOUT)
+            )
+            .order_by('created_at')[:batch_size]
+        )
+        OutboxMessage.objects.filter(pk__in=[m.pk for m in batch]).update(
+            status=OutboxMessage.STATUS_SENDING, claimed_at=now,
+        )
+    return batch
+
+
+@shared_task
+def dispatch_notification_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Deliver pending outbox messages in batches, grouped by kind. Messages
+    are claimed in a short transaction and delivered outside it, and each
+    one is settled on its own: failures are retried on the next run until
+    ``OUTBOX_MAX_ATTEMPTS`` without resending the rest of their batch.
+    Returns the number of messages delivered.
+    """
+    delivered = 0
+    while True:
+        batch = _claim(batch_size)
+        if not batch:
+            return delivered
+
+        for kind, handler in HANDLERS.items():
+            messages = [m for m in batch if m.kind == kind]
+            if not messages:
+                continue
+            try:
+                errors = handler(messages)
+            except Exception as exc:
+                errors = {m.pk: str(exc) for m in messages}
+            if errors:
+                logger.error("Outbox delivery of %d of %d %s message(s) failed", len(errors), len(messages), kind)
+
+            now = timezone.now()
+            for m in messages:
+                if m.pk in errors:
+                    m.attempts += 1
+                    m.last_error = errors[m.pk]
+                    if m.attempts >= OUTBOX_MAX_ATTEMPTS:
+                        m.status = OutboxMessage.STATUS_FAILED
+                        m.processed_at = now
+                    else:
+                        m.status = OutboxMessage.STATUS_PENDING
+                else:
+                    delivered += 1
+                    m.status = OutboxMessage.STATUS_SENT
+                    m.processed_at = now
+
+        OutboxMessage.objects.bulk_update(batch, ['status', 'attempts', 'last_error', 'processed_at'])
+
+        # Anything left pending failed this round; leave it for the next run
+        if len(batch) < batch_size or any(m.status == OutboxMessage.STATUS_PENDING for m in batch):
+            return delivered
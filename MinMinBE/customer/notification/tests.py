@@ -1,10 +1,14 @@
-from django.test import TestCase
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import SimpleTestCase, TestCase, override_settings
 from rest_framework.test import APIClient
 from rest_framework_api_key.models import APIKey
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 from accounts.models import User
-from customer.notification.models import Notification
+from customer.notification import outbox
+from customer.notification.models import Notification, OutboxMessage
+from customer.notification.tasks import dispatch_notification_outbox
 
 class NotificationViewSetTest(TestCase):
 
@@ -79,3 +83,44 @@ class NotificationViewSetTest(TestCase):
         response = self.client.get('/api/v1/notification/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+
+class OutboxMessageBuilderTest(SimpleTestCase):
+
+    def test_email_without_recipients_is_skipped(self):
+        self.assertIsNone(outbox.email("Subject", "Body", [None, ""]))
+
+    def test_group_message_payload(self):
+        message = outbox.group_message(123, {'type': 'send_user_notification'})
+        self.assertEqual(message.kind, OutboxMessage.KIND_CHANNEL)
+        self.assertEqual(message.payload, {'group': '123', 'event': {'type': 'send_user_notification'}})
+
+
+class RejectingEmailBackend(EmailBackend):
+    """Locmem backend that refuses mail to ``bad@test.com``."""
+
+    def send_messages(self, messages):
+        if any('bad@test.com' in message.to for message in messages):
+            raise ConnectionError("Recipient refused")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='customer.notification.tests.RejectingEmailBackend')
+class OutboxDispatchTest(TestCase):
+
+    def test_failed_email_does_not_resend_its_batch(self):
+        good = outbox.email("Subject", "Body", ["good@test.com"])
+        bad = outbox.email("Subject", "Body", ["bad@test.com"])
+        OutboxMessage.objects.bulk_create([good, bad])
+
+        self.assertEqual(dispatch_notification_outbox(), 1)
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual(good.status, OutboxMessage.STATUS_SENT)
+        self.assertEqual((bad.status, bad.attempts), (OutboxMessage.STATUS_PENDING, 1))
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Only the failed email is retried
+        self.assertEqual(dispatch_notification_outbox(), 0)
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 2)
+        self.assertEqual(len(mail.outbox), 1)
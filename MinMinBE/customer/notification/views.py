@@ -2,14 +2,15 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from core.pagination import KeysetPagination
 
 from .serializers import NotificationSerializer
 from .models import Notification
 from accounts.permissions import IsAdminOrCustomer
 
-class NotificationPagination(PageNumberPagination):
+class NotificationPagination(KeysetPagination):
     page_size = 10
+    ordering = ('-created_at', '-id')
     page_size_query_param = 'page_size'
     max_page_size = 50
 
@@ -26,7 +27,7 @@ class NotificationViewSet(ModelViewSet):
             notifications = Notification.objects.all()
         else:
             notifications = user.notifications.all()
-        return notifications
+        return notifications.order_by('-created_at', '-id')
 
     def list(self, request, *args, **kwargs):
         # Get the base queryset
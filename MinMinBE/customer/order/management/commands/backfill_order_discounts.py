@@ -0,0 +1,61 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from customer.order.models import Order, OrderDiscount
+from customer.order.utils import build_order_discount
+
+
+class Command(BaseCommand):
+    """
+    Orders are evaluated as of their ``created_at``, so discounts and coupons
+    are checked for validity at placement time, and free items are drawn
+    with a generator seeded by the order id, so reruns freeze the same
+    result. Only today's discount configuration is known: discounts edited
+    or deleted since an order was placed are applied as they are now.
+    """
+    help = "Freeze a discount record onto orders placed before discounts were persisted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of orders evaluated per batch",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the orders that would be backfilled without writing",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pending = Order.objects.filter(applied_discount__isnull=True)
+
+        if options["dry_run"]:
+            self.stdout.write(f"[dry run] {pending.count()} order(s) have no frozen discount.")
+            return
+
+        created = 0
+        orders = pending.select_related("coupon").prefetch_related("items").order_by("created_at")
+        batch = []
+        for order in orders.iterator(chunk_size=batch_size):
+            items_data = [{
+                "menu_item": str(item.menu_item_id),
+                "quantity": item.quantity,
+                "price": float(item.price),
+            } for item in order.items.all()]
+            coupon = order.coupon.discount_code if order.coupon else None
+            # No customer: the coupon usage recorded for this very order must not disqualify it
+            batch.append(build_order_discount(
+                order, items_data, order.total_amount, coupon=coupon,
+                now=order.created_at, rng=random.Random(str(order.pk)),
+            ))
+            if len(batch) >= batch_size:
+                created += len(OrderDiscount.objects.bulk_create(batch, ignore_conflicts=True))
+                batch = []
+        if batch:
+            created += len(OrderDiscount.objects.bulk_create(batch, ignore_conflicts=True))
+
+        self.stdout.write(self.style.SUCCESS(f"Frozen discounts created: {created}"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from customer.order.models import Order, OrderSequence
+from customer.order.sequences import highest_issued_sequence
+from restaurant.branch.models import Branch
+
+
+class Command(BaseCommand):
+    help = "Backfill per-branch order sequences and move any that lag behind issued order ids forward."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without writing",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        created = advanced = 0
+
+        for branch_id in Branch.objects.values_list("id", flat=True).iterator():
+            highest = highest_issued_sequence(branch_id)
+            with transaction.atomic():
+                sequence = OrderSequence.objects.select_for_update().filter(branch_id=branch_id).first()
+                if sequence is None:
+                    created += 1
+                    if not dry_run:
+                        OrderSequence.objects.create(branch_id=branch_id, last_value=highest)
+                elif sequence.last_value < highest:
+                    advanced += 1
+                    self.stdout.write(f"Branch {branch_id}: {sequence.last_value} -> {highest}")
+                    if not dry_run:
+                        sequence.last_value = highest
+                        sequence.save(update_fields=["last_value", "updated_at"])
+
+        duplicates = (
+            Order.objects.values("branch_id", "order_id")
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+            .count()
+        )
+        if duplicates:
+            self.stdout.write(self.style.WARNING(f"{duplicates} order id(s) are shared by more than one order in a branch."))
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}Sequences created: {created}, advanced: {advanced}"))
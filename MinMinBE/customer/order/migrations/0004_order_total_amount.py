@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_amount(apps, schema_editor):
+    Order = apps.get_model('order', 'Order')
+    OrderItem = apps.get_model('order', 'OrderItem')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    totals = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(value=Sum(ExpressionWrapper(F('price') * F('quantity'), output_field=money)))
+        .values('value')
+    )
+    Order.objects.update(total_amount=Coalesce(Subquery(totals, output_field=money), 0, output_field=money))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0003_ordersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_total_amount, migrations.RunPython.noop),
+    ]
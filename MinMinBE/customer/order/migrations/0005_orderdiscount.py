@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:30
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0004_order_total_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDiscount',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('discount_type', models.CharField(blank=True, max_length=30, null=True)),
+                ('free_items', models.JSONField(default=list)),
+                ('coupon_code', models.CharField(blank=True, max_length=255, null=True)),
+                ('plan_version', models.CharField(blank=True, max_length=64, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='applied_discount', to='order.order')),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0005_orderdiscount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-updated_at', '-id'], name='order_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', '-updated_at', '-id'], name='order_customer_updated_idx'),
+        ),
+    ]
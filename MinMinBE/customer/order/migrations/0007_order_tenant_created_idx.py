@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['tenant', 'created_at', 'id'], name='order_tenant_created_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
 from restaurant.tenant.models import Tenant
 from restaurant.branch.models import Branch
@@ -7,6 +9,34 @@ from restaurant.menu.models import Menu
 from accounts.models import User
 import uuid
 
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _order_items_sum(expression, output_field):
+    """Correlated per-order SUM over order items, without joining the outer query."""
+    items = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(value=Sum(expression, output_field=output_field))
+        .values('value')
+    )
+    return Coalesce(Subquery(items, output_field=output_field), 0, output_field=output_field)
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate ``total_price``, ``item_count`` and ``discount_total``
+        computed in SQL, so listings never iterate items in Python.
+        """
+        return self.annotate(
+            total_price=_order_items_sum(ExpressionWrapper(F('price') * F('quantity'), output_field=MONEY), MONEY),
+            item_count=_order_items_sum(F('quantity'), IntegerField()),
+            discount_total=Coalesce(F('applied_discount__amount'), 0, output_field=MONEY),
+        )
+
+
 class Order(models.Model):
     id = models.UUIDField(
         primary_key=True,  # Set as primary key
@@ -33,9 +63,13 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     )
     status = models.CharField(max_length=30, choices=STATUS_TYPE_CHOICES, default='placed')
+    # Denormalized sum of item price * quantity, kept in sync by ``refresh_total``
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         # Generate the order_id only if it matches the default value or is empty
         if self.order_id == "TEMP-ORDER-ID":  
@@ -43,8 +77,9 @@ class Order(models.Model):
             tenant_prefix = self.tenant.restaurant_name[:5].upper().ljust(5, 'X')  # Pad with 'X' if less than 5 characters
             branch_prefix = self.branch.address[:5].upper().replace(" ", "").ljust(5, 'X')  # Pad with 'X' if less than 5 characters
             
-            # Generate a unique sequence number for the branch
-            sequence = Order.objects.filter(branch=self.branch).count() + 1
+            # Allocate the next sequence number for the branch
+            from .sequences import allocate_order_sequence
+            sequence = allocate_order_sequence(self.branch_id)
             
             # Combine into the final order_id
             self.order_id = f"{tenant_prefix}-{branch_prefix}-{sequence:04d}"
@@ -52,7 +87,17 @@ class Order(models.Model):
         super().save(*args, **kwargs)
 
     def calculate_total(self):
-        return sum(item.get_total_price() for item in self.items.all())
+        # Prefer the SQL annotation from ``with_totals`` over the stored column
+        total = getattr(self, 'total_price', None)
+        return total if total is not None else self.total_amount
+
+    def refresh_total(self):
+        """Recompute ``total_amount`` from the order items in a single UPDATE."""
+        Order.objects.filter(pk=self.pk).update(
+            total_amount=_order_items_sum(ExpressionWrapper(F('price') * F('quantity'), output_field=MONEY), MONEY)
+        )
+        self.total_amount = Order.objects.filter(pk=self.pk).values_list('total_amount', flat=True).first() or 0
+        return self.total_amount
 
     def delete(self, using=None, keep_parents=False):
         if self.payments.exists():
@@ -61,10 +106,40 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of order lists, see ``core.pagination``
+            models.Index(fields=['-updated_at', '-id'], name='order_updated_id_idx'),
+            models.Index(fields=['customer', '-updated_at', '-id'], name='order_customer_updated_idx'),
+            # Incremental scans of new orders, see ``restaurant.related_menu.recommendations``
+            models.Index(fields=['tenant', 'created_at', 'id'], name='order_tenant_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_id} - {self.status}"
     
+class OrderSequence(models.Model):
+    """Last order number handed out for a branch; allocated under a row lock."""
+    branch = models.OneToOneField(Branch, on_delete=models.CASCADE, primary_key=True, related_name='order_sequence')
+    last_value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.branch_id}: {self.last_value}"
+
+class OrderDiscount(models.Model):
+    """Discount result frozen onto an order when it is placed."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='applied_discount')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_type = models.CharField(max_length=30, null=True, blank=True)
+    free_items = models.JSONField(default=list)
+    coupon_code = models.CharField(max_length=255, null=True, blank=True)
+    plan_version = models.CharField(max_length=64, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.order_id}: {self.amount} ({self.discount_type})"
+
 class OrderItem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
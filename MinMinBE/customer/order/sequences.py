@@ -0,0 +1,44 @@
+"""Per-branch order number allocation.
+
+Each branch owns one ``OrderSequence`` row. Allocating a number locks that
+row, increments it and returns the new value, so the cost no longer grows
+with branch history and concurrent checkouts never get the same number.
+"""
+from django.db import IntegrityError, transaction
+
+from .models import Order, OrderSequence
+
+
+def parse_order_sequence(order_id):
+    """Return the numeric suffix of an order id such as ``ABCDE-MAINS-0042``."""
+    _, _, suffix = (order_id or '').rpartition('-')
+    return int(suffix) if suffix.isdigit() else 0
+
+
+def highest_issued_sequence(branch_id):
+    """Highest sequence already present on the branch's orders."""
+    order_ids = Order.objects.filter(branch_id=branch_id).values_list('order_id', flat=True)
+    return max((parse_order_sequence(order_id) for order_id in order_ids), default=0)
+
+
+def _locked_sequence(branch_id):
+    try:
+        return OrderSequence.objects.select_for_update().get(branch_id=branch_id)
+    except OrderSequence.DoesNotExist:
+        pass
+    # First allocation for this branch: continue from the orders it already has
+    try:
+        with transaction.atomic():
+            OrderSequence.objects.create(branch_id=branch_id, last_value=highest_issued_sequence(branch_id))
+    except IntegrityError:
+        pass  # created concurrently
+    return OrderSequence.objects.select_for_update().get(branch_id=branch_id)
+
+
+def allocate_order_sequence(branch_id):
+    """Reserve and return the next order sequence number for ``branch_id``."""
+    with transaction.atomic():
+        sequence = _locked_sequence(branch_id)
+        sequence.last_value += 1
+        sequence.save(update_fields=['last_value', 'updated_at'])
+        return sequence.last_value
@@ -1,18 +1,35 @@
+import uuid
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
-from .utils import calculate_discount
+from .utils import calculate_discount, build_order_discount
 
 from .models import Order, OrderItem
 from restaurant.table.models import Table
 from restaurant.table.serializers import TableSerializer
 from restaurant.branch.models import Branch
+from restaurant.menu.models import Menu
+from restaurant.menu.pricing import price_line_items
 from accounts.models import User
 
+class MenuItemIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Accepts a menu item id without fetching the row; ``OrderSerializer.create``
+    resolves every line of the order (and its price) in one query.
+    """
+    def to_internal_value(self, data):
+        try:
+            return uuid.UUID(str(data))
+        except (TypeError, ValueError, AttributeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
 class OrderItemSerializer(serializers.ModelSerializer):
+    menu_item = MenuItemIdField(queryset=Menu.objects.all())
     menu_item_name = serializers.SerializerMethodField()
     menu_item_image = serializers.SerializerMethodField()
     class Meta:
         model = OrderItem
         fields = ['id', 'menu_item', 'menu_item_name','menu_item_image', 'quantity', 'price','remarks']
+        extra_kwargs = {'price': {'required': False}}
     def get_menu_item_name(self, obj):
         return obj.menu_item.name
     
@@ -41,7 +58,11 @@ class OrderSerializer(serializers.ModelSerializer):
         return obj.calculate_total()
     
     def get_discount_amount(self, obj):
-        return calculate_discount(obj)[0]
+        # Orders placed before discounts were frozen fall back to a live evaluation
+        try:
+            return obj.applied_discount.amount
+        except ObjectDoesNotExist:
+            return calculate_discount(obj)[0]
 
     def create(self, validated_data):
         """Handle automatic table assignment during order creation."""
@@ -53,6 +74,10 @@ class OrderSerializer(serializers.ModelSerializer):
         customer_phone = validated_data.get('customer_phone')
         customer_tinNo = validated_data.get('customer_tinNo')
         discount_code = validated_data.get('discount_code')
+        try:
+            line_items = price_line_items(items_data, tenant=branch.tenant_id)
+        except Menu.DoesNotExist as exc:
+            raise serializers.ValidationError({'items': str(exc)})
         customer = self.context['request'].user
         if customer.user_type != 'customer':
             new_user,created = User.objects.get_or_create(
@@ -95,12 +120,28 @@ class OrderSerializer(serializers.ModelSerializer):
             coupon=coupon
         )
 
-        # Create order items
-        for item_data in items_data:
-            OrderItem.objects.create(
+        # Create order items with the menu prices at the time of ordering
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
-                **item_data
+                menu_item_id=line.menu_item,
+                quantity=line.quantity,
+                price=line.price,
+                remarks=line.remarks,
             )
+            for line in line_items
+        ])
+        # bulk_create skips the item signals, so sync the stored total here
+        order.refresh_total()
+
+        # Freeze the discount the customer was quoted for this order
+        build_order_discount(
+            order,
+            [line.as_discount_item() for line in line_items],
+            order.total_amount,
+            coupon=discount_code,
+            customer=customer,
+        ).save()
 
         return order
 
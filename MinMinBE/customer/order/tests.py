@@ -1,9 +1,18 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils import timezone
 from rest_framework.test import APIClient,APITestCase
 from rest_framework import status
 from rest_framework_api_key.models import APIKey
 from accounts.models import User
-from .models import Order, Tenant, Branch, Table, OrderItem, Menu
+from .models import Order, OrderDiscount, Tenant, Branch, Table, OrderItem, Menu
+from restaurant.discount.engine import get_discount_plan
+from restaurant.discount.models import Discount, DiscountRule
 from rest_framework_simplejwt.tokens import RefreshToken
+from .sequences import parse_order_sequence
 
 class OrderViewSetTest(APITestCase):
 
@@ -168,3 +177,39 @@ class OrderViewSetTest(APITestCase):
         # Attempt to get an order with an invalid ID
         response = self.client.get('/api/v1/orders/invalid-id/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_total_amount_follows_item_writes(self):
+        item = OrderItem.objects.create(order=self.order, menu_item=self.menuItem, quantity=2, price=10.00)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, 20)
+        annotated = Order.objects.with_totals().get(pk=self.order.pk)
+        self.assertEqual(annotated.total_price, 20)
+        self.assertEqual(annotated.item_count, 2)
+        item.delete()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, 0)
+
+    def test_backfill_evaluates_orders_as_of_placement(self):
+        placed = timezone.now() - timedelta(days=30)
+        discount = Discount.objects.create(tenant=self.tenant, type='volume')
+        DiscountRule.objects.create(tenant=self.tenant, discount_id=discount, min_items=1, max_discount_amount=5)
+        # The discount ran for a week around the order and has since expired
+        Discount.objects.filter(pk=discount.pk).update(
+            valid_from=placed - timedelta(days=1), valid_until=placed + timedelta(days=6)
+        )
+        OrderItem.objects.create(order=self.order, menu_item=self.menuItem, quantity=2, price=10.00)
+        Order.objects.filter(pk=self.order.pk).update(created_at=placed)
+
+        call_command('backfill_order_discounts', stdout=StringIO())
+        frozen = OrderDiscount.objects.get(order=self.order)
+        self.assertEqual((frozen.amount, frozen.discount_type), (Decimal('5.00'), 'volume'))
+        self.assertEqual(frozen.plan_version, get_discount_plan(self.tenant.id)['version'])
+
+
+class OrderSequenceParsingTest(SimpleTestCase):
+
+    def test_parse_order_sequence(self):
+        self.assertEqual(parse_order_sequence("TESTT-123MA-0042"), 42)
+        self.assertEqual(parse_order_sequence("TEMP-ORDER-ID"), 0)
+        self.assertEqual(parse_order_sequence(None), 0)
@@ -1,8 +1,6 @@
-from rest_framework.pagination import PageNumberPagination
+from core.pagination import KeysetPagination
 from rest_framework import viewsets,filters
 from rest_framework.decorators import action
-from django.db.models import Q, F, Sum, DecimalField, ExpressionWrapper
-from django.db.models.functions import Coalesce
 from accounts.permissions import HasCustomAPIKey
 from accounts.utils import get_user_branch, get_user_tenant
 from django.core.exceptions import ValidationError
@@ -13,7 +11,6 @@ from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.gis.db.models.functions import Distance
-from django.contrib.gis.geos import Point
 from .models import Order
 from .serializers import OrderSerializer
 from .orderFilter import OrderFilter
@@ -21,12 +18,14 @@ from restaurant.table.models import Table
 from restaurant.table.serializers import TableSerializer
 from restaurant.branch.models import Branch
 from restaurant.menu.models import Menu
-from core.redis_client import redis_client
+from restaurant.menu.pricing import price_line_items
+from core.location import user_location
 from .utils import calculate_discount_from_data, calculate_redeem_amount
 
 
-class OrderPagination(PageNumberPagination):
+class OrderPagination(KeysetPagination):
     page_size = 10
+    ordering = ('-updated_at', '-id')
     page_size_query_param = 'page_size'
     max_page_size = 50
 
@@ -39,39 +38,23 @@ class OrderView(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        user_location = redis_client.get(str(user.id))
         if user.user_type == 'customer':
             qs = Order.objects.filter(customer=user,status__in=['placed', 'progress', 'payment_complete', 'delivered', 'cancelled']).select_related(
-                    'table', 'customer', 'branch', 'tenant'
-            ).prefetch_related('items').order_by('-updated_at')
-            if user_location:
-                latitude_str, longitude_str = user_location.split(',')
-                if latitude_str not in ('null', 'None') and longitude_str not in ('null', 'None'):
-                    latitude = float(latitude_str)
-                    longitude = float(longitude_str)
-                    user_location = Point(longitude, latitude, srid=4326)
-                    qs =  qs.annotate(distance=Distance('branch__location', user_location))
+                    'table', 'customer', 'branch', 'tenant', 'applied_discount'
+            ).prefetch_related('items').with_totals().order_by('-updated_at', '-id')
+            location = user_location(user)
+            if location:
+                qs = qs.annotate(distance=Distance('branch__location', location.point))
             return qs
         
-        total_price_expression = Coalesce(
-            Sum(
-                ExpressionWrapper(
-                    F('items__price') * F('items__quantity'),
-                    output_field=DecimalField(max_digits=12, decimal_places=2)
-                )
-            ),
-            0,
-            output_field=DecimalField(max_digits=12, decimal_places=2),
-        )
-
         queryset = (
             Order.objects.filter(
                 status__in=['placed', 'progress', 'payment_complete', 'delivered', 'cancelled']
             )
-            .select_related('table', 'customer', 'branch', 'tenant')
+            .select_related('table', 'customer', 'branch', 'tenant', 'applied_discount')
             .prefetch_related('items')
-            .annotate(total_price=total_price_expression)
-            .order_by('-updated_at')
+            .with_totals()
+            .order_by('-updated_at', '-id')
         )
 
         if user.user_type == 'admin':
@@ -171,34 +154,21 @@ class OrderView(viewsets.ModelViewSet):
         discountApplied = request.data.get('discountApplied')
 
         # Validate branch
-        try:
-            Branch.objects.get(id=branch_id)
-        except Branch.DoesNotExist:
+        if not Branch.objects.filter(id=branch_id).exists():
             return Response({'error': 'Branch not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Validate items and fetch current prices
-        valid_items = []
+        # Validate items and fetch current prices in a single lookup
         for item in items_data:
-            menu_item = item.get('menu_item')
-            quantity = item.get('quantity')
-            if not (menu_item and quantity):
+            if not (item.get('menu_item') and item.get('quantity')):
                 return Response({'error': 'Each item must have menu_item and quantity'}, status=status.HTTP_400_BAD_REQUEST)
-            try:
-
-                menu_item = Menu.objects.get(id=menu_item)
-            except Menu.DoesNotExist:
-                return Response({'error': f'Menu item {menu_item} not found'}, status=status.HTTP_400_BAD_REQUEST)
-            valid_items.append({
-                'menu_item': str(menu_item.id),
-                'quantity': quantity,
-                'price': float(menu_item.price)
-            })
+        try:
+            line_items = price_line_items(items_data, tenant=tenant)
+        except Menu.DoesNotExist as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        valid_items = [line.as_discount_item() for line in line_items]
 
         # Calculate order total
-        order_total = sum(
-            Menu.objects.get(id=item['menu_item']).price * item['quantity']
-            for item in valid_items
-        )
+        order_total = sum(line.total for line in line_items)
 
         # Calculate discount
         discount_amount,typeDiscount,freeItems = calculate_discount_from_data(
@@ -1,16 +1,14 @@
 from django.db.models.signals import post_save, post_delete
 from minminbe.settings import EMAIL_HOST_USER
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from .models import Payment
-from customer.notification.models import Notification
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from customer.notification import outbox
 
 @receiver(post_save, sender=Payment)
 def handle_payment_save(sender, instance, created, **kwargs):
     """
     Signal triggered when a Payment is created or updated.
+    Notifications are recorded in the outbox and delivered asynchronously.
     """
     if created:
         # Notify the customer when a payment is initiated
@@ -24,18 +22,19 @@ def handle_payment_save(sender, instance, created, **kwargs):
             f"Thank you for your payment!\n"
             f"Best Regards,\nMinminbe Team"
         )
-        send_mail(
-            "Payment Initiated",
-            message,
-            EMAIL_HOST_USER,
-            [customer_email]
-        )
-        
-        # Create an in-app notification
-        Notification.objects.create(
-            customer=instance.order.customer,
-            message=f"Payment of ${instance.amount_paid} for Order ID {instance.order.id} is initiated.",
-            notification_type="Payment Created"
+        outbox.enqueue(
+            outbox.email(
+                "Payment Initiated",
+                message,
+                [customer_email],
+                EMAIL_HOST_USER,
+            ),
+            # Create an in-app notification
+            outbox.notification(
+                instance.order.customer,
+                f"Payment of ${instance.amount_paid} for Order ID {instance.order.id} is initiated.",
+                "Payment Created",
+            ),
         )
 
     else:
@@ -48,30 +47,25 @@ def handle_payment_save(sender, instance, created, **kwargs):
                 f"Thank you for your business!\n\n"
                 f"Best Regards,\nMinminbe Team"
             )
-            channel_layer = get_channel_layer()
-            group_name = str(instance.order.tenant.id)  # Specific branch group
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
+            group_name = str(instance.order.tenant_id)  # Specific branch group
+            user_group = f'{instance.order.customer_id}'
+            group_messages = [
+                outbox.group_message(group_name, {
                     "type": "send_restaurant_notification",
                     "message": {
                         "type": "Payment Completed",
-                        "branch": str(instance.order.branch.id),
+                        "branch": str(instance.order.branch_id),
                         "message": f"Payment of ${instance.amount_paid} for Order ID {instance.order.id} has been completed successfully."
                     }
-                }
-            )
-            user_group = f'{instance.order.customer.id}'
-            async_to_sync(channel_layer.group_send)(
-                user_group,
-                {
+                }),
+                outbox.group_message(user_group, {
                     "type": "send_user_notification",
                     "message": {
                         "type": "Payment Completed",
                         "message": f"Payment of ${instance.amount_paid} for Order ID {instance.order.id} has been completed successfully."
                     }
-                }
-            )
+                }),
+            ]
         elif instance.payment_status == 'failed':
             status_message = (
                 f"Dear {instance.order.customer.email},\n\n"
@@ -79,51 +73,49 @@ def handle_payment_save(sender, instance, created, **kwargs):
                 f"Please try again or contact support for assistance.\n\n"
                 f"Best Regards,\nMinminbe Team"
             )
-            channel_layer = get_channel_layer()
-            group_name = str(instance.order.tenant.id)  # Specific branch group
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
+            group_name = str(instance.order.tenant_id)  # Specific branch group
+            user_group = f'{instance.order.customer_id}'
+            group_messages = [
+                outbox.group_message(group_name, {
                     "type": "send_restaurant_notification",
                     "message": {
                         "type": "Payment Failed",
-                        "branch": str(instance.order.branch.id),
+                        "branch": str(instance.order.branch_id),
                         "message": f"Payment of ${instance.amount_paid} for Order ID {instance.order.id} has failed."
                     }
-                }
-            )
-            user_group = f'{instance.order.customer.id}'
-            async_to_sync(channel_layer.group_send)(
-                user_group,
-                {
+                }),
+                outbox.group_message(user_group, {
                     "type": "send_user_notification",
                     "message": {
                         "type": "Payment Failed",
                         "message": f"Payment of ${instance.amount_paid} for Order ID {instance.order.id} has failed."
                     }
-                }
-            )
+                }),
+            ]
         else:
             # For pending or other statuses
+            group_messages = []
             status_message = (
                 f"Dear {instance.order.customer.email},\n\n"
                 f"The status of your payment for Order ID: {instance.order.id} has been updated to: {instance.payment_status}.\n\n"
                 f"Best Regards,\nMinminbe Team"
             )
 
-        # Send status update email to the customer
-        send_mail(
-            "Payment Status Update",
-            status_message,
-            EMAIL_HOST_USER,
-            [instance.order.customer.email]
-        )
-        
-        # Create an in-app notification
-        Notification.objects.create(
-            customer=instance.order.customer,
-            message=f"Payment for Order ID {instance.order.id} is now {instance.payment_status}.",
-            notification_type="Payment Status Updated"
+        outbox.enqueue(
+            *group_messages,
+            # Send status update email to the customer
+            outbox.email(
+                "Payment Status Update",
+                status_message,
+                [instance.order.customer.email],
+                EMAIL_HOST_USER,
+            ),
+            # Create an in-app notification
+            outbox.notification(
+                instance.order.customer,
+                f"Payment for Order ID {instance.order.id} is now {instance.payment_status}.",
+                "Payment Status Updated",
+            ),
         )
 
 @receiver(post_delete, sender=Payment)
@@ -143,16 +135,17 @@ def handle_payment_delete(sender, instance, **kwargs):
         f"Please review if this action was intended.\n\n"
         f"Best Regards,\nYour System"
     )
-    send_mail(
-        "Payment Deleted",
-        admin_message,
-        EMAIL_HOST_USER,
-        [admin_email]
-    )
-    
-    # Optionally create an in-app notification for admins
-    Notification.objects.create(
-        customer=None,  # Assuming null for system notifications
-        message=f"Payment ID {instance.id} for Order ID {instance.order.id} has been deleted.",
-        notification_type="Payment Deleted"
+    outbox.enqueue(
+        outbox.email(
+            "Payment Deleted",
+            admin_message,
+            [admin_email],
+            EMAIL_HOST_USER,
+        ),
+        # Optionally create an in-app notification for admins
+        outbox.notification(
+            None,  # Assuming null for system notifications
+            f"Payment ID {instance.id} for Order ID {instance.order.id} has been deleted.",
+            "Payment Deleted",
+        ),
     )
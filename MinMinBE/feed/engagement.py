@@ -0,0 +1,175 @@
+"""
+Engagement counters for feed posts.
+
+Like, bookmark and share counts are stored on ``Post`` but are not written
+on every interaction. Each interaction adds to a per-post hash of pending
+deltas in Redis (``HINCRBY``) and marks the post dirty; readers add the
+pending deltas to the stored counts. ``flush_engagement`` periodically
+folds the pending deltas into the stored columns with one ``UPDATE`` per
+post, so a viral post costs one row write per flush instead of one per
+like.
+
+Toggling a like or bookmark is a single delete, plus an insert when
+nothing was deleted: it never loads the other likers.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from core.redis_client import redis_client
+from .models import Post, Share
+
+logger = logging.getLogger(__name__)
+
+# Counter name -> stored column on ``Post``
+COUNTER_FIELDS = {
+    'likes': 'likes_count',
+    'bookmarks': 'bookmarks_count',
+    'shares': 'share_count',
+}
+
+PENDING_KEY = "feed:engagement:{post_id}"
+DIRTY_KEY = "feed:engagement:dirty"
+# Bumped on every like, bookmark, share or comment; keys the cached post stats
+VERSION_KEY = "feed:engagement:version:{post_id}"
+
+
+def bump(post_id, counter, delta):
+    """Add ``delta`` to a post's pending ``counter`` once the transaction commits."""
+    if delta:
+        transaction.on_commit(lambda: _bump_now(str(post_id), counter, delta))
+
+
+def _bump_now(post_id, counter, delta):
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hincrby(PENDING_KEY.format(post_id=post_id), counter, delta)
+        pipe.sadd(DIRTY_KEY, post_id)
+        pipe.incr(VERSION_KEY.format(post_id=post_id))
+        pipe.execute()
+
+
+def touch(post_id):
+    """Move a post to a new engagement version, e.g. when it gains a comment."""
+    redis_client.incr(VERSION_KEY.format(post_id=post_id))
+
+
+def engagement_version(post_id):
+    return int(redis_client.get(VERSION_KEY.format(post_id=post_id)) or 0)
+
+
+def pending_deltas(post_ids):
+    """``{post_id: {counter: delta}}`` not yet flushed, fetched in one round trip."""
+    post_ids = [str(post_id) for post_id in post_ids]
+    if not post_ids:
+        return {}
+    with redis_client.pipeline(transaction=False) as pipe:
+        for post_id in post_ids:
+            pipe.hgetall(PENDING_KEY.format(post_id=post_id))
+        results = pipe.execute()
+    return {
+        post_id: {counter: int(value) for counter, value in deltas.items()}
+        for post_id, deltas in zip(post_ids, results) if deltas
+    }
+
+
+def engagement_counts(post, pending=None):
+    """Current like, bookmark and share counts of ``post``."""
+    if pending is None:
+        pending = pending_deltas([post.pk])
+    deltas = pending.get(str(post.pk), {})
+    return {
+        counter: max(0, getattr(post, field) + deltas.get(counter, 0))
+        for counter, field in COUNTER_FIELDS.items()
+    }
+
+
+def _toggle(through, counter, post, user):
+    deleted, _ = through.objects.filter(post_id=post.pk, user_id=user.pk).delete()
+    if deleted:
+        bump(post.pk, counter, -deleted)
+        return False
+    try:
+        with transaction.atomic():
+            through.objects.create(post_id=post.pk, user_id=user.pk)
+    except IntegrityError:
+        # A concurrent request inserted the same row first
+        return True
+    bump(post.pk, counter, 1)
+    return True
+
+
+def toggle_like(post, user):
+    """Like or unlike ``post``; returns whether it is now liked."""
+    return _toggle(Post.likes.through, 'likes', post, user)
+
+
+def toggle_bookmark(post, user):
+    """Bookmark or un-bookmark ``post``; returns whether it is now bookmarked."""
+    return _toggle(Post.bookmarks.through, 'bookmarks', post, user)
+
+
+def record_share(post, user=None):
+    Share.objects.create(post=post, user=user)
+    bump(post.pk, 'shares', 1)
+
+
+def flush_engagement(limit=1000):
+    """
+    Fold the pending deltas of up to ``limit`` dirty posts into the stored
+    counters. Returns the number of posts updated.
+
+    Deltas are subtracted from Redis only after the row is updated, so a
+    failed update leaves them pending for the next flush and increments
+    that arrive meanwhile are kept.
+    """
+    post_ids = redis_client.spop(DIRTY_KEY, limit) or []
+    flushed = 0
+    for post_id in post_ids:
+        key = PENDING_KEY.format(post_id=post_id)
+        deltas = {counter: int(value) for counter, value in redis_client.hgetall(key).items()}
+        deltas = {counter: delta for counter, delta in deltas.items() if delta and counter in COUNTER_FIELDS}
+        if not deltas:
+            continue
+        try:
+            Post.objects.filter(pk=post_id).update(**{
+                COUNTER_FIELDS[counter]: Greatest(F(COUNTER_FIELDS[counter]) + delta, Value(0))
+                for counter, delta in deltas.items()
+            })
+        except Exception:
+            logger.exception("Failed to flush engagement counters of post %s", post_id)
+            redis_client.sadd(DIRTY_KEY, post_id)
+            continue
+
+        with redis_client.pipeline(transaction=False) as pipe:
+            for counter, delta in deltas.items():
+                pipe.hincrby(key, counter, -delta)
+            remaining = pipe.execute()
+        if any(remaining):
+            redis_client.sadd(DIRTY_KEY, post_id)
+        flushed += 1
+    return flushed
+
+
+def recount_engagement(apps=None):
+    """
+    Recompute the stored like and bookmark counts of every post from the
+    relation tables. ``apps`` lets migrations pass their historical registry.
+    """
+    if apps is None:
+        from django.apps import apps
+
+    post_model = apps.get_model('feed', 'Post')
+    counts = {}
+    for relation, field in (('likes', 'likes_count'), ('bookmarks', 'bookmarks_count')):
+        through = getattr(post_model, relation).through
+        for post_id, count in through.objects.values('post_id').annotate(
+            n=Count('*')
+        ).values_list('post_id', 'n'):
+            counts.setdefault(post_id, {})[field] = count
+    post_model.objects.update(likes_count=0, bookmarks_count=0)
+    for post_id, fields in counts.items():
+        post_model.objects.filter(pk=post_id).update(**fields)
+    return len(counts)
+
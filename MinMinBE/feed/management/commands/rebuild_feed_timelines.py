@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from feed.timeline import rebuild_shared_timelines
+
+
+class Command(BaseCommand):
+    help = "Rebuild the recent and per-cell feed timelines in Redis from the database."
+
+    def handle(self, *args, **options):
+        cells = rebuild_shared_timelines()
+        self.stdout.write(self.style.SUCCESS(f"Feed timelines rebuilt: recent and {cells} cell(s)."))
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    from feed.engagement import recount_engagement
+
+    recount_engagement(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='bookmarks_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
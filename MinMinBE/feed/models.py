@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 import uuid
 import os
 import logging
@@ -11,6 +13,40 @@ def post_image_path(instance, filename):
     user_folder = f"user_{instance.user.id}"
     return os.path.join('posts', user_folder, filename)
 
+# Counter columns owned by ``feed.engagement``; ordinary saves never write them
+ENGAGEMENT_COLUMNS = ('likes_count', 'bookmarks_count', 'share_count')
+
+# Comments embedded in each serialized post; the rest are paged through the comments API
+LATEST_COMMENTS = 3
+
+
+def _count_of(queryset):
+    """Per-post row count of ``queryset`` as a correlated subquery."""
+    counts = queryset.filter(post=OuterRef('pk')).order_by().values('post').annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    def with_engagement(self):
+        """
+        Annotate ``comment_count`` and preload the author, tags and latest
+        comments, so serializing a page of posts takes a fixed number of
+        queries. Like, bookmark and share counts are stored on the post.
+        """
+        return self.select_related(
+            'user__tenants', 'user__branch'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'comments',
+                queryset=Comment.objects.select_related('user').order_by('-created_at')[:LATEST_COMMENTS],
+                to_attr='latest_comments',
+            ),
+        ).annotate(
+            comment_count=_count_of(Comment.objects),
+        )
+
+
 class Post(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE,related_name='posts')
@@ -22,10 +58,26 @@ class Post(models.Model):
     tags = models.ManyToManyField('Tag', blank=True)
     bookmarks = models.ManyToManyField(User, related_name='bookmarked_posts', blank=True)
     share_count = models.PositiveIntegerField(default=0)
+    # Flushed from the Redis engagement counters, see ``feed.engagement``
+    likes_count = models.PositiveIntegerField(default=0)
+    bookmarks_count = models.PositiveIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True,db_index=True)
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the feed, see ``core.pagination``
+            models.Index(fields=['-time_ago', '-id'], name='feed_post_time_id_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # A stale in-memory count would overwrite the flushed one
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ENGAGEMENT_COLUMNS
+            ]
         image_changed = self.image and not getattr(self.image, '_committed', True)
         super().save(*args, **kwargs)
         if image_changed:
@@ -46,6 +98,13 @@ class Comment(models.Model):
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='feed_comment_created_id_idx'),
+            # Latest comments of a post
+            models.Index(fields=['post', '-created_at', '-id'], name='feed_comment_post_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.full_name}: {self.text[:20]}"
 
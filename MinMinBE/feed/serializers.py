@@ -1,8 +1,30 @@
+from django.db import models
 from rest_framework import serializers
-from .models import Post, Comment, Tag, Share
+from .engagement import engagement_counts, pending_deltas
+from .models import LATEST_COMMENTS, Post, Comment, Tag, Share
 from accounts.models import User
 import json
 
+VIEWER_CONTEXT_KEY = 'feed_post_viewer'
+# Set to a set in the context of responses cached for many users: posts are
+# rendered with ``is_liked``/``is_bookmarked`` False and their ids are added
+# to the set, so the caller can look up the viewer's state per request with
+# ``viewer_engagement``
+SHARED_PAYLOAD_CONTEXT_KEY = 'feed_shared_payload'
+
+
+def viewer_engagement(user, post_ids):
+    """``(liked, bookmarked)`` ids among ``post_ids`` of the posts ``user`` liked and bookmarked, one query each."""
+    if not post_ids or user is None or not user.is_authenticated:
+        return set(), set()
+    liked = set(Post.likes.through.objects.filter(
+        user_id=user.pk, post_id__in=post_ids
+    ).values_list('post_id', flat=True))
+    bookmarked = set(Post.bookmarks.through.objects.filter(
+        user_id=user.pk, post_id__in=post_ids
+    ).values_list('post_id', flat=True))
+    return liked, bookmarked
+
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source="user.full_name") 
 
@@ -27,44 +49,106 @@ class CommentSerializer(serializers.ModelSerializer):
         representation['user'] = self.get_user(instance)
         return representation
 
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Loads which posts of the page the requesting user has liked and
+    bookmarked in one query each, instead of two lookups per post, and the
+    page's unflushed engagement counters in one Redis round trip.
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        context = self.context
+        context[VIEWER_CONTEXT_KEY] = self.viewer_state(posts)
+        try:
+            return super().to_representation(posts)
+        finally:
+            context.pop(VIEWER_CONTEXT_KEY, None)
+
+    def viewer_state(self, posts):
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        post_ids = [post.pk for post in posts]
+        shared_post_ids = self.context.get(SHARED_PAYLOAD_CONTEXT_KEY)
+        if shared_post_ids is not None:
+            shared_post_ids.update(post_ids)
+            user = None
+        liked, bookmarked = viewer_engagement(user, post_ids)
+        return {'liked': liked, 'bookmarked': bookmarked, 'pending': pending_deltas(post_ids)}
+
+
 class PostSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source="user.full_name") 
     likes_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     tags = serializers.ListField(child=serializers.CharField(), write_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    comment_count = serializers.SerializerMethodField()
     image = serializers.ImageField(required=False)
     bookmarks_count = serializers.SerializerMethodField()
     is_bookmarked = serializers.SerializerMethodField()
-    shares_count = serializers.IntegerField(source='share_count', read_only=True)
+    shares_count = serializers.SerializerMethodField()
     tenant_id = serializers.SerializerMethodField()
     class Meta:
         model = Post
-        fields = ["id", "user", "image", "caption", "time_ago", "location", "tags", "likes_count", "is_liked","comments", "bookmarks_count", "is_bookmarked", "shares_count", "tenant_id"]
+        fields = ["id", "user", "image", "caption", "time_ago", "location", "tags", "likes_count", "is_liked","comments", "comment_count", "bookmarks_count", "is_bookmarked", "shares_count", "tenant_id"]
+        list_serializer_class = PostListSerializer
+
+    # Comments come from ``Post.objects.with_engagement()`` when the queryset
+    # was built with it, and fall back to per-post queries otherwise.
+
+    def _viewer_state(self):
+        return self.context.get(VIEWER_CONTEXT_KEY)
+
+    def _counts(self, obj):
+        counts = getattr(obj, '_engagement_counts', None)
+        if counts is None:
+            viewer = self._viewer_state()
+            counts = obj._engagement_counts = engagement_counts(
+                obj, viewer['pending'] if viewer is not None else None
+            )
+        return counts
 
     def get_likes_count(self, obj):
-        return obj.likes.count() 
+        return self._counts(obj)['likes']
     
     def get_tags(self, obj):
         return [tag.name for tag in obj.tags.all()]
 
+    def get_comments(self, obj):
+        comments = getattr(obj, 'latest_comments', None)
+        if comments is None:
+            comments = obj.comments.select_related('user').order_by('-created_at')[:LATEST_COMMENTS]
+        return CommentSerializer(comments, many=True, context=self.context).data
+
+    def get_comment_count(self, obj):
+        if hasattr(obj, 'comment_count'):
+            return obj.comment_count
+        return obj.comments.count()
+
     def get_is_liked(self, obj):
+        viewer = self._viewer_state()
+        if viewer is not None:
+            return obj.pk in viewer['liked']
         user = self.context.get("request").user
         if user.is_authenticated:
             return obj.likes.filter(id=user.id).exists()
         return False
     
     def get_bookmarks_count(self, obj):
-        return obj.bookmarks.count()
+        return self._counts(obj)['bookmarks']
     
     def get_is_bookmarked(self, obj):
+        viewer = self._viewer_state()
+        if viewer is not None:
+            return obj.pk in viewer['bookmarked']
         user = self.context.get("request").user
         if user.is_authenticated:
             return obj.bookmarks.filter(id=user.id).exists()
         return False
     
     def get_shares_count(self, obj):
-        return obj.shares.count()
+        return self._counts(obj)['shares']
 
     def get_is_shared(self, obj):
         user = self.context.get("request").user
@@ -80,8 +164,8 @@ class PostSerializer(serializers.ModelSerializer):
             return user.tenants.id
         
         # Check if user belongs to a branch
-        if user.branch and hasattr(user.branch, 'tenant'):
-            return user.branch.tenant.id
+        if user.branch_id:
+            return user.branch.tenant_id
         
         return None
 
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from customer.order.models import Order
+from .engagement import bump, touch
+from .models import Comment, Post
+from .timeline import forget_timeline, remove_post
+
+
+def _track_relation(counter, through, instance, action, reverse, pk_set):
+    """
+    Keep the engagement counters in step with ``post.likes.add()`` and
+    friends (seeders, admin). ``feed.engagement`` toggles the relation
+    tables directly and does its own counting.
+    """
+    if action == 'post_add':
+        # ``pk_set`` only holds the rows that were actually inserted
+        if reverse:
+            for post_id in pk_set:
+                bump(post_id, counter, 1)
+        else:
+            bump(instance.pk, counter, len(pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        # Count the rows about to be deleted; the bump is applied on commit
+        rows = through.objects.filter(**{'user_id' if reverse else 'post_id': instance.pk})
+        if pk_set is not None:
+            rows = rows.filter(**{'post_id__in' if reverse else 'user_id__in': pk_set})
+        if reverse:
+            for post_id in rows.values_list('post_id', flat=True):
+                bump(post_id, counter, -1)
+        else:
+            bump(instance.pk, counter, -rows.count())
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def track_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    _track_relation('likes', sender, instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Post.bookmarks.through)
+def track_bookmarks(sender, instance, action, reverse, pk_set, **kwargs):
+    _track_relation('bookmarks', sender, instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        from .tasks import fan_out_post
+
+        post_id = str(instance.pk)
+        transaction.on_commit(lambda: fan_out_post.delay(post_id))
+
+
+@receiver(post_delete, sender=Post)
+def drop_deleted_post(sender, instance, **kwargs):
+    post_id, user_id = str(instance.pk), instance.user_id
+    transaction.on_commit(lambda: remove_post(post_id, user_id))
+
+
+@receiver(post_save, sender=Order)
+def refresh_customer_timeline(sender, instance, created, **kwargs):
+    # The customer may now follow a new restaurant
+    if created:
+        customer_id = instance.customer_id
+        transaction.on_commit(lambda: forget_timeline(customer_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    post_id = instance.post_id
+    transaction.on_commit(lambda: touch(post_id))
@@ -0,0 +1,54 @@
+"""
+Engagement statistics of a single post.
+
+Counts come from the stored engagement counters, lists are paged with a
+keyset cursor, and responses are cached for a short time under the post's
+engagement version, so any like, bookmark, share or comment makes the
+next request recompute them.
+"""
+from django.core.cache import cache
+
+from .engagement import engagement_version
+from .models import Post
+from .serializers import CommentStatsSerializer, ShareStatsSerializer, UserStatsSerializer
+
+STATS_CACHE_TTL = 60
+# Entries of each list embedded in the summary; the rest are paged per kind
+STATS_PREVIEW_SIZE = 10
+
+ENGAGEMENT_KINDS = ('likes', 'bookmarks', 'comments', 'shares')
+
+
+def _serialize_relation_users(rows):
+    return UserStatsSerializer([row.user for row in rows], many=True).data
+
+
+def engagement_rows(post, kind):
+    """``(queryset, keyset ordering, serialize)`` of one engagement list of ``post``."""
+    if kind == 'likes':
+        rows = Post.likes.through.objects.filter(post_id=post.pk).select_related('user')
+        return rows, ('-id',), _serialize_relation_users
+    if kind == 'bookmarks':
+        rows = Post.bookmarks.through.objects.filter(post_id=post.pk).select_related('user')
+        return rows, ('-id',), _serialize_relation_users
+    if kind == 'comments':
+        rows = post.comments.select_related('user')
+        return rows, ('-created_at', '-id'), lambda page: CommentStatsSerializer(page, many=True).data
+    if kind == 'shares':
+        rows = post.shares.select_related('user')
+        return rows, ('-shared_at', '-id'), lambda page: ShareStatsSerializer(page, many=True).data
+    raise ValueError(f"Unknown engagement kind: {kind}")
+
+
+def stats_cache_key(post_id, *parts):
+    return ":".join(["post_stats", str(post_id), f"v{engagement_version(post_id)}", *(str(part) for part in parts)])
+
+
+def cached_stats(post_id, parts, compute):
+    """``compute()`` cached under the post's current engagement version."""
+    key = stats_cache_key(post_id, *parts)
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, STATS_CACHE_TTL)
+    return data
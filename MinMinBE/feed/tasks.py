@@ -0,0 +1,26 @@
+import logging
+
+from celery import shared_task
+
+from .engagement import flush_engagement
+from .models import Post
+from .timeline import fan_out_post as push_to_timelines
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_post_engagement(limit=1000):
+    """Write pending like, bookmark and share counts back to the posts table."""
+    flushed = flush_engagement(limit)
+    if flushed:
+        logger.info("Flushed engagement counters of %d post(s)", flushed)
+    return flushed
+
+
+@shared_task
+def fan_out_post(post_id):
+    """Push a newly published post onto the timelines that should show it."""
+    post = Post.objects.select_related('user__tenants', 'user__branch').filter(pk=post_id).first()
+    if post is not None:
+        push_to_timelines(post)
@@ -1,3 +1,186 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_api_key.models import APIKey
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from core.redis_client import redis_client
+from restaurant.tenant.models import Tenant
+from .engagement import engagement_counts, flush_engagement, toggle_like, touch
+from .models import LATEST_COMMENTS, Comment, Post
+from .serializers import PostSerializer
+from .stats import STATS_PREVIEW_SIZE, cached_stats, engagement_rows
+from .timeline import RECENT_KEY, fan_out_post, forget_timeline, hydrate, timeline_page
+from .views import PostPagination
+
+
+class PostSerializerQueryTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email="author@test.com", password="password", user_type="customer")
+        self.viewer = User.objects.create_user(email="viewer@test.com", password="password", user_type="customer")
+        self.posts = [
+            Post.objects.create(user=self.author, image="posts/test.jpg", caption=f"Post {i}", location="Addis")
+            for i in range(4)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].likes.add(self.author, self.viewer)
+            self.posts[1].bookmarks.add(self.viewer)
+        for i in range(LATEST_COMMENTS + 2):
+            Comment.objects.create(post=self.posts[0], user=self.author, text=f"Comment {i}")
+
+    def serialize(self):
+        request = SimpleNamespace(user=self.viewer, build_absolute_uri=lambda url: url)
+        queryset = Post.objects.with_engagement().order_by("caption")
+        return PostSerializer(queryset, many=True, context={"request": request}).data
+
+    def test_page_uses_a_fixed_number_of_queries(self):
+        # Posts, tags, latest comments, liked ids and bookmarked ids
+        with self.assertNumQueries(5):
+            data = self.serialize()
+
+        first, second = data[0], data[1]
+        self.assertEqual(first["likes_count"], 2)
+        self.assertTrue(first["is_liked"])
+        self.assertFalse(first["is_bookmarked"])
+        self.assertEqual(first["comment_count"], LATEST_COMMENTS + 2)
+        self.assertEqual(len(first["comments"]), LATEST_COMMENTS)
+        self.assertEqual(second["bookmarks_count"], 1)
+        self.assertTrue(second["is_bookmarked"])
+        self.assertFalse(second["is_liked"])
+
+
+class EngagementCounterTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email="author@test.com", password="password", user_type="customer")
+        self.fans = [
+            User.objects.create_user(email=f"fan{i}@test.com", password="password", user_type="customer")
+            for i in range(3)
+        ]
+        self.post = Post.objects.create(user=self.author, image="posts/test.jpg", caption="Post", location="Addis")
+
+    def test_toggles_are_counted_and_flushed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for fan in self.fans:
+                self.assertTrue(toggle_like(self.post, fan))
+            self.assertFalse(toggle_like(self.post, self.fans[0]))
+
+        self.assertEqual(self.post.likes.count(), 2)
+        self.assertEqual(engagement_counts(self.post)["likes"], 2)
+
+        flush_engagement()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        # Nothing is left pending, so the count is not added twice
+        self.assertEqual(engagement_counts(self.post)["likes"], 2)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email="author@test.com", password="password", user_type="customer")
+        self.posts = [
+            Post.objects.create(user=self.author, image="posts/test.jpg", caption=f"Post {i}", location="Addis")
+            for i in range(5)
+        ]
+        # Equal timestamps must still page without skipping or repeating rows
+        Post.objects.filter(pk__in=[p.pk for p in self.posts[:3]]).update(time_ago=self.posts[0].time_ago)
+
+    def paginate(self, url):
+        paginator = PostPagination()
+        paginator.page_size = 2
+        request = Request(APIRequestFactory().get(url))
+        page = paginator.paginate_queryset(Post.objects.all(), request)
+        return page, paginator.get_paginated_response([post.pk for post in page]).data
+
+    def test_cursor_pages_cover_every_post_once(self):
+        seen = []
+        url = "/api/v1/feed/posts/?pagination=cursor"
+        while url:
+            page, data = self.paginate(url)
+            self.assertNotIn("count", data)
+            seen.extend(data["results"])
+            url = data["next"]
+        expected = list(Post.objects.order_by("-time_ago", "-id").values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_numbers_remain_the_default(self):
+        _, data = self.paginate("/api/v1/feed/posts/")
+        self.assertEqual(data["count"], 5)
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@test.com", password="password", user_type="restaurant")
+        Tenant.objects.create(restaurant_name="Timeline Tenant", admin=self.owner)
+        self.customer = User.objects.create_user(email="reader@test.com", password="password", user_type="customer")
+
+    def test_new_posts_are_read_newest_first(self):
+        forget_timeline(self.customer.pk)
+        older = Post.objects.create(user=self.owner, image="posts/a.jpg", caption="Older", location="Addis")
+        newer = Post.objects.create(user=self.owner, image="posts/b.jpg", caption="Newer", location="Addis")
+        fan_out_post(older)
+        fan_out_post(newer)
+
+        first_ids, before = timeline_page(self.customer, size=1)
+        self.assertEqual(first_ids, [str(newer.pk)])
+        second_ids, _ = timeline_page(self.customer, before=before, size=1)
+        self.assertEqual(second_ids, [str(older.pk)])
+        self.assertEqual(hydrate(first_ids + second_ids, self.customer), [newer, older])
+
+    def test_missing_recent_timeline_is_rebuilt_on_read(self):
+        # As after a Redis restart: no timelines and posts that were never fanned out
+        redis_client.delete(RECENT_KEY)
+        forget_timeline(self.customer.pk)
+        older = Post.objects.create(user=self.owner, image="posts/a.jpg", caption="Older", location="Addis")
+        newer = Post.objects.create(user=self.owner, image="posts/b.jpg", caption="Newer", location="Addis")
+
+        post_ids, _ = timeline_page(self.customer, size=2)
+        self.assertEqual(post_ids, [str(newer.pk), str(older.pk)])
+        self.assertTrue(redis_client.exists(RECENT_KEY))
+
+    def test_fan_out_skips_timelines_that_are_not_materialized(self):
+        redis_client.delete(RECENT_KEY)
+        post = Post.objects.create(user=self.owner, image="posts/a.jpg", caption="Post", location="Addis")
+        self.assertEqual(fan_out_post(post), 0)
+        self.assertFalse(redis_client.exists(RECENT_KEY))
+
+
+class PostStatsCacheTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email="author@test.com", password="password", user_type="customer")
+        self.post = Post.objects.create(user=self.author, image="posts/test.jpg", caption="Post", location="Addis")
+
+    def test_stats_are_recomputed_after_engagement_changes(self):
+        calls = []
+
+        def compute():
+            rows, ordering, serialize = engagement_rows(self.post, "comments")
+            calls.append(1)
+            return serialize(rows.order_by(*ordering))
+
+        self.assertEqual(cached_stats(self.post.pk, ["comments"], compute), [])
+        self.assertEqual(cached_stats(self.post.pk, ["comments"], compute), [])
+        self.assertEqual(len(calls), 1)
+
+        Comment.objects.create(post=self.post, user=self.author, text="Nice")
+        touch(self.post.pk)
+        self.assertEqual(len(cached_stats(self.post.pk, ["comments"], compute)), 1)
+        self.assertEqual(len(calls), 2)
+
+    @override_settings(ALLOWED_HOSTS=["one.example.com", "two.example.com"])
+    def test_cached_links_follow_the_request_host(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(STATS_PREVIEW_SIZE + 1):
+                fan = User.objects.create_user(email=f"fan{i}@test.com", password="password", user_type="customer")
+                self.post.likes.add(fan)
+        _, key = APIKey.objects.create_key(name="Test API Key")
+        client = APIClient()
+        client.credentials(
+            HTTP_X_API_KEY=f"{key.partition('.')[0]}.{key}",
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.author).access_token}",
+        )
+        for host in ("one.example.com", "two.example.com"):
+            response = client.get(f"/api/v1/feed/posts/{self.post.pk}/stats/", HTTP_HOST=host)
+            self.assertTrue(response.json()["likes"]["more"].startswith(f"http://{host}/"))
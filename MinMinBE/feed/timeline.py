@@ -0,0 +1,259 @@
+"""
+Precomputed feed timelines.
+
+Every timeline is a Redis sorted set of post ids scored by publication
+time, capped at ``TIMELINE_SIZE`` entries:
+
+* ``recent``: the latest posts of every restaurant;
+* one per geo cell: posts of restaurants with a branch in that cell;
+* one per customer: posts of restaurants the customer has ordered from.
+
+A new post is fanned out on write to whichever of the recent timeline,
+the cells of its restaurant's branches and the timelines of that
+restaurant's customers are currently materialized, checked and pushed in
+one Lua script. A timeline that does
+not exist (new, expired, or lost to a Redis restart or eviction) is built
+on read from the database, so pushing onto a missing one would only hide
+the older posts its rebuild would bring back. Reading a page merges the
+customer's timeline with the recent timeline and the timeline of the cell
+they are in, then hydrates only the ids on that page.
+
+``rebuild_feed_timelines`` reseeds the recent and cell timelines after a
+deploy.
+"""
+from django.contrib.gis.geos import Polygon
+from django.db.models import Q
+
+from core.geo import geohash_bounds, geohash_encode
+from core.location import user_location
+from core.redis_client import redis_client
+from .models import Post
+
+TIMELINE_SIZE = 500
+# Customer timelines are rebuilt from the database after this long unread
+TIMELINE_TTL = 60 * 60 * 24
+# Precision 5 cells are roughly 4.9 km x 4.9 km
+TIMELINE_CELL_PRECISION = 5
+
+RECENT_KEY = "feed:timeline:recent"
+CELL_KEY = "feed:timeline:cell:{cell}"
+USER_KEY = "feed:timeline:user:{user_id}"
+
+
+def _score(moment):
+    return moment.timestamp()
+
+
+def post_tenant_id(post):
+    """Tenant a post is published for: its author's restaurant or branch's restaurant."""
+    return user_tenant_id(post.user)
+
+
+def user_tenant_id(user):
+    tenant = getattr(user, 'tenants', None) if user.user_type == 'restaurant' else None
+    if tenant is not None:
+        return tenant.id
+    if user.branch_id:
+        return user.branch.tenant_id
+    return None
+
+
+def _branch_cells(tenant_id):
+    from restaurant.branch.models import Branch
+
+    cells = set()
+    for location in Branch.objects.filter(tenant_id=tenant_id, location__isnull=False).values_list('location', flat=True):
+        cells.add(geohash_encode(location.y, location.x, TIMELINE_CELL_PRECISION))
+    return cells
+
+
+def _tenant_customers(tenant_id):
+    from customer.order.models import Order
+
+    return set(
+        Order.objects.filter(tenant_id=tenant_id).order_by().values_list('customer_id', flat=True).distinct()
+    )
+
+
+def _add(pipe, key, members, ttl=None):
+    pipe.zadd(key, members)
+    pipe.zremrangebyrank(key, 0, -TIMELINE_SIZE - 1)
+    if ttl:
+        pipe.expire(key, ttl)
+
+
+# Pushes ARGV[2] with score ARGV[1] onto those of KEYS that exist, capped
+# at ARGV[3] entries; checking and pushing in one step keeps a timeline that
+# expires meanwhile from coming back with this post alone
+_PUSH_IF_EXISTS = redis_client.register_script("""
+local pushed = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('exists', key) == 1 then
+        redis.call('zadd', key, ARGV[1], ARGV[2])
+        redis.call('zremrangebyrank', key, 0, -tonumber(ARGV[3]) - 1)
+        pushed = pushed + 1
+    end
+end
+return pushed
+""")
+
+
+def fan_out_post(post):
+    """Push a new post onto every materialized timeline it belongs to. Returns how many it reached."""
+    tenant_id = post_tenant_id(post)
+    cells = _branch_cells(tenant_id) if tenant_id else set()
+    customers = _tenant_customers(tenant_id) if tenant_id else set()
+
+    # The others pick it up from the database when they are built
+    keys = [RECENT_KEY]
+    keys += [CELL_KEY.format(cell=cell) for cell in cells]
+    keys += [USER_KEY.format(user_id=customer_id) for customer_id in customers]
+    return _PUSH_IF_EXISTS(keys=keys, args=[_score(post.time_ago), str(post.pk), TIMELINE_SIZE])
+
+
+def remove_post(post_id, user_id):
+    """
+    Drop a deleted post of ``user_id`` from the shared timelines. Customer
+    timelines, and cells of branches that have since moved, skip it when
+    hydrating.
+    """
+    from accounts.models import User
+
+    user = User.objects.select_related('tenants', 'branch').filter(pk=user_id).first()
+    tenant_id = user_tenant_id(user) if user else None
+    cells = _branch_cells(tenant_id) if tenant_id else set()
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zrem(RECENT_KEY, post_id)
+        for cell in cells:
+            pipe.zrem(CELL_KEY.format(cell=cell), post_id)
+        pipe.execute()
+
+
+def forget_timeline(user_id):
+    """Rebuild ``user_id``'s timeline on their next read (e.g. after a first order)."""
+    redis_client.delete(USER_KEY.format(user_id=user_id))
+
+
+def _tenant_posts(tenant_ids):
+    """``(id, time_ago)`` of the latest posts published for ``tenant_ids``."""
+    if not tenant_ids:
+        return []
+    return Post.objects.filter(
+        Q(user__tenants__in=tenant_ids) | Q(user__branch__tenant__in=tenant_ids)
+    ).order_by('-time_ago', '-id').values_list('id', 'time_ago')[:TIMELINE_SIZE]
+
+
+def _store(key, rows, ttl=None):
+    members = {str(post_id): _score(time_ago) for post_id, time_ago in rows}
+    with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        # A placeholder keeps an empty timeline materialized
+        _add(pipe, key, members or {'': 0}, ttl)
+        pipe.execute()
+
+
+def build_timeline(user):
+    """Materialize ``user``'s timeline from the restaurants they have ordered from."""
+    from customer.order.models import Order
+
+    tenant_ids = list(
+        Order.objects.filter(customer=user).order_by().values_list('tenant_id', flat=True).distinct()
+    )
+    _store(USER_KEY.format(user_id=user.pk), _tenant_posts(tenant_ids), TIMELINE_TTL)
+
+
+def build_recent():
+    """Materialize the recent timeline from the latest posts."""
+    _store(RECENT_KEY, Post.objects.order_by('-time_ago', '-id').values_list('id', 'time_ago')[:TIMELINE_SIZE])
+
+
+def _cell_tenants(cell):
+    from restaurant.branch.models import Branch
+
+    min_lat, min_lon, max_lat, max_lon = geohash_bounds(cell)
+    branches = Branch.objects.filter(
+        location__intersects=Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+    ).values_list('tenant_id', 'location')
+    # The box includes its edges; the geohash decides which cell a border point is in
+    return {
+        tenant_id for tenant_id, location in branches
+        if geohash_encode(location.y, location.x, TIMELINE_CELL_PRECISION) == cell
+    }
+
+
+def build_cell(cell):
+    """Materialize the timeline of ``cell`` from the restaurants with a branch in it."""
+    _store(CELL_KEY.format(cell=cell), _tenant_posts(list(_cell_tenants(cell))))
+
+
+def rebuild_shared_timelines():
+    """Rebuild the recent timeline and the timeline of every cell with a branch. Returns the cell count."""
+    from restaurant.branch.models import Branch
+
+    build_recent()
+    cells = {
+        geohash_encode(location.y, location.x, TIMELINE_CELL_PRECISION)
+        for location in Branch.objects.filter(location__isnull=False).values_list('location', flat=True)
+    }
+    for cell in cells:
+        build_cell(cell)
+    return len(cells)
+
+
+def user_cell(user):
+    location = user_location(user)
+    return location.coarse_cell(TIMELINE_CELL_PRECISION) if location else None
+
+
+def timeline_page(user, before=None, size=10):
+    """
+    Ids of the next ``size`` posts of ``user``'s feed published strictly
+    before the ``before`` score, and the score to pass for the page after
+    (None when the feed is exhausted). Scores are microsecond timestamps,
+    so ties at a page boundary are not expected in practice.
+    """
+    key = USER_KEY.format(user_id=user.pk)
+    keys = [key, RECENT_KEY]
+    cell = user_cell(user)
+    if cell:
+        keys.append(CELL_KEY.format(cell=cell))
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for timeline in keys:
+            pipe.exists(timeline)
+        exists = pipe.execute()
+    if not exists[0]:
+        build_timeline(user)
+    else:
+        redis_client.expire(key, TIMELINE_TTL)
+    if not exists[1]:
+        build_recent()
+    if cell and not exists[2]:
+        build_cell(cell)
+
+    upper = f"({before}" if before is not None else "+inf"
+    with redis_client.pipeline(transaction=False) as pipe:
+        for timeline in keys:
+            # Scores above 0 skip the empty-timeline placeholder
+            pipe.zrevrangebyscore(timeline, upper, "(0", start=0, num=size + 1, withscores=True)
+        results = pipe.execute()
+
+    merged = {}
+    for entries in results:
+        for post_id, score in entries:
+            merged[post_id] = score
+    ranked = sorted(merged.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    page = ranked[:size]
+    next_before = page[-1][1] if len(ranked) > size else None
+    return [post_id for post_id, _ in page], next_before
+
+
+def hydrate(post_ids, user):
+    """Posts for ``post_ids`` in timeline order; ids of deleted posts are pruned."""
+    posts = Post.objects.with_engagement().in_bulk(post_ids)
+    found = {str(pk): post for pk, post in posts.items()}
+    missing = [post_id for post_id in post_ids if post_id not in found]
+    if missing:
+        redis_client.zrem(USER_KEY.format(user_id=user.pk), *missing)
+    return [found[post_id] for post_id in post_ids if post_id in found]
+
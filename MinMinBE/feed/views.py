@@ -6,27 +6,44 @@ from accounts.permissions import HasCustomAPIKey
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
+from core.pagination import KeysetPagination
 from .models import Post, Comment, Tag, Share
-from .serializers import PostSerializer, CommentSerializer, TagSerializer, ShareSerializer, UserStatsSerializer, CommentStatsSerializer, ShareStatsSerializer 
+from .serializers import PostSerializer, CommentSerializer, TagSerializer, ShareSerializer
 from .feedFilter import FeedFilter
-class PostPagination(PageNumberPagination):
+from .engagement import engagement_counts, record_share, toggle_bookmark, toggle_like
+from .timeline import hydrate, timeline_page
+from .stats import ENGAGEMENT_KINDS, STATS_PREVIEW_SIZE, cached_stats, engagement_rows
+from rest_framework.utils.urls import replace_query_param
+class EngagementPagination(KeysetPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def use_cursor(self, request):
+        return True
+
+class PostPagination(KeysetPagination):
     page_size = 10
+    ordering = ('-time_ago', '-id')
 
 class PostViewSet(viewsets.ModelViewSet):
     """
     A ViewSet for viewing, creating, updating, and deleting posts.
     """
-    queryset = Post.objects.prefetch_related('comments').all().order_by("-time_ago")
+    queryset = Post.objects.with_engagement().order_by("-time_ago", "-id")
     serializer_class = PostSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = FeedFilter
     permission_classes = [IsAuthenticated,HasCustomAPIKey]
     pagination_class = PostPagination
+    # Actions that only touch one post's engagement rows skip the feed preloading
+    ENGAGEMENT_ACTIONS = ('like', 'bookmark', 'share', 'post_stats', 'post_stats_list')
+
     def get_queryset(self):
-        queryset = Post.objects.select_related(
-            'user__tenants',
-            'user__branch__tenant'
-        ).prefetch_related('comments').order_by("-time_ago")
+        if self.action in self.ENGAGEMENT_ACTIONS:
+            queryset = Post.objects.order_by("-time_ago", "-id")
+        else:
+            queryset = Post.objects.with_engagement().order_by("-time_ago", "-id")
         
         user = self.request.user
         
@@ -38,96 +55,109 @@ class PostViewSet(viewsets.ModelViewSet):
         """Ensure the post is associated with the currently authenticated user."""
         serializer.save(user=self.request.user)
     
+    @action(detail=False, methods=["GET"])
+    def timeline(self, request):
+        """
+        Personalized feed read from the precomputed timelines; only the
+        posts on the requested page are loaded from the database.
+        """
+        before = request.query_params.get('before')
+        try:
+            before = float(before) if before else None
+        except ValueError:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        post_ids, next_before = timeline_page(request.user, before, PostPagination.page_size)
+        serializer = self.get_serializer(hydrate(post_ids, request.user), many=True)
+        next_link = None
+        if next_before is not None:
+            next_link = replace_query_param(request.build_absolute_uri(), 'before', repr(next_before))
+        return Response({"next": next_link, "results": serializer.data}, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=["POST"])
     def like(self, request, pk=None):
         """
         Custom endpoint for liking/unliking a post.
         """
         post = self.get_object()
-        user = request.user
-
-        if user in post.likes.all():
-            post.likes.remove(user)  # Unlike
-            return Response({"message": "Unliked post"}, status=status.HTTP_200_OK)
-        else:
-            post.likes.add(user)  # Like
-            return Response({"message": "Liked post"}, status=status.HTTP_200_OK)
+        liked = toggle_like(post, request.user)
+        count = engagement_counts(post)['likes']
+        message = "Liked post" if liked else "Unliked post"
+        return Response({"message": message, "count": count}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["POST"])
     def bookmark(self, request, pk=None):
         post = self.get_object()
-        user = request.user
-
-        if user in post.bookmarks.all():
-            post.bookmarks.remove(user)
-            return Response({"message": "Removed from bookmarks"}, status=status.HTTP_200_OK)
-        else:
-            post.bookmarks.add(user)
-            return Response({"message": "Added to bookmarks"}, status=status.HTTP_200_OK)
+        bookmarked = toggle_bookmark(post, request.user)
+        count = engagement_counts(post)['bookmarks']
+        message = "Added to bookmarks" if bookmarked else "Removed from bookmarks"
+        return Response({"message": message, "count": count}, status=status.HTTP_200_OK)
         
     @action(detail=True, methods=["POST"])
     def share(self, request, pk=None):
         post = self.get_object()
-        Share.objects.create(
-            post=post,
-            user=request.user if request.user.is_authenticated else None
-        )
-        post.share_count += 1
-        post.save()
-        return Response({"message": "Post shared", "count": post.share_count}, status=status.HTTP_201_CREATED)
+        record_share(post, request.user if request.user.is_authenticated else None)
+        count = engagement_counts(post)['shares']
+        return Response({"message": "Post shared", "count": count}, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['get'], url_path='stats')
     def post_stats(self, request, pk=None):
         """
-        Get detailed statistics for a specific post
+        Get detailed statistics for a specific post: every count, and the
+        latest entries of each list (``more`` pages through the rest)
         """
         post = self.get_object()
-        
-        # Get likes data
-        likes = post.likes.all()
-        likes_serializer = UserStatsSerializer(likes, many=True)
-        
-        # Get bookmarks data
-        bookmarks = post.bookmarks.all()
-        bookmarks_serializer = UserStatsSerializer(bookmarks, many=True)
-        
-        # Get comments data
-        comments = post.comments.select_related('user').all()
-        comments_serializer = CommentStatsSerializer(comments, many=True)
-        
-        # Get shares data
-        all_shares = post.shares.all()
-        shares = post.shares.select_related('user').all()
-        shares_serializer = ShareStatsSerializer(shares, many=True)
-        
-        data = {
-            'likes': {
-                'count': likes.count(),
-                'users': likes_serializer.data
-            },
-            'bookmarks': {
-                'count': bookmarks.count(),
-                'users': bookmarks_serializer.data
-            },
-            'comments': {
-                'count': comments.count(),
-                'items': comments_serializer.data
-            },
-            'shares': {
-                'count': all_shares.count(),
-                'items': shares_serializer.data
-            }
-        }
-        
+
+        def compute():
+            counts = engagement_counts(post)
+            counts['comments'] = post.comments.count()
+            data = {}
+            for kind in ENGAGEMENT_KINDS:
+                rows, ordering, serialize = engagement_rows(post, kind)
+                preview = list(rows.order_by(*ordering)[:STATS_PREVIEW_SIZE])
+                more = None
+                if counts[kind] > len(preview):
+                    more = self.reverse_action('post-stats-list', kwargs={'pk': post.pk, 'kind': kind})
+                data[kind] = {
+                    'count': counts[kind],
+                    'users' if kind in ('likes', 'bookmarks') else 'items': serialize(preview),
+                    'more': more,
+                }
+            return data
+
+        # ``more`` links are absolute, so the host is part of the key
+        data = cached_stats(post.pk, ['summary', request.build_absolute_uri('/')], compute)
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(
+        detail=True, methods=['get'], url_name='post-stats-list',
+        url_path=r'stats/(?P<kind>likes|bookmarks|comments|shares)',
+    )
+    def post_stats_list(self, request, pk=None, kind=None):
+        """One engagement list of a post, paged with a cursor"""
+        post = self.get_object()
+        rows, ordering, serialize = engagement_rows(post, kind)
+        paginator = EngagementPagination()
+        paginator.ordering = ordering
+        cursor = request.query_params.get(paginator.cursor_query_param, '')
+        page_size = paginator.get_page_size(request)
+
+        def compute():
+            page = paginator.paginate_queryset(rows, request, view=self)
+            return paginator.get_paginated_response(serialize(page)).data
+
+        # ``next`` links are absolute, so the host is part of the key
+        data = cached_stats(post.pk, [kind, page_size, cursor, request.build_absolute_uri('/')], compute)
         return Response(data, status=status.HTTP_200_OK)
 
-class CommentPagination(PageNumberPagination):
+class CommentPagination(KeysetPagination):
     page_size = 20
+    ordering = ('-created_at', '-id')
 class CommentViewSet(viewsets.ModelViewSet):
     """
     A ViewSet for managing comments on posts.
     """
-    queryset = Comment.objects.all().order_by("-created_at")
+    queryset = Comment.objects.all().order_by("-created_at", "-id")
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated,HasCustomAPIKey]
     pagination_class = CommentPagination
@@ -153,7 +183,7 @@ class UserBookmarksViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = PostPagination
 
     def get_queryset(self):
-        return self.request.user.bookmarked_posts.all().order_by("-time_ago")
+        return Post.objects.with_engagement().filter(bookmarks=self.request.user).order_by("-time_ago", "-id")
     
     
 class ShareViewSet(viewsets.ReadOnlyModelViewSet):
@@ -1,7 +1,12 @@
 # authentication.py
+from django.utils.translation import gettext_lazy as _
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.principal import cache_principal, get_cached_user
 
 class CookieJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
@@ -23,4 +28,26 @@ class CookieJWTAuthentication(JWTAuthentication):
             validated_token = self.get_validated_token(access_token)
             return self.get_user(validated_token), validated_token
         except AuthenticationFailed:
-            raise AuthenticationFailed('Invalid or expired token')
\ No newline at end of file
+            raise AuthenticationFailed('Invalid or expired token')
+
+    def get_user(self, validated_token):
+        """
+        Resolve the user from the cached principal when possible, so the
+        user, tenant and branch are not loaded from the database per request.
+        """
+        # Revocation checks compare the password hash, which is never cached
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_principal(user)
+        elif not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
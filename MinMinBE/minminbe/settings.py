@@ -348,6 +348,35 @@ CELERY_BEAT_SCHEDULE = {
         "task": "restaurant.discount.tasks.update_big_discount_items",
         "schedule": crontab(hour=0, minute=0),
     },
+    # Safety net for outbox messages whose on-commit dispatch was lost
+    "dispatch_notification_outbox": {
+        "task": "customer.notification.tasks.dispatch_notification_outbox",
+        "schedule": crontab(minute="*/1"),
+    },
+    # Heals dashboard rollups whose on-commit refresh was lost and prunes old hourly rows
+    "compact_branch_stats": {
+        "task": "restaurant.tenant.tasks.compact_branch_stats",
+        "schedule": crontab(minute="*/15"),
+    },
+    "reconcile_rating_aggregates": {
+        "task": "customer.feedback.tasks.reconcile_rating_aggregates",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    # Menu writes only rank their own tenant; re-rank everyone so bands stay tertiles
+    "rebalance_tenant_price_bands": {
+        "task": "restaurant.tenant.tasks.rebalance_tenant_price_bands",
+        "schedule": crontab(minute=5),
+    },
+    # Incremental "ordered together" neighbours from orders placed since the last run
+    "update_menu_recommendations": {
+        "task": "restaurant.related_menu.tasks.update_menu_recommendations",
+        "schedule": crontab(minute=40),
+    },
+    # Write-behind of the Redis like/bookmark/share counters
+    "flush_post_engagement": {
+        "task": "feed.tasks.flush_post_engagement",
+        "schedule": crontab(minute="*/1"),
+    },
 }
 
 # ------------------------------------------------------------------------------
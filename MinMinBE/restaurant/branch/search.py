@@ -0,0 +1,79 @@
+"""
+Nearest-branch search.
+
+Branches are ordered with PostGIS' index-assisted KNN operator
+(``location <-> point``), so the spatial index hands them out nearest
+first and the database stops after one page instead of computing and
+sorting the distance of every branch. ``radius_km`` adds an
+``ST_DWithin`` prefilter. Pages continue strictly after the last
+``(distance, id)`` returned.
+
+Searches run from the centre of the searcher's geo cell and their pages
+are cached per cell for a short time; saving or deleting any branch
+invalidates them.
+"""
+import base64
+import json
+
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.measure import D
+from django.db.models import F, FloatField, Func, Q
+from django.db.models.expressions import RawSQL
+
+from core.cache import invalidate_tags
+
+BRANCH_LOCATION_TAG = "branch_location"
+SEARCH_CACHE_TTL = 60
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+class KNNDistance(Func):
+    """``location <-> point``; only meaningful for ordering and comparisons (metres)."""
+    arg_joiner = ' <-> '
+    template = '%(expressions)s'
+    output_field = FloatField()
+
+    def __init__(self, field, point, **extra):
+        super().__init__(F(field), RawSQL("ST_GeogFromText(%s)", (point.ewkt,)), **extra)
+
+
+def nearest_first(queryset, point, radius_km=None):
+    """Branches of ``queryset`` with a location, nearest to ``point`` first."""
+    queryset = queryset.filter(location__isnull=False)
+    if radius_km is not None:
+        queryset = queryset.filter(location__dwithin=(point, D(km=radius_km)))
+    return queryset.annotate(
+        knn=KNNDistance('location', point),
+        distance=Distance('location', point),
+    ).order_by('knn', 'id')
+
+
+def encode_cursor(branch):
+    raw = json.dumps([branch.knn, str(branch.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """``(knn, id)`` of a cursor; raises ValueError when it is malformed."""
+    try:
+        knn, branch_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return float(knn), str(branch_id)
+    except (TypeError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(cursor) from exc
+
+
+def search_page(queryset, point, radius_km=None, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """One page of the nearest branches, and the cursor of the next page (or None)."""
+    queryset = nearest_first(queryset, point, radius_km)
+    if cursor:
+        knn, branch_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(knn__gt=knn) | Q(knn=knn, id__gt=branch_id))
+    rows = list(queryset[:page_size + 1])
+    page = rows[:page_size]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > page_size else None
+    return page, next_cursor
+
+
+def invalidate_branch_search():
+    invalidate_tags(BRANCH_LOCATION_TAG)
@@ -111,3 +111,26 @@ class BranchSerializer(serializers.ModelSerializer):
         if representation.get('distance_km') is None:
             representation.pop('distance_km')
         return representation
+
+
+class BranchSearchSerializer(serializers.ModelSerializer):
+    """Compact branch card returned by the nearest-branch search."""
+    tenant = serializers.SerializerMethodField()
+    location = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Branch
+        fields = ['id', 'tenant', 'address', 'location', 'is_default', 'distance_km']
+
+    def get_tenant(self, obj):
+        return {
+            'id': obj.tenant.id,
+            'restaurant_name': obj.tenant.restaurant_name
+        }
+
+    def get_location(self, obj):
+        return {'lat': str(obj.location.y), 'lng': str(obj.location.x)}
+
+    def get_distance_km(self, obj):
+        return round(obj.distance.km, 2)
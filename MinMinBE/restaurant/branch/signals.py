@@ -4,6 +4,7 @@ from .models import Branch
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from restaurant.table.models import Table
+from .search import invalidate_branch_search
 
 @receiver(post_save, sender=Branch)
 def branch_created_notification(sender, instance, created, **kwargs):
@@ -61,4 +62,9 @@ def branch_deleted_notification(sender, instance, **kwargs):
             }
         }
     )
-    
\ No newline at end of file
+    
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_branch_search_cache(sender, instance, **kwargs):
+    invalidate_branch_search()
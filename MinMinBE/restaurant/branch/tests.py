@@ -1,10 +1,12 @@
 from django.test import TestCase
+from django.contrib.gis.geos import Point
 from rest_framework.test import APIClient
 from rest_framework_api_key.models import APIKey
 from rest_framework import status
 from accounts.models import User
 from restaurant.branch.models import Branch
 from restaurant.tenant.models import Tenant
+from restaurant.branch.search import search_page
 
 class BranchViewTest(TestCase):
 
@@ -95,3 +97,25 @@ class BranchViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Branch.objects.count(), 1)
 
+
+
+class NearestBranchSearchTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="owner@test.com", password="password", user_type="restaurant")
+        tenant = Tenant.objects.create(restaurant_name="Search Tenant", admin=owner, profile="test")
+        # Roughly 1 km, 5 km and 30 km north of the search point
+        self.near = Branch.objects.create(tenant=tenant, address="Near", location=Point(38.76, 9.01, srid=4326))
+        self.mid = Branch.objects.create(tenant=tenant, address="Mid", location=Point(38.76, 9.045, srid=4326))
+        self.far = Branch.objects.create(tenant=tenant, address="Far", location=Point(38.76, 9.27, srid=4326))
+        Branch.objects.create(tenant=tenant, address="Unlocated")
+
+    def test_pages_follow_distance_and_radius(self):
+        origin = Point(38.76, 9.0, srid=4326)
+        first, cursor = search_page(Branch.objects.all(), origin, page_size=2)
+        self.assertEqual([b.address for b in first], ["Near", "Mid"])
+        second, end = search_page(Branch.objects.all(), origin, cursor=cursor, page_size=2)
+        self.assertEqual([b.address for b in second], ["Far"])
+        self.assertIsNone(end)
+
+        within, _ = search_page(Branch.objects.all(), origin, radius_km=10)
+        self.assertEqual([b.address for b in within], ["Near", "Mid"])
@@ -6,18 +6,26 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Branch
-from .serializers import BranchSerializer
+from .serializers import BranchSearchSerializer, BranchSerializer
+from .search import (
+    BRANCH_LOCATION_TAG, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SEARCH_CACHE_TTL, nearest_first, search_page,
+)
 from .branchFilter import BranchFilter
 from rest_framework.pagination import PageNumberPagination
-from django.contrib.gis.geos import Point # Import Point
 from django.contrib.gis.db.models.functions import Distance
-from core.redis_client import redis_client
+from django.core.cache import cache
+from rest_framework.utils.urls import replace_query_param
+from core.cache import get_tagged, tagged_key
+from core.location import make_location, user_location
 from rest_framework.decorators import action
 from restaurant.table.models import Table
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from accounts.utils import get_user_branch, get_user_tenant
 
+# Cap of the unpaginated all-with-distance listing
+ALL_WITH_DISTANCE_LIMIT = 100
+
 class BranchPagination(PageNumberPagination):
     page_size = 10
 
@@ -32,16 +40,12 @@ class BranchView(ModelViewSet):
     def get_queryset(self):
         user = self.request.user
 
-        user_location = redis_client.get(str(user.id))
         if user.user_type == 'customer':
             base_qs = Branch.objects.prefetch_related('tables', 'branch_menu_availabilities')
-            if user_location:
-                latitude_str, longitude_str = user_location.split(',')
-                if latitude_str != 'null' and longitude_str != 'null':
-                    latitude = float(latitude_str)
-                    longitude = float(longitude_str)
-                    user_point = Point(longitude, latitude, srid=4326)
-                    base_qs = base_qs.annotate(distance=Distance('location', user_point)).order_by('distance')
+            location = user_location(user)
+            if location:
+                # Measured from the centre of the customer's geo cell so results are shareable per cell
+                base_qs = base_qs.annotate(distance=Distance('location', location.cell_point)).order_by('distance')
             return base_qs
 
         queryset = Branch.objects.select_related('tenant').prefetch_related('tables', 'branch_menu_availabilities')
@@ -112,83 +116,103 @@ class BranchView(ModelViewSet):
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=False, methods=['get'], url_path='nearby')
-    def nearby_branches(self, request):
+    def _search_location(self, request):
         """
-        Returns the 5 nearest branches based on user's GPS coordinates.
-        Expects 'lat' and 'lon' query parameters.
+        Location to search from: the ``lat``/``lon`` query parameters, or the
+        requesting user's stored location. Returns ``(location, error response)``.
         """
         lat = request.query_params.get('lat')
         lon = request.query_params.get('lon')
-
-        # Validate presence of parameters
-        if not lat or not lon:
-            return Response(
+        if lat or lon:
+            location = make_location(lat, lon)
+            if location is None:
+                return None, Response(
+                    {'error': 'Invalid latitude or longitude values.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return location, None
+        location = user_location(request.user)
+        if location is None:
+            return None, Response(
                 {'error': 'Latitude (lat) and Longitude (lon) parameters are required.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return location, None
 
-        # Validate parameter types
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Branches nearest to ``lat``/``lon`` (or the user's stored location),
+        optionally within ``radius_km``, paged with ``cursor``.
+        """
+        location, error = self._search_location(request)
+        if error:
+            return error
         try:
-            user_lat = float(lat)
-            user_lon = float(lon)
-            user_location = Point(user_lon, user_lat, srid=4326) # Create a Point object
+            radius_km = float(request.query_params['radius_km']) if request.query_params.get('radius_km') else None
+            page_size = min(int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
         except ValueError:
-            return Response(
-                {'error': 'Invalid latitude or longitude values.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Retrieve all branches and annotate distance using Django GIS
-        # Filter out branches without GPS coordinates if necessary, or handle nulls
-        branches = Branch.objects.filter(location__isnull=False).annotate(
-            distance=Distance('location', user_location)
-        ).order_by('distance')[:5] # Order and limit directly in the queryset
+            return Response({'error': 'Invalid radius_km or page_size.'}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1 or (radius_km is not None and radius_km <= 0):
+            return Response({'error': 'Invalid radius_km or page_size.'}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = request.query_params.get('cursor')
+
+        # Everyone searching from the same geo cell shares the cached pages
+        key = tagged_key(
+            "branch_search", [BRANCH_LOCATION_TAG],
+            location.cell, radius_km, page_size, cursor or '', request.build_absolute_uri('/'),
+        )
+        data = get_tagged(key, [BRANCH_LOCATION_TAG])
+        if data is None:
+            queryset = Branch.objects.select_related('tenant')
+            try:
+                page, next_cursor = search_page(queryset, location.cell_point, radius_km, cursor, page_size)
+            except ValueError:
+                return Response({'error': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+            next_link = None
+            if next_cursor:
+                next_link = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+            data = {
+                'next': next_link,
+                'results': BranchSearchSerializer(page, many=True).data,
+            }
+            cache.set(key, data, SEARCH_CACHE_TTL)
+        return Response(data)
 
-        # The serializer should now correctly handle the 'distance' attribute
-        # and the 'location' PointField via the SerializerMethodField.
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby_branches(self, request):
+        """
+        Returns the 5 nearest branches based on user's GPS coordinates.
+        Expects 'lat' and 'lon' query parameters.
+        """
+        location, error = self._search_location(request)
+        if error:
+            return error
+
+        branches = nearest_first(
+            Branch.objects.select_related('tenant').prefetch_related(
+                'tables', 'branch_menu_availabilities__menu_item'
+            ),
+            location.point,
+        )[:5]
         serializer = self.get_serializer(branches, many=True)
         return Response(serializer.data)
 
-    # Removed the custom haversine function as Django GIS Distance handles this better.
-    # @staticmethod
-    # def haversine(lat1, lon1, lat2, lon2):
-    #     # ... (redundant now)
-    #     pass
-
-    # Re-enabled (and corrected) all_branches_with_distance
     @action(detail=False, methods=['get'], url_path='all-with-distance')
     def all_branches_with_distance(self, request):
         """
-        Returns all branches with distance in kilometers from user's location.
-        Requires 'lat' and 'lon' query parameters.
+        Returns the nearest branches (at most ALL_WITH_DISTANCE_LIMIT, use
+        ``search`` to page further) with distance in kilometers from the
+        user's location, optionally within ``radius_km``.
         """
-        lat = request.query_params.get('lat')
-        lon = request.query_params.get('lon')
-
-        # Validate parameters
-        if not lat or not lon:
-            return Response(
-                {'error': 'Both latitude (lat) and longitude (lon) are required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
+        location, error = self._search_location(request)
+        if error:
+            return error
         try:
-            user_lat = float(lat)
-            user_lon = float(lon)
-            user_location = Point(user_lon, user_lat, srid=4326) # Create a Point object
+            radius_km = float(request.query_params['radius_km']) if request.query_params.get('radius_km') else None
         except ValueError:
-            return Response(
-                {'error': 'Invalid coordinate format. Use decimal degrees.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Get tenant-filtered branches and annotate distance using Django GIS
-        # Ensure only branches with valid location are included in distance calculation
-        branches = self.get_queryset().filter(location__isnull=False).annotate(
-            distance=Distance('location', user_location)
-        ).order_by('distance') # Order by distance
+            return Response({'error': 'Invalid radius_km.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Serialize with distance information
+        branches = nearest_first(self.get_queryset(), location.point, radius_km)[:ALL_WITH_DISTANCE_LIMIT]
         serializer = self.get_serializer(branches, many=True)
         return Response(serializer.data)
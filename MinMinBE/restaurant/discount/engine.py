@@ -0,0 +1,225 @@
+"""Compiled, versioned discount plans.
+
+A plan is a plain-data snapshot of every discount a tenant has configured
+(rules, applicable item sets and the menu prices those rules refer to).
+Plans are cached in process memory and in the shared Django cache, keyed
+on a per-tenant version token that the discount signals bump whenever a
+discount, rule or menu price changes. Evaluating a cart against a plan is
+a pure in-memory function and issues no database queries.
+"""
+import random
+import uuid
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.utils import timezone
+
+PLAN_VERSION_KEY = "discount_plan_version:{tenant_id}"
+PLAN_KEY = "discount_plan:{tenant_id}:{version}"
+PLAN_CACHE_TIMEOUT = 60 * 60 * 24  # plans are replaced on every version bump
+
+# tenant_id -> (version, plan); bounded so a long-lived worker cannot grow without limit
+_local_plans = {}
+_LOCAL_PLANS_MAX = 512
+
+
+def _tenant_key(tenant):
+    return str(getattr(tenant, 'pk', tenant))
+
+
+def get_plan_version(tenant):
+    """Return the current plan version token for ``tenant``, creating one if missing."""
+    key = PLAN_VERSION_KEY.format(tenant_id=_tenant_key(tenant))
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_plan_version(tenant):
+    """Invalidate the compiled plan of ``tenant`` everywhere."""
+    tenant_id = _tenant_key(tenant)
+    cache.set(PLAN_VERSION_KEY.format(tenant_id=tenant_id), uuid.uuid4().hex, None)
+    _local_plans.pop(tenant_id, None)
+
+
+def compile_discount_plan(tenant):
+    """Build the plan for ``tenant`` from the database (three queries)."""
+    from restaurant.menu.models import Menu
+    from .models import Discount
+
+    tenant_id = _tenant_key(tenant)
+    discounts = (
+        Discount.objects.filter(tenant_id=tenant_id)
+        .prefetch_related('discount_discount_rules', 'branches')
+        .order_by('-priority')
+    )
+
+    compiled = []
+    referenced_items = set()
+    for discount in discounts:
+        rules = []
+        for rule in discount.discount_discount_rules.all():
+            applicable = [str(i) for i in rule.applicable_items or []]
+            free_items = [str(i) for i in rule.free_items or []]
+            referenced_items.update(applicable)
+            referenced_items.update(free_items)
+            rules.append({
+                'min_items': rule.min_items,
+                'combo_size': rule.combo_size,
+                'buy_quantity': rule.buy_quantity,
+                'get_quantity': rule.get_quantity or 0,
+                'is_percentage': rule.is_percentage,
+                'max_discount_amount': Decimal(str(rule.max_discount_amount)),
+                'applicable_items': frozenset(applicable),
+                'free_items': free_items,
+            })
+        compiled.append({
+            'id': str(discount.id),
+            'type': discount.type,
+            'priority': discount.priority,
+            'is_stackable': discount.is_stackable,
+            'is_global': discount.is_global,
+            'branches': frozenset(str(b.pk) for b in discount.branches.all()),
+            'valid_from': discount.valid_from,
+            'valid_until': discount.valid_until,
+            'rules': rules,
+        })
+
+    prices = {}
+    if referenced_items:
+        valid_ids = []
+        for item_id in referenced_items:
+            try:
+                valid_ids.append(uuid.UUID(item_id))
+            except ValueError:
+                continue
+        prices = {
+            str(pk): Decimal(str(price))
+            for pk, price in Menu.objects.filter(
+                tenant_id=tenant_id, id__in=valid_ids
+            ).values_list('id', 'price')
+        }
+
+    return {'tenant': tenant_id, 'version': None, 'discounts': compiled, 'prices': prices}
+
+
+def get_discount_plan(tenant):
+    """Return the compiled plan for ``tenant``, compiling it on a cache miss."""
+    tenant_id = _tenant_key(tenant)
+    version = get_plan_version(tenant_id)
+
+    local = _local_plans.get(tenant_id)
+    if local and local[0] == version:
+        return local[1]
+
+    key = PLAN_KEY.format(tenant_id=tenant_id, version=version)
+    plan = cache.get(key)
+    if plan is None:
+        plan = compile_discount_plan(tenant_id)
+        plan['version'] = version
+        cache.set(key, plan, PLAN_CACHE_TIMEOUT)
+
+    if len(_local_plans) >= _LOCAL_PLANS_MAX:
+        _local_plans.clear()
+    _local_plans[tenant_id] = (version, plan)
+    return plan
+
+
+def _is_active(discount, now, branch_id):
+    if discount['valid_from'] and discount['valid_from'] > now:
+        return False
+    if discount['valid_until'] and discount['valid_until'] < now:
+        return False
+    if branch_id and not discount['is_global'] and branch_id not in discount['branches']:
+        return False
+    return True
+
+
+def evaluate_discount_plan(plan, items_data, order_total, branch=None, now=None, rng=random):
+    """
+    Evaluate the automatic discounts of ``plan`` against a cart at ``now``.
+    Free items are drawn with ``rng``; pass a seeded ``random.Random`` for a
+    repeatable draw.
+
+    Returns ``(amount, discount_type, free_items)`` for the best automatic
+    discount, before any coupon is considered.
+    """
+    now = now or timezone.now()
+    branch_id = _tenant_key(branch) if branch else None
+    prices = plan['prices']
+    order_total = Decimal(str(order_total))
+    total_items = sum(item['quantity'] for item in items_data)
+
+    stackable_discount_total = Decimal("0.00")
+    best_non_stackable_discount = Decimal("0.00")
+    final_automatic_discount = Decimal("0.00")
+    typeDiscount = None
+    freeItems = []
+
+    for discount in plan['discounts']:
+        if not _is_active(discount, now, branch_id):
+            continue
+
+        current_discount_value = Decimal("0.00")
+        current_free_items = []
+        discount_type = discount['type']
+
+        for rule in discount['rules']:
+            # --- Volume Discount ---
+            if discount_type == 'volume':
+                if rule['min_items'] is not None and total_items >= rule['min_items']:
+                    if rule['is_percentage']:
+                        current_discount_value += order_total * (rule['max_discount_amount'] / Decimal("100"))
+                    else:
+                        current_discount_value += min(order_total, rule['max_discount_amount'])
+
+            # --- Combo Discount ---
+            elif discount_type == 'combo':
+                if rule['combo_size'] is not None and total_items >= rule['combo_size']:
+                    current_discount_value += min(order_total, rule['max_discount_amount'])
+
+            # --- BOGO Discount (Monetary Discount) ---
+            elif discount_type == 'bogo':
+                for item in items_data:
+                    menu_item_id = str(item['menu_item'])
+                    if (menu_item_id in rule['applicable_items'] and rule['buy_quantity']
+                            and item['quantity'] >= rule['buy_quantity']):
+                        total_free_quantity = (item['quantity'] // rule['buy_quantity']) * rule['get_quantity']
+                        if total_free_quantity > 0:
+                            current_free_items.append({menu_item_id: total_free_quantity})
+                            if menu_item_id in prices:
+                                current_discount_value += prices[menu_item_id] * Decimal(total_free_quantity)
+
+            # --- Free Item Discount (Monetary Discount + Free Item) ---
+            elif discount_type == 'freeItem':
+                for item in items_data:
+                    menu_item_id = str(item['menu_item'])
+                    if (menu_item_id in rule['applicable_items'] and rule['buy_quantity']
+                            and item['quantity'] >= rule['buy_quantity'] and rule['free_items']):
+                        sets_earned = item['quantity'] // rule['buy_quantity']
+                        if sets_earned > 0:
+                            free_item_id = rng.choice(rule['free_items'])
+                            total_free_quantity = sets_earned * rule['get_quantity']
+                            current_free_items.append({free_item_id: total_free_quantity})
+                            if free_item_id in prices:
+                                current_discount_value += prices[free_item_id] * Decimal(total_free_quantity)
+
+        if current_discount_value > 0:
+            if discount['is_stackable']:
+                stackable_discount_total += current_discount_value
+                freeItems.extend(current_free_items)
+            elif current_discount_value > best_non_stackable_discount:
+                best_non_stackable_discount = current_discount_value
+                final_automatic_discount = current_discount_value
+                if discount_type == 'freeItem':
+                    final_automatic_discount = Decimal("0.00")
+                typeDiscount = discount_type
+                freeItems = current_free_items
+
+    if stackable_discount_total > final_automatic_discount:
+        final_automatic_discount = stackable_discount_total
+        typeDiscount = 'stackable_money'
+
+    return final_automatic_discount, typeDiscount, freeItems
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from .models import Discount, DiscountRule
+from .engine import bump_plan_version
+from restaurant.menu.models import Menu
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
@@ -100,4 +102,30 @@ def menu_deleted_notification(sender, instance, **kwargs):
                 "message": f"Discount Rule with ID {instance.id} has been deleted"
             }
         }
-    )
\ No newline at end of file
+    )
+
+
+# --- Compiled discount plan invalidation ---
+
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+@receiver(post_save, sender=DiscountRule)
+@receiver(post_delete, sender=DiscountRule)
+def invalidate_discount_plan(sender, instance, **kwargs):
+    if instance.tenant_id:
+        bump_plan_version(instance.tenant_id)
+
+@receiver(m2m_changed, sender=Discount.branches.through)
+def invalidate_discount_plan_on_branches_change(sender, instance, action, **kwargs):
+    # ``instance`` is a Discount, or a Branch when edited from the reverse side
+    if action in ('post_add', 'post_remove', 'post_clear') and instance.tenant_id:
+        bump_plan_version(instance.tenant_id)
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def invalidate_discount_plan_on_menu_change(sender, instance, **kwargs):
+    # Plans snapshot the prices of the items their rules reference
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'price' not in update_fields:
+        return
+    bump_plan_version(instance.tenant_id)
@@ -1,6 +1,6 @@
 from celery import shared_task
-from .services import get_best_dishes_of_week, get_big_discount_items
+from restaurant.menu_availability.rankings import refresh_big_discounts
 
 @shared_task
 def update_big_discount_items():
-    get_big_discount_items()
\ No newline at end of file
+    return refresh_big_discounts()
@@ -1,3 +1,5 @@
+from decimal import Decimal
+from django.test import SimpleTestCase
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_api_key.models import APIKey
@@ -5,6 +7,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from accounts.models import User
 from .models import Discount, Order, Tenant, Branch,DiscountRule
 from restaurant.table.models import Table
+from .engine import evaluate_discount_plan
 
 class DiscountViewSetTestCase(APITestCase):
     def setUp(self):
@@ -107,3 +110,45 @@ class DiscountViewSetTestCase(APITestCase):
         response = self.client.post("/api/v1/discount/apply-discount/", data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data["detail"], "Order ID is required")
+
+
+class DiscountPlanEvaluationTestCase(SimpleTestCase):
+    def _plan(self, **overrides):
+        discount = {
+            'id': 'd1',
+            'type': 'bogo',
+            'priority': 1,
+            'is_stackable': False,
+            'is_global': True,
+            'branches': frozenset(),
+            'valid_from': None,
+            'valid_until': None,
+            'rules': [{
+                'min_items': None,
+                'combo_size': None,
+                'buy_quantity': 2,
+                'get_quantity': 1,
+                'is_percentage': False,
+                'max_discount_amount': Decimal("0"),
+                'applicable_items': frozenset({'m1'}),
+                'free_items': [],
+            }],
+        }
+        discount.update(overrides)
+        return {'tenant': 't1', 'discounts': [discount], 'prices': {'m1': Decimal("5.00")}}
+
+    def test_bogo_uses_compiled_prices(self):
+        amount, discount_type, free_items = evaluate_discount_plan(
+            self._plan(), [{'menu_item': 'm1', 'quantity': 4, 'price': 5.0}], 20
+        )
+        self.assertEqual(amount, Decimal("10.00"))
+        self.assertEqual(discount_type, 'bogo')
+        self.assertEqual(free_items, [{'m1': 2}])
+
+    def test_branch_scoped_discount_skipped_for_other_branch(self):
+        plan = self._plan(is_global=False, branches=frozenset({'b1'}))
+        amount, discount_type, _ = evaluate_discount_plan(
+            plan, [{'menu_item': 'm1', 'quantity': 4, 'price': 5.0}], 20, branch='b2'
+        )
+        self.assertEqual(amount, Decimal("0.00"))
+        self.assertIsNone(discount_type)
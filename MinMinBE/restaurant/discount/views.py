@@ -17,6 +17,7 @@ from .utils import apply_discounts
 from accounts.permissions import HasCustomAPIKey, IsAdminOrRestaurant, IsAdminRestaurantOrBranch
 from accounts.utils import get_user_branch, get_user_tenant
 from .services import get_big_discount_items
+from restaurant.menu_availability.rankings import ranking_params
 from restaurant.menu_availability.serializers import MenuAvailabilitySerializer
 
 
@@ -102,9 +103,14 @@ class DiscountViewSet(ModelViewSet):
     @action(detail=False, methods=['get'])
     def big_discount_items(self, request):
         """
-        API endpoint for retrieving menu items with the biggest discounts.
+        API endpoint for retrieving menu items with the biggest discounts,
+        globally or for one ``branch``, from the nightly ranking.
         """
-        discount_items = get_big_discount_items()
+        try:
+            branch, limit = ranking_params(request.query_params)
+        except ValueError:
+            return Response({'error': 'Invalid branch or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        discount_items = get_big_discount_items(limit, branch)
         serializer = MenuAvailabilitySerializer(discount_items, many=True,context={'request': request})
         return Response(serializer.data)
     
@@ -1,4 +1,5 @@
 from django.db import models
+from core.models import RatingAggregate
 from restaurant.tenant.models import Tenant
 from django.core.exceptions import ValidationError
 from minminbe.settings import MEDIA_ROOT
@@ -23,7 +24,7 @@ def tenant_image_path(instance, filename):
     return os.path.join(tenant_folder, filename)
 
 
-class Menu(models.Model):
+class Menu(RatingAggregate):
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
@@ -62,12 +63,6 @@ class Menu(models.Model):
             raise ValidationError("This menu cannot be deleted because it has related records.")
         return super().delete(using, keep_parents)
     
-    @property
-    def average_rating(self):
-        reviews = self.menu_feedbacks.all()
-        if reviews.exists():
-            return round(reviews.aggregate(models.Avg('overall_rating'))['overall_rating__avg'], 2)
-        return None
 
     @property
     def category(self):
@@ -0,0 +1,105 @@
+"""Bulk menu-price resolution for carts and orders.
+
+Resolving a cart costs at most one cache read and one ``values_list``
+query, however many lines it has. Each tenant's ``{menu_id: price}`` map
+is cached for a short TTL and dropped whenever one of its menus changes.
+"""
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+
+from .models import Menu
+
+PRICE_MAP_KEY = "menu_prices:{tenant_id}"
+PRICE_MAP_TIMEOUT = 60  # seconds
+
+
+@dataclass(frozen=True)
+class PricedLineItem:
+    """A cart line with the menu price captured at resolution time."""
+    menu_item: str
+    quantity: int
+    price: Decimal
+    remarks: Optional[str] = None
+
+    @property
+    def total(self) -> Decimal:
+        return self.price * self.quantity
+
+    def as_discount_item(self) -> dict:
+        """Shape expected by ``calculate_discount_from_data``."""
+        return {'menu_item': self.menu_item, 'quantity': self.quantity, 'price': float(self.price)}
+
+
+def _tenant_key(tenant):
+    return str(getattr(tenant, 'pk', tenant))
+
+
+def get_tenant_price_map(tenant) -> Dict[str, Decimal]:
+    """Return ``{menu_id: price}`` for every menu of ``tenant``."""
+    key = PRICE_MAP_KEY.format(tenant_id=_tenant_key(tenant))
+    prices = cache.get(key)
+    if prices is None:
+        prices = {
+            str(pk): price
+            for pk, price in Menu.objects.filter(tenant_id=_tenant_key(tenant)).values_list('id', 'price')
+        }
+        cache.set(key, prices, PRICE_MAP_TIMEOUT)
+    return prices
+
+
+def invalidate_tenant_price_map(tenant):
+    cache.delete(PRICE_MAP_KEY.format(tenant_id=_tenant_key(tenant)))
+
+
+def resolve_menu_prices(menu_item_ids: Iterable, tenant=None) -> Dict[str, Decimal]:
+    """
+    Return current prices for ``menu_item_ids``. Ids that do not exist are
+    left out of the result. The tenant price map is consulted first when
+    ``tenant`` is given; anything it does not cover is fetched in one query.
+    """
+    wanted = {str(item_id) for item_id in menu_item_ids}
+    prices = {}
+    if tenant:
+        tenant_prices = get_tenant_price_map(tenant)
+        prices = {item_id: tenant_prices[item_id] for item_id in wanted if item_id in tenant_prices}
+
+    missing = []
+    for item_id in wanted - prices.keys():
+        try:
+            missing.append(uuid.UUID(item_id))
+        except ValueError:
+            continue
+    if missing:
+        prices.update(
+            (str(pk), price)
+            for pk, price in Menu.objects.filter(id__in=missing).values_list('id', 'price')
+        )
+    return prices
+
+
+def price_line_items(items: Iterable[dict], tenant=None) -> List[PricedLineItem]:
+    """
+    Turn raw cart lines (``menu_item``, ``quantity`` and optional
+    ``remarks``) into priced line items.
+
+    Raises ``Menu.DoesNotExist`` naming the first unknown menu item.
+    """
+    items = list(items)
+    prices = resolve_menu_prices((getattr(i['menu_item'], 'pk', i['menu_item']) for i in items), tenant)
+
+    line_items = []
+    for item in items:
+        menu_item_id = str(getattr(item['menu_item'], 'pk', item['menu_item']))
+        if menu_item_id not in prices:
+            raise Menu.DoesNotExist(f"Menu item {menu_item_id} not found")
+        line_items.append(PricedLineItem(
+            menu_item=menu_item_id,
+            quantity=item['quantity'],
+            price=prices[menu_item_id],
+            remarks=item.get('remarks'),
+        ))
+    return line_items
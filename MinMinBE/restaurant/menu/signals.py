@@ -3,6 +3,7 @@ from django.dispatch import receiver
 from .models import Menu
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from .pricing import invalidate_tenant_price_map
 
 @receiver(post_save, sender=Menu)
 def menu_created_notification(sender, instance, created, **kwargs):
@@ -50,4 +51,8 @@ def menu_deleted_notification(sender, instance, **kwargs):
             }
         }
     )
-    
\ No newline at end of file
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def menu_price_map_invalidation(sender, instance, **kwargs):
+    invalidate_tenant_price_map(instance.tenant_id)
@@ -1,6 +1,6 @@
 from celery import shared_task
-from .services import get_best_dishes_of_week
+from restaurant.menu_availability.rankings import refresh_best_dishes
 
 @shared_task
 def update_best_dishes():
-    get_best_dishes_of_week()
\ No newline at end of file
+    return refresh_best_dishes()
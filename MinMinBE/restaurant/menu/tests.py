@@ -1,3 +1,5 @@
+from decimal import Decimal
+from django.test import SimpleTestCase
 from django.urls import reverse
 from rest_framework.test import APIClient, APITestCase
 from rest_framework_api_key.models import APIKey
@@ -10,6 +12,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 import json
 import os
 from django.conf import settings
+from .pricing import PricedLineItem
 
 class MenuViewSetTests(APITestCase):
     def setUp(self):
@@ -95,3 +98,10 @@ class MenuViewSetTests(APITestCase):
         response = self.client.delete(reverse('menu-detail', args=[self.menu.id]))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Menu.objects.filter(id=self.menu.id).exists())
+
+
+class PricedLineItemTestCase(SimpleTestCase):
+    def test_total_and_discount_shape(self):
+        line = PricedLineItem(menu_item='m1', quantity=3, price=Decimal("4.50"))
+        self.assertEqual(line.total, Decimal("13.50"))
+        self.assertEqual(line.as_discount_item(), {'menu_item': 'm1', 'quantity': 3, 'price': 4.5})
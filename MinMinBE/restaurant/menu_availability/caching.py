@@ -0,0 +1,26 @@
+"""Cache tags for menu availability data; see ``core.cache``."""
+from django.core.cache import cache
+
+from core.cache import invalidate_tags
+
+# Generation of every customer-facing availability list, whatever its filters
+MENU_AVAILABILITY_TAG = "menu_availability"
+
+
+def tenant_menu_tag(tenant_id):
+    return f"tenant:{tenant_id}:menu"
+
+
+def branch_menu_tag(branch_id):
+    return f"branch:{branch_id}:menu"
+
+
+def invalidate_menu_availability(tenant_id=None, branch_id=None):
+    """Invalidate cached availability lists touching ``tenant_id``/``branch_id``."""
+    invalidate_tags(
+        MENU_AVAILABILITY_TAG,
+        tenant_menu_tag(tenant_id) if tenant_id else None,
+        branch_menu_tag(branch_id) if branch_id else None,
+    )
+    # Action caches that are not tagged yet
+    cache.delete_many(["best_dishes", "recommended_items", "available_categories"])
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branch', '0001_initial'),
+        ('menu_availability', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuRanking',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('best_dish', 'Best dish of the week'), ('big_discount', 'Big discount')], max_length=20)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('discount_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('discount_rate', models.FloatField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now_add=True)),
+                ('availability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='menu_availability.menuavailability')),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='menu_rankings', to='branch.branch')),
+            ],
+            options={
+                'db_table': 'menu_ranking',
+                'indexes': [models.Index(fields=['kind', 'branch', 'rank'], name='menu_ranking_lookup_idx')],
+            },
+        ),
+    ]
@@ -30,4 +30,40 @@ class MenuAvailability(models.Model):
         # ]
 
     def __str__(self):
-        return f"{self.menu_item.name} at {self.branch.address} - Available: {self.is_available}"
\ No newline at end of file
+        return f"{self.menu_item.name} at {self.branch.address} - Available: {self.is_available}"
+
+
+class MenuRanking(models.Model):
+    """
+    A precomputed position of a menu availability in a home-screen
+    carousel, rebuilt nightly by ``restaurant.menu_availability.rankings``.
+    Rows without a ``branch`` make up the global ranking.
+    """
+    KIND_BEST_DISH = 'best_dish'
+    KIND_BIG_DISCOUNT = 'big_discount'
+    KIND_CHOICES = [
+        (KIND_BEST_DISH, 'Best dish of the week'),
+        (KIND_BIG_DISCOUNT, 'Big discount'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True, related_name='menu_rankings')
+    availability = models.ForeignKey(MenuAvailability, on_delete=models.CASCADE, related_name='rankings')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # Best dishes: units ordered over the ranking window
+    order_count = models.PositiveIntegerField(default=0)
+    # Big discounts: saving on a qualifying purchase and its share of the price
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    discount_rate = models.FloatField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'menu_ranking'
+        indexes = [
+            models.Index(fields=['kind', 'branch', 'rank'], name='menu_ranking_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.rank}: {self.availability_id}"
@@ -0,0 +1,217 @@
+"""
+Materialized home-screen rankings.
+
+The nightly beat jobs rebuild ``MenuRanking`` for one kind at a time:
+
+* best dishes of the week score each available branch menu by the units
+  ordered there over the last week times the menu's average rating;
+* big discounts score each available branch menu by the share of its
+  price that the best active discount rule covering it takes off.
+
+Each kind is ranked per branch and globally (one row per menu, through
+its best branch) and replaced in a single transaction, so readers see
+either the old or the new ranking. Endpoints only read ranked rows, one
+indexed query per carousel.
+"""
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from customer.order.models import OrderItem
+from restaurant.discount.models import Discount
+from restaurant.menu.models import Menu
+from .models import MenuAvailability, MenuRanking
+
+RANKING_SIZE = 20
+BEST_DISH_WINDOW = timedelta(days=7)
+# Stands in for the rating of menus nobody has rated yet
+NEUTRAL_RATING = 3.0
+
+
+def _replace_ranking(kind, candidates):
+    """
+    Rank ``candidates`` (dicts with ``availability``, ``branch``, ``menu``
+    and ``score`` plus extra ``MenuRanking`` fields) and store them as the
+    ``kind`` ranking. Returns the number of rows written.
+    """
+    ordered = sorted(candidates, key=lambda row: (-row['score'], str(row['availability'])))
+    per_branch = {}
+    global_rows, global_menus = [], set()
+    for row in ordered:
+        branch_rows = per_branch.setdefault(row['branch'], [])
+        if len(branch_rows) < RANKING_SIZE:
+            branch_rows.append(row)
+        if len(global_rows) < RANKING_SIZE and row['menu'] not in global_menus:
+            global_menus.add(row['menu'])
+            global_rows.append(row)
+
+    extra_fields = ('order_count', 'discount_amount', 'discount_rate')
+    rankings = [
+        MenuRanking(
+            kind=kind, branch_id=branch_id, availability_id=row['availability'], rank=rank,
+            score=row['score'], **{field: row[field] for field in extra_fields if field in row},
+        )
+        for branch_id, rows in [(None, global_rows), *per_branch.items()]
+        for rank, row in enumerate(rows, start=1)
+    ]
+    with transaction.atomic():
+        MenuRanking.objects.filter(kind=kind).delete()
+        MenuRanking.objects.bulk_create(rankings, batch_size=500)
+    return len(rankings)
+
+
+def _availabilities(menu_ids):
+    """``{(branch id, menu id): availability id}`` of the available menus among ``menu_ids``."""
+    return {
+        (branch_id, menu_id): availability_id
+        for availability_id, branch_id, menu_id in MenuAvailability.objects.filter(
+            menu_item_id__in=menu_ids, is_available=True
+        ).values_list('id', 'branch_id', 'menu_item_id')
+    }
+
+
+def refresh_best_dishes(now=None):
+    """Rebuild the best-dishes-of-the-week ranking. Returns the number of rows written."""
+    since = (now or timezone.now()) - BEST_DISH_WINDOW
+    sales = (
+        OrderItem.objects.filter(order__created_at__gte=since)
+        .exclude(order__status='cancelled')
+        .values('order__branch_id', 'menu_item_id')
+        .annotate(
+            units=Sum(Coalesce('quantity', 1)),
+            rating=F('menu_item__rating_avg'),
+        )
+    )
+    sales = list(sales)
+    available = _availabilities({row['menu_item_id'] for row in sales})
+
+    candidates = []
+    for row in sales:
+        key = (row['order__branch_id'], row['menu_item_id'])
+        if key not in available or not row['units']:
+            continue
+        candidates.append({
+            'availability': available[key],
+            'branch': key[0],
+            'menu': key[1],
+            'score': row['units'] * (row['rating'] or NEUTRAL_RATING),
+            'order_count': row['units'],
+        })
+    return _replace_ranking(MenuRanking.KIND_BEST_DISH, candidates)
+
+
+def effective_discount(discount_type, rule, price, free_item_prices=()):
+    """
+    ``(amount, rate)`` a qualifying purchase of a menu priced ``price``
+    saves under ``rule``, mirroring ``restaurant.discount.engine``, or None
+    when the rule takes nothing off.
+    """
+    if not price or price <= 0:
+        return None
+    if discount_type in ('bogo', 'freeItem'):
+        if not rule.buy_quantity or not rule.get_quantity:
+            return None
+        base = price * rule.buy_quantity
+        if discount_type == 'bogo':
+            amount = price * rule.get_quantity
+        else:
+            if not free_item_prices:
+                return None
+            # The free item is drawn at random, so count its average price
+            amount = sum(free_item_prices) / len(free_item_prices) * rule.get_quantity
+    elif discount_type in ('volume', 'combo'):
+        # The engine skips volume rules without min_items and combo rules without combo_size
+        quantity = rule.min_items if discount_type == 'volume' else rule.combo_size
+        if quantity is None:
+            return None
+        base = price * max(quantity, 1)
+        if discount_type == 'volume' and rule.is_percentage:
+            amount = base * rule.max_discount_amount / Decimal('100')
+        else:
+            amount = min(base, rule.max_discount_amount)
+    else:
+        return None
+    amount = min(amount, base)
+    if amount <= 0:
+        return None
+    return amount.quantize(Decimal('0.01')), float(amount / base)
+
+
+def refresh_big_discounts(now=None):
+    """Rebuild the biggest-discount ranking. Returns the number of rows written."""
+    now = now or timezone.now()
+    discounts = list(
+        Discount.objects.filter(valid_from__lte=now)
+        .filter(Q(valid_until__gte=now) | Q(valid_until__isnull=True))
+        .prefetch_related('discount_discount_rules', 'branches')
+    )
+
+    referenced = set()
+    for discount in discounts:
+        for rule in discount.discount_discount_rules.all():
+            referenced.update(str(item) for item in rule.applicable_items or [])
+            referenced.update(str(item) for item in rule.free_items or [])
+    valid_ids = []
+    for item_id in referenced:
+        try:
+            valid_ids.append(uuid.UUID(item_id))
+        except ValueError:
+            continue
+    prices = {
+        str(menu_id): price
+        for menu_id, price in Menu.objects.filter(id__in=valid_ids).values_list('id', 'price')
+    }
+
+    # menu id -> [(branch ids, or None for every branch, (amount, rate))]
+    offers = {}
+    for discount in discounts:
+        branch_ids = None if discount.is_global else {branch.pk for branch in discount.branches.all()}
+        for rule in discount.discount_discount_rules.all():
+            free_prices = [prices[str(item)] for item in rule.free_items or [] if str(item) in prices]
+            for item in rule.applicable_items or []:
+                saving = effective_discount(discount.type, rule, prices.get(str(item)), free_prices)
+                if saving:
+                    offers.setdefault(str(item), []).append((branch_ids, saving))
+
+    available = _availabilities([uuid.UUID(menu_id) for menu_id in offers])
+    best = {}
+    for (branch_id, menu_id), availability_id in available.items():
+        for branch_ids, (amount, rate) in offers[str(menu_id)]:
+            if branch_ids is not None and branch_id not in branch_ids:
+                continue
+            if availability_id not in best or rate > best[availability_id]['discount_rate']:
+                best[availability_id] = {
+                    'availability': availability_id,
+                    'branch': branch_id,
+                    'menu': menu_id,
+                    'score': rate,
+                    'discount_amount': amount,
+                    'discount_rate': rate,
+                }
+    return _replace_ranking(MenuRanking.KIND_BIG_DISCOUNT, best.values())
+
+
+def ranked_availabilities(kind, branch=None, limit=RANKING_SIZE):
+    """The ranked, still available menu availabilities of ``kind`` (global without ``branch``)."""
+    rows = (
+        MenuRanking.objects.filter(kind=kind, branch=branch, availability__is_available=True)
+        .select_related('availability__menu_item__tenant', 'availability__branch__tenant__admin')
+        .order_by('rank')[:limit]
+    )
+    return [row.availability for row in rows]
+
+
+def ranking_params(query_params, default_limit=5):
+    """``(branch id or None, limit)`` of a carousel request; raises ValueError when malformed."""
+    branch = query_params.get('branch') or None
+    if branch is not None:
+        branch = uuid.UUID(branch)
+    limit = int(query_params.get('limit', default_limit))
+    if limit < 1:
+        raise ValueError(limit)
+    return branch, min(limit, RANKING_SIZE)
@@ -1,3 +1,4 @@
+from django.db import models
 from rest_framework import serializers
 from .models import MenuAvailability
 from restaurant.branch.models import Branch
@@ -6,12 +7,60 @@ from restaurant.menu.models import Menu
 from feed.serializers import PostSerializer
 from customer.feedback.serializers import FeedbackSerializer
 
+BATCH_CONTEXT_KEY = 'menu_availability_batch'
+
+
+class MenuAvailabilityListSerializer(serializers.ListSerializer):
+    """
+    Precomputes the per-row lookups of ``MenuAvailabilitySerializer`` for a
+    whole page in a couple of grouped queries and hands them to the child
+    serializer through the context.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        context = self.context
+        context[BATCH_CONTEXT_KEY] = self.build_batch(items)
+        try:
+            return super().to_representation(items)
+        finally:
+            context.pop(BATCH_CONTEXT_KEY, None)
+
+    def build_batch(self, items):
+        menu_ids = {item.menu_item_id for item in items}
+
+        menu_branches = {}
+        for menu_id, branch_id in MenuAvailability.objects.filter(
+            menu_item_id__in=menu_ids
+        ).values_list('menu_item_id', 'branch_id'):
+            menu_branches.setdefault(menu_id, []).append(branch_id)
+
+        # ``is_global`` compares against the branch count of the requesting user's tenant
+        tenant_branch_count = None
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is not None and user.user_type in ['admin', 'restaurant']:
+            if Tenant.objects.filter(admin=user).exists():
+                tenant_branch_count = Branch.objects.filter(tenant__admin=user).count()
+
+        return {
+            'menu_branches': menu_branches,
+            'tenant_branch_count': tenant_branch_count,
+            # Tenant payloads (with nested posts and feedbacks) are shared by rows of the same tenant
+            'tenant_payloads': {},
+        }
+
+
 class MenuAvailabilitySerializer(serializers.ModelSerializer):
     menu_item = serializers.PrimaryKeyRelatedField(queryset=Menu.objects.all())
     branch = serializers.PrimaryKeyRelatedField(queryset=Branch.objects.all())
     class Meta:
         model = MenuAvailability
         fields = ['id', 'branch', 'menu_item', 'is_available', 'special_notes', 'updated_at']
+        list_serializer_class = MenuAvailabilityListSerializer
+
+    def _get_batch(self):
+        return self.context.get(BATCH_CONTEXT_KEY)
 
     def get_branch(self, obj):
         distance_km = None
@@ -36,24 +85,40 @@ class MenuAvailabilitySerializer(serializers.ModelSerializer):
         return {
             'id': obj.branch.id,
             'address': obj.branch.address,
-            'tenant': {
-                'id': obj.branch.tenant.id,
-                'restaurant_name': obj.branch.tenant.restaurant_name,
-                'CHAPA_API_KEY': obj.branch.tenant.CHAPA_API_KEY,
-                'CHAPA_PUBLIC_KEY': obj.branch.tenant.CHAPA_PUBLIC_KEY,
-                'tax': obj.branch.tenant.tax,
-                'service_charge': obj.branch.tenant.service_charge,
-                'average_rating': obj.branch.tenant.average_rating,
-                'image': self.get_tenant_image_url(obj.branch.tenant),
-                'profile': obj.branch.tenant.profile,
-                'posts': PostSerializer(posts, many=True, context=self.context).data,
-                'feedbacks': FeedbackSerializer(feedbacks, many=True, context=self.context).data,
-            },
+            'tenant': self.get_branch_tenant(tenant, posts, feedbacks),
             'distance_km': distance_km,
             'location': location_payload,
         }
+
+    def get_branch_tenant(self, tenant, posts, feedbacks):
+        batch = self._get_batch()
+        if batch is not None and tenant.id in batch['tenant_payloads']:
+            return batch['tenant_payloads'][tenant.id]
+
+        payload = {
+            'id': tenant.id,
+            'restaurant_name': tenant.restaurant_name,
+            'CHAPA_API_KEY': tenant.CHAPA_API_KEY,
+            'CHAPA_PUBLIC_KEY': tenant.CHAPA_PUBLIC_KEY,
+            'tax': tenant.tax,
+            'service_charge': tenant.service_charge,
+            'average_rating': tenant.average_rating,
+            'image': self.get_tenant_image_url(tenant),
+            'profile': tenant.profile,
+            'posts': PostSerializer(posts, many=True, context=self.context).data,
+            'feedbacks': FeedbackSerializer(feedbacks, many=True, context=self.context).data,
+        }
+        if batch is not None:
+            batch['tenant_payloads'][tenant.id] = payload
+        return payload
     
     def get_is_global(self, obj):
+        batch = self._get_batch()
+        if batch is not None:
+            if batch['tenant_branch_count'] is None:
+                return False
+            return batch['tenant_branch_count'] == len(batch['menu_branches'].get(obj.id, []))
+
         user = self.context['request'].user
         if user.user_type in ['admin', 'restaurant']:
             tenant = Tenant.objects.get(admin=user)
@@ -61,7 +126,11 @@ class MenuAvailabilitySerializer(serializers.ModelSerializer):
         return False
     
     def get_branches(self, obj):
+        batch = self._get_batch()
+        if batch is not None:
+            return batch['menu_branches'].get(obj.id, [])
         return MenuAvailability.objects.filter(menu_item=obj).values_list('branch_id', flat=True)
+
     
     def get_menu_item(self, obj):
         return {
@@ -1,12 +1,22 @@
 from django.test import TestCase
 from rest_framework import status
-from restaurant.menu_availability.models import MenuAvailability, Branch, Menu
+from restaurant.menu_availability.models import MenuAvailability, MenuRanking, Branch, Menu
 from rest_framework.test import APIClient
 from rest_framework_api_key.models import APIKey
 from accounts.models import User
 from restaurant.tenant.models import Tenant
 from rest_framework_simplejwt.tokens import RefreshToken
+from types import SimpleNamespace
 from uuid import UUID
+from feed.models import Post
+from core.cache import tagged_key
+from restaurant.menu_availability.caching import MENU_AVAILABILITY_TAG, invalidate_menu_availability, tenant_menu_tag
+from core.geo import geohash_center, geohash_encode, parse_location
+from restaurant.menu_availability.serializers import MenuAvailabilitySerializer
+from customer.order.models import Order, OrderItem
+from restaurant.discount.models import Discount, DiscountRule
+from restaurant.menu_availability.rankings import ranked_availabilities, refresh_best_dishes, refresh_big_discounts
+from restaurant.table.models import Table
 
 
 class MenuAvailabilityViewTest(TestCase):
@@ -52,6 +62,45 @@ class MenuAvailabilityViewTest(TestCase):
         self.key = self.prefix+'.'+key  # Full key (prefix.key)
         self.client.credentials(HTTP_X_API_KEY=self.key, HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
 
+    def test_list_serializer_matches_single_serialization(self):
+        request = SimpleNamespace(user=self.admin_user, build_absolute_uri=lambda url: url)
+        single = MenuAvailabilitySerializer(self.menu_availability, context={'request': request}).data
+        batched = MenuAvailabilitySerializer(
+            MenuAvailability.objects.all(), many=True, context={'request': request}
+        ).data[0]
+        self.assertEqual(batched['menu_item']['is_global'], single['menu_item']['is_global'])
+        self.assertEqual(list(batched['menu_item']['branches']), list(single['menu_item']['branches']))
+        self.assertEqual(batched['menu_item']['average_rating'], single['menu_item']['average_rating'])
+        self.assertEqual(batched['branch']['tenant']['average_rating'], single['branch']['tenant']['average_rating'])
+
+    def test_branch_list_reflects_menu_edits(self):
+        customer = User.objects.create_user(email="customer@test.com", password="password", user_type="customer")
+        self.authenticate(customer)
+        url = f"/api/v1/menu-availability/?branch={self.branch.id}"
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['menu_item']['name'], "Test Menu Item")
+
+        self.menu_item.name = "Renamed Item"
+        self.menu_item.save()
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['menu_item']['name'], "Renamed Item")
+
+    def test_shared_list_keeps_like_state_per_customer(self):
+        post = Post.objects.create(user=self.admin_user, image="posts/test.jpg", caption="Post", location="Addis")
+        fan = User.objects.create_user(email="fan@test.com", password="password", user_type="customer")
+        other = User.objects.create_user(email="other@test.com", password="password", user_type="customer")
+        post.likes.add(fan)
+
+        self.authenticate(fan)
+        data = self.client.get("/api/v1/menu-availability/").json()
+        self.assertEqual(data['results'][0]['branch']['tenant']['posts'][0]['id'], str(post.pk))
+        self.assertEqual(data['viewer_state'], {'liked': [str(post.pk)], 'bookmarked': []})
+        # Served from the list cached for the fan
+        self.authenticate(other)
+        data = self.client.get("/api/v1/menu-availability/").json()
+        self.assertEqual(data['results'][0]['branch']['tenant']['posts'][0]['id'], str(post.pk))
+        self.assertEqual(data['viewer_state'], {'liked': [], 'bookmarked': []})
+
     def test_get_menu_availability_list(self):
         """Test retrieving a list of MenuAvailability."""
         self.authenticate(self.admin_user)
@@ -92,3 +141,89 @@ class MenuAvailabilityViewTest(TestCase):
         response = self.client.delete(f"/api/v1/menu-availability/{self.menu_availability.id}/")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(MenuAvailability.objects.filter(id=self.menu_availability.id).exists())
+
+
+class MenuAvailabilityCacheTagTest(TestCase):
+    def test_invalidation_moves_tagged_keys(self):
+        tenant_tags = [MENU_AVAILABILITY_TAG, tenant_menu_tag("t1")]
+        before = tagged_key("test", tenant_tags, "page=1")
+        other_before = tagged_key("test", [tenant_menu_tag("t2")])
+
+        invalidate_menu_availability(tenant_id="t1", branch_id="b1")
+
+        self.assertNotEqual(tagged_key("test", tenant_tags, "page=1"), before)
+        # Tags of other tenants keep their generation
+        self.assertEqual(tagged_key("test", [tenant_menu_tag("t2")]), other_before)
+
+
+class GeoCellTest(TestCase):
+    def test_nearby_locations_share_a_cell(self):
+        # Two points ~100m apart in Addis Ababa
+        cell = geohash_encode(9.0054, 38.7636)
+        self.assertEqual(len(cell), 6)
+        self.assertEqual(geohash_encode(9.0060, 38.7640), cell)
+        latitude, longitude = geohash_center(cell)
+        self.assertAlmostEqual(latitude, 9.0054, places=2)
+        self.assertAlmostEqual(longitude, 38.7636, places=2)
+
+        self.assertEqual(parse_location("9.0054,38.7636"), (9.0054, 38.7636))
+        self.assertIsNone(parse_location("null,None"))
+        self.assertIsNone(parse_location(None))
+
+
+class MenuRankingTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email="customer@test.com", password="password", user_type="customer"
+        )
+        owner = User.objects.create_user(email="owner@test.com", password="password", user_type="restaurant")
+        self.tenant = Tenant.objects.create(restaurant_name="Ranked Tenant", admin=owner)
+        self.branch = Branch.objects.create(address="1 Ranking Rd", tenant=self.tenant)
+        self.table = Table.objects.create(branch=self.branch)
+        self.menus = [
+            Menu.objects.create(name=name, tenant=self.tenant, image="images/dish.jpg",
+                                description=name, price=price)
+            for name, price in (("Tibs", 100), ("Shiro", 50))
+        ]
+        for menu in self.menus:
+            MenuAvailability.objects.create(branch=self.branch, menu_item=menu, is_available=True)
+
+    def test_best_dishes_rank_by_weekly_orders(self):
+        order = Order.objects.create(tenant=self.tenant, branch=self.branch, table=self.table, customer=self.customer)
+        OrderItem.objects.create(order=order, menu_item=self.menus[0], quantity=1, price=100)
+        OrderItem.objects.create(order=order, menu_item=self.menus[1], quantity=4, price=50)
+
+        refresh_best_dishes()
+        ranked = ranked_availabilities(MenuRanking.KIND_BEST_DISH)
+        self.assertEqual([row.menu_item.name for row in ranked], ["Shiro", "Tibs"])
+        self.assertEqual(
+            [row.menu_item.name for row in ranked_availabilities(MenuRanking.KIND_BEST_DISH, self.branch.id)],
+            ["Shiro", "Tibs"],
+        )
+
+    def test_big_discounts_rank_by_effective_rate(self):
+        discount = Discount.objects.create(tenant=self.tenant, type='bogo')
+        # Two Tibs earn one free (half the price paid), one Shiro earns another (all of it)
+        DiscountRule.objects.create(tenant=self.tenant, discount_id=discount, buy_quantity=2, get_quantity=1,
+                                    applicable_items=[str(self.menus[0].id)])
+        DiscountRule.objects.create(tenant=self.tenant, discount_id=discount, buy_quantity=1, get_quantity=1,
+                                    applicable_items=[str(self.menus[1].id)])
+
+        refresh_big_discounts()
+        ranking = list(MenuRanking.objects.filter(kind=MenuRanking.KIND_BIG_DISCOUNT, branch=None).order_by('rank'))
+        self.assertEqual([row.discount_rate for row in ranking], [1.0, 0.5])
+        self.assertEqual(
+            [row.menu_item.name for row in ranked_availabilities(MenuRanking.KIND_BIG_DISCOUNT)], ["Shiro", "Tibs"]
+        )
+
+    def test_volume_rules_without_min_items_are_not_ranked(self):
+        discount = Discount.objects.create(tenant=self.tenant, type='volume')
+        # The engine never applies the Tibs rule; three Shiro take 10% off
+        DiscountRule.objects.create(tenant=self.tenant, discount_id=discount, is_percentage=True,
+                                    max_discount_amount=50, applicable_items=[str(self.menus[0].id)])
+        DiscountRule.objects.create(tenant=self.tenant, discount_id=discount, min_items=3, is_percentage=True,
+                                    max_discount_amount=10, applicable_items=[str(self.menus[1].id)])
+
+        refresh_big_discounts()
+        ranking = MenuRanking.objects.filter(kind=MenuRanking.KIND_BIG_DISCOUNT, branch=None)
+        self.assertEqual([(row.availability.menu_item.name, row.discount_rate) for row in ranking], [("Shiro", 0.1)])
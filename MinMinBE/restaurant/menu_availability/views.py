@@ -1,24 +1,35 @@
+import hashlib
 import json
+import uuid
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.response import Response
 from django.db.models import Prefetch, Max
 from .models import MenuAvailability # Assuming your models are in the current app
+from restaurant.branch.models import Branch
 from .serializers import MenuAvailabilitySerializer
 from accounts.permissions import HasCustomAPIKey # Assuming this is correctly implemented
-from django.contrib.gis.geos import Point
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.gis.db.models.functions import Distance
 from rest_framework.permissions import IsAuthenticated
-import uuid
 from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
-from core.redis_client import redis_client # Your existing Redis client (assuming it's a django-redis client)
 from .menuavailability_filter import MenuAvailabilityFilter # Your existing filter
 from .services import get_best_dishes_of_week, get_recommended_items # Your existing services
+from .rankings import ranking_params
+from restaurant.related_menu.recommendations import available_menus, ordered_together
+from django.shortcuts import get_object_or_404
 from feed.models import Post # Assuming Post model is in 'feed' app
 from customer.feedback.models import Feedback # Assuming Feedback model is in 'customer.feedback' app
 from accounts.utils import get_user_branch, get_user_tenant
+from .caching import (
+    MENU_AVAILABILITY_TAG, branch_menu_tag, invalidate_menu_availability, tenant_menu_tag,
+)
+from core.cache import get_tagged, tagged_key
+from feed.serializers import SHARED_PAYLOAD_CONTEXT_KEY, viewer_engagement
+from core.location import user_location
 
 # Caching imports
 from django.core.cache import cache 
@@ -27,7 +38,6 @@ from django.views.decorators.cache import cache_page
 
 # Define cache timeouts
 CACHE_TIMEOUT_LIST_QS_SECONDS = 60 * 5 # 5 minutes for main queryset
-CACHE_TIMEOUT_STATIC_ACTIONS_SECONDS = 60 * 60 * 24 # 24 hours for best dishes/recommended
 CACHE_TIMEOUT_CATEGORIES_SECONDS = 60 * 60 # 1 hour for categories
 
 class MenuAvailabilityViewPagination(PageNumberPagination):
@@ -58,58 +68,29 @@ class MenuAvailabilityView(ModelViewSet):
         base_queryset = MenuAvailability.objects.all()
 
         if user.user_type == 'customer':
-            # --- Customer-specific QuerySet Logic with Caching ---
-            user_location_str = redis_client.get(str(user.id)) # Ensure user.id is stringified here if it's a UUID
-
-            cache_key_parts = [
-                f"menu_availability_qs_customer:{str(user.id)}", # Ensure user.id is a string
-                f"loc:{user_location_str or 'none'}",
-            ]
-            
-            # Incorporate filterset parameters into the cache key
-            filter_params = self.request.query_params.dict()
-            filter_params.pop('page', None)
-            filter_params.pop('page_size', None)
-            
-            if filter_params:
-                class UUIDEncoder(json.JSONEncoder):
-                    def default(self, obj):
-                        if isinstance(obj, uuid.UUID):
-                            return str(obj)
-                        return json.JSONEncoder.default(self, obj)
-
-                sorted_filter_params = json.dumps(sorted(filter_params.items()), cls=UUIDEncoder)
-                cache_key_parts.append(f"filters:{sorted_filter_params}")
-            
-            
-
-            # If not in cache, build the queryset from scratch
+            # --- Customer-specific QuerySet Logic (responses are cached in ``list``) ---
             queryset = base_queryset.filter(is_available=True).select_related(
-                'menu_item', 'branch', 'branch__tenant', 'branch__tenant__admin'
+                'menu_item', 'menu_item__tenant', 'branch', 'branch__tenant', 'branch__tenant__admin'
             ).prefetch_related(
                 Prefetch(
                     'branch__tenant__admin__posts',
-                    queryset=Post.objects.order_by('-time_ago')[:10],
+                    queryset=Post.objects.with_engagement().order_by('-time_ago')[:10],
                     to_attr='prefetched_posts'
                 ),
                 Prefetch(
                     'branch__tenant__restaurant_feedbacks',
-                    queryset=Feedback.objects.order_by('-created_at')[:10],
+                    queryset=Feedback.objects.select_related(
+                        'customer', 'order__table', 'order__branch', 'menu', 'restaurant'
+                    ).order_by('-created_at')[:10],
                     to_attr='prefetched_feedbacks'
                 )
             ).distinct()
 
-            # Apply user location distance annotation if available and valid
-            if user_location_str:
-                try:
-                    latitude_str, longitude_str = user_location_str.split(',')
-                    if latitude_str not in ('null', 'None') and longitude_str not in ('null', 'None'):
-                        latitude = float(latitude_str)
-                        longitude = float(longitude_str)
-                        user_location_point = Point(longitude, latitude, srid=4326)
-                        queryset = queryset.annotate(distance=Distance('branch__location', user_location_point))
-                except (ValueError, TypeError):
-                    pass
+            # Distances are measured from the centre of the customer's geo cell,
+            # so every customer in the cell can share the cached response
+            location = user_location(user)
+            if location:
+                queryset = queryset.annotate(distance=Distance('branch__location', location.cell_point))
 
             return queryset.order_by('-created_at')
             
@@ -133,30 +114,107 @@ class MenuAvailabilityView(ModelViewSet):
                     latest_per_menu = branch_availabilities.values('menu_item').annotate(latest=Max('created_at'))
                     queryset = branch_availabilities.filter(created_at__in=[item['latest'] for item in latest_per_menu])
 
-            queryset = queryset.select_related('menu_item', 'branch').order_by('-created_at')
+            queryset = queryset.select_related(
+                'menu_item', 'menu_item__tenant', 'branch', 'branch__tenant', 'branch__tenant__admin'
+            ).order_by('-created_at')
             return queryset
 
+    def _get_customer_cell(self):
+        """Geohash cell of the customer's last known location, or None."""
+        if not hasattr(self, '_customer_cell'):
+            location = user_location(self.request.user)
+            self._customer_cell = location.cell if location else None
+        return self._customer_cell
+
+    def _branch_tenant_id(self, branch_id):
+        try:
+            uuid.UUID(str(branch_id))
+        except ValueError:
+            return None
+        return Branch.objects.filter(pk=branch_id).values_list('tenant_id', flat=True).first()
+
+    def _get_list_cache_key(self, request):
+        """
+        Cache key and tags of a customer list response. Lists filtered to a
+        tenant or branch depend only on that tenant's or branch's tag; the
+        rest depend on the global availability tag. Branch lists also carry
+        their tenant's tag, which menu, post and feedback changes bump.
+        """
+        params = request.query_params
+        tenant_ids = set()
+        tags = []
+        if params.get('tenant'):
+            tenant_ids.add(params['tenant'])
+        if params.get('branch'):
+            tags.append(branch_menu_tag(params['branch']))
+            tenant_id = self._branch_tenant_id(params['branch'])
+            if tenant_id:
+                tenant_ids.add(str(tenant_id))
+        tags.extend(tenant_menu_tag(tenant_id) for tenant_id in sorted(tenant_ids))
+        if not tags:
+            tags.append(MENU_AVAILABILITY_TAG)
+
+        variant = json.dumps({
+            'params': sorted(params.lists()),
+            # Image URLs are absolute, so the host is part of the response
+            'base': request.build_absolute_uri('/'),
+        })
+        digest = hashlib.md5(variant.encode()).hexdigest()
+        key = tagged_key("menu_availability_list:v2", tags, self._get_customer_cell() or 'none', digest)
+        return key, tags
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        shared_post_ids = getattr(self, '_shared_post_ids', None)
+        if shared_post_ids is not None:
+            # The rendered list is shared by every customer of the cell
+            context[SHARED_PAYLOAD_CONTEXT_KEY] = shared_post_ids
+        return context
+
+    def list(self, request, *args, **kwargs):
+        if request.user.user_type != 'customer':
+            return super().list(request, *args, **kwargs)
+
+        # Customer lists are shared per geo cell, filters and page and kept as
+        # rendered JSON, next to the ids of the posts embedded in them
+        key, tags = self._get_list_cache_key(request)
+        cached = get_tagged(key, tags)
+        if cached is None:
+            self._shared_post_ids = set()
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = (JSONRenderer().render(response.data), [str(pk) for pk in self._shared_post_ids])
+            cache.set(key, cached, CACHE_TIMEOUT_LIST_QS_SECONDS)
+        payload, post_ids = cached
+        return HttpResponse(
+            payload[:-1] + b',"viewer_state":' + self._viewer_state(post_ids, request.user) + b'}',
+            content_type='application/json',
+        )
+
+    def _viewer_state(self, post_ids, user):
+        """
+        Rendered ids of the embedded posts ``user`` liked and bookmarked.
+        Their ``is_liked``/``is_bookmarked`` flags in the shared payload are
+        always false.
+        """
+        liked, bookmarked = viewer_engagement(user, post_ids)
+        return JSONRenderer().render({
+            'liked': sorted(str(pk) for pk in liked),
+            'bookmarked': sorted(str(pk) for pk in bookmarked),
+        })
+
     # --- Cache Invalidation Helpers ---
     def invalidate_menu_availability_cache(self, instance=None):
         """
-        Invalidates relevant MenuAvailability caches.
-        More granular invalidation based on instance properties can be added.
+        Invalidates MenuAvailability caches by bumping the tags of the
+        instance's tenant and branch (O(1), no key scans).
         """
-        # Clear all user-specific queryset caches
-        # For simplicity, we clear all 'menu_availability_qs_customer:*' keys.
-        # In a very high-traffic system, you might refine this to only clear
-        # caches affected by the specific instance's change (e.g., specific branch's items).
-        
-        # Note: 'scan_iter' is efficient for finding keys matching a pattern
-        # This will iterate and delete keys related to all customer querysets
-        for key in redis_client.scan_iter("menu_availability_qs_customer:*"):
-            redis_client.delete(key)
-        
-        # Invalidate specific action caches
-        cache.delete("best_dishes")
-        cache.delete("recommended_items")
-        cache.delete("available_categories")
-        print(f"Cache invalidated for MenuAvailability and related actions.")
+        branch = getattr(instance, 'branch', None)
+        invalidate_menu_availability(
+            tenant_id=branch.tenant_id if branch else None,
+            branch_id=branch.id if branch else None,
+        )
 
     # --- Override DRF methods to trigger cache invalidation ---
     def perform_create(self, serializer):
@@ -175,24 +233,47 @@ class MenuAvailabilityView(ModelViewSet):
         self.invalidate_menu_availability_cache(instance)
 
     # --- Action specific endpoints with method decorators for caching ---
-    @method_decorator(cache_page(CACHE_TIMEOUT_STATIC_ACTIONS_SECONDS, key_prefix="best_dishes"))
     @action(detail=False, methods=['get'])
     def best_dishes_of_week(self, request):
         """
-        API endpoint for retrieving the best dishes of the week.
+        API endpoint for retrieving the best dishes of the week, globally or
+        for one ``branch``, from the nightly ranking.
         """
-        best_dishes = get_best_dishes_of_week() # Assuming this service handles its own data fetching/caching
+        try:
+            branch, limit = ranking_params(request.query_params)
+        except ValueError:
+            return Response({'error': 'Invalid branch or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        best_dishes = get_best_dishes_of_week(limit, branch)
         serializer = self.get_serializer(best_dishes, many=True)
         return Response(serializer.data)
 
-    @method_decorator(cache_page(CACHE_TIMEOUT_STATIC_ACTIONS_SECONDS, key_prefix="recommended_items"))
     @action(detail=False, methods=['get'])
     def recommended_items(self, request):
         """
-        API endpoint for retrieving recommended menu items (fake loading).
+        API endpoint for retrieving menu items recommended to the customer
+        from what is ordered together with their recent orders.
+        """
+        try:
+            branch, limit = ranking_params(request.query_params)
+        except ValueError:
+            return Response({'error': 'Invalid branch or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        recommended = get_recommended_items(request.user, limit, branch)
+        serializer = self.get_serializer(recommended, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='ordered-together')
+    def ordered_together(self, request, pk=None):
+        """
+        API endpoint for retrieving the menu items of the same branch most
+        often ordered together with this one.
         """
-        fake_recommended = get_recommended_items() # Assuming this service handles its own data fetching/caching
-        serializer = self.get_serializer(fake_recommended, many=True)
+        try:
+            _, limit = ranking_params(request.query_params)
+        except ValueError:
+            return Response({'error': 'Invalid limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        availability = get_object_or_404(MenuAvailability, pk=pk)
+        items = available_menus(ordered_together(availability.menu_item_id), availability.branch_id, limit)
+        serializer = self.get_serializer(items, many=True)
         return Response(serializer.data)
 
     @method_decorator(cache_page(CACHE_TIMEOUT_CATEGORIES_SECONDS, key_prefix="available_categories"))
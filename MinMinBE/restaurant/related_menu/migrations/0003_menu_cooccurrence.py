@@ -0,0 +1,58 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_menu_rating_aggregates'),
+        ('related_menu', '0002_remove_relatedmenuitem_tag'),
+        ('tenant', '0004_tenantpricestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuPairCount',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pair_counts', to='menu.menu')),
+                ('related_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menu')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_pair_counts', to='tenant.tenant')),
+            ],
+            options={
+                'db_table': 'menu_pair_count',
+                'unique_together': {('menu_item', 'related_item')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MenuNeighbour',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('orders', models.PositiveIntegerField()),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='menu.menu')),
+                ('related_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menu')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_neighbours', to='tenant.tenant')),
+            ],
+            options={
+                'db_table': 'menu_neighbour',
+                'indexes': [models.Index(fields=['menu_item', 'rank'], name='menu_neighbour_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecommendationWatermark',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation_watermark', serialize=False, to='tenant.tenant')),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_order_id', models.UUIDField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'menu_recommendation_watermark',
+            },
+        ),
+    ]
@@ -37,3 +37,53 @@ class RelatedMenuItem(models.Model):
 
     def __str__(self):
         return f"{self.menu_item.name} - {self.related_item.name}"
+
+
+class MenuPairCount(models.Model):
+    """
+    One cell of a tenant's item co-occurrence matrix: the number of orders
+    containing both menus. Pairs are stored in both directions and the
+    diagonal (``menu_item == related_item``) counts the orders of a menu.
+    Maintained incrementally by ``restaurant.related_menu.recommendations``.
+    """
+    id = models.BigAutoField(primary_key=True)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='menu_pair_counts')
+    menu_item = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name='pair_counts')
+    related_item = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'menu_pair_count'
+        unique_together = ('menu_item', 'related_item')
+
+
+class MenuNeighbour(models.Model):
+    """The top menus most often ordered with ``menu_item``, best first."""
+    id = models.BigAutoField(primary_key=True)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='menu_neighbours')
+    menu_item = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name='neighbours')
+    related_item = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    # Cosine similarity of the two menus' order vectors
+    score = models.FloatField()
+    orders = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'menu_neighbour'
+        indexes = [
+            models.Index(fields=['menu_item', 'rank'], name='menu_neighbour_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item_id} #{self.rank}: {self.related_item_id}"
+
+
+class RecommendationWatermark(models.Model):
+    """The last order of a tenant already counted into its co-occurrence matrix."""
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, primary_key=True, related_name='recommendation_watermark')
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    last_order_id = models.UUIDField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'menu_recommendation_watermark'
@@ -0,0 +1,205 @@
+"""
+Item-to-item recommendations from order history.
+
+Each tenant has a sparse co-occurrence matrix of its menus, stored as
+``MenuPairCount`` rows: cell (a, b) counts the orders containing both
+menus and the diagonal counts the orders of each menu. A periodic job
+folds in only the orders placed since the tenant's
+``RecommendationWatermark`` and re-ranks the neighbours of the menus
+those orders touched, so its cost follows the new orders rather than the
+whole history. Neighbours are scored with the cosine similarity of the
+two menus' order vectors, ``orders(a, b) / sqrt(orders(a) * orders(b))``,
+and the best ``TOP_K`` of each menu are stored as ``MenuNeighbour`` rows.
+
+Orders are counted once, when they are at least ``SETTLE_DELAY`` old, so
+their items are in place; later edits and deletions are not subtracted
+until the tenant is rebuilt with ``update_recommendations(..., rebuild=True)``.
+
+Readers get menu ids from the stored neighbours alone, padded with the
+hand-maintained ``RelatedMenuItem`` pairs when history is thin.
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import product
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from customer.order.models import Order, OrderItem
+from restaurant.menu_availability.models import MenuAvailability
+from .models import MenuNeighbour, MenuPairCount, RecommendationWatermark, RelatedMenuItem
+
+TOP_K = 10
+BATCH_ORDERS = 5000
+SETTLE_DELAY = timedelta(minutes=5)
+# Most recent distinct menus of a customer that seed their recommendations
+CUSTOMER_SEEDS = 10
+
+
+def _new_orders(watermark, cutoff):
+    orders = Order.objects.filter(tenant_id=watermark.tenant_id, created_at__lt=cutoff).exclude(status='cancelled')
+    if watermark.last_created_at is not None:
+        orders = orders.filter(
+            Q(created_at__gt=watermark.last_created_at)
+            | Q(created_at=watermark.last_created_at, id__gt=watermark.last_order_id)
+        )
+    return list(orders.order_by('created_at', 'id').values_list('id', 'created_at')[:BATCH_ORDERS])
+
+
+def count_pairs(baskets):
+    """Co-occurrence counts ``{(a, b): orders}`` of ``baskets`` (sets of menu ids), diagonal included."""
+    counts = Counter()
+    for basket in baskets:
+        counts.update(product(basket, repeat=2))
+    return counts
+
+
+def _add_counts(tenant_id, counts):
+    menu_ids = {menu_id for menu_id, _ in counts}
+    existing = {
+        (row.menu_item_id, row.related_item_id): row
+        for row in MenuPairCount.objects.filter(menu_item_id__in=menu_ids, related_item_id__in=menu_ids)
+    }
+    changed, created = [], []
+    for (menu_id, related_id), orders in counts.items():
+        row = existing.get((menu_id, related_id))
+        if row is None:
+            created.append(MenuPairCount(
+                tenant_id=tenant_id, menu_item_id=menu_id, related_item_id=related_id, orders=orders,
+            ))
+        else:
+            row.orders += orders
+            changed.append(row)
+    MenuPairCount.objects.bulk_update(changed, ['orders'], batch_size=500)
+    MenuPairCount.objects.bulk_create(created, batch_size=500)
+
+
+def top_neighbours(menu_id, pairs, totals, k=TOP_K):
+    """Best ``k`` ``(related id, score, orders)`` of ``menu_id`` from its ``{related id: orders}`` row."""
+    own = totals.get(menu_id)
+    if not own:
+        return []
+    scored = [
+        (related_id, orders / math.sqrt(own * totals[related_id]), orders)
+        for related_id, orders in pairs.items()
+        if related_id != menu_id and totals.get(related_id)
+    ]
+    scored.sort(key=lambda row: (-row[1], -row[2], str(row[0])))
+    return scored[:k]
+
+
+def _refresh_neighbours(tenant_id, menu_ids):
+    totals = dict(
+        MenuPairCount.objects.filter(tenant_id=tenant_id, menu_item_id=F('related_item_id'))
+        .values_list('menu_item_id', 'orders')
+    )
+    rows = defaultdict(dict)
+    for menu_id, related_id, orders in MenuPairCount.objects.filter(menu_item_id__in=menu_ids).values_list(
+        'menu_item_id', 'related_item_id', 'orders'
+    ):
+        rows[menu_id][related_id] = orders
+
+    neighbours = [
+        MenuNeighbour(
+            tenant_id=tenant_id, menu_item_id=menu_id, related_item_id=related_id,
+            rank=rank, score=score, orders=orders,
+        )
+        for menu_id in menu_ids
+        for rank, (related_id, score, orders) in enumerate(top_neighbours(menu_id, rows[menu_id], totals), start=1)
+    ]
+    MenuNeighbour.objects.filter(menu_item_id__in=menu_ids).delete()
+    MenuNeighbour.objects.bulk_create(neighbours, batch_size=500)
+
+
+def update_recommendations(tenant_id, rebuild=False, now=None):
+    """
+    Fold the next batch of ``tenant_id``'s new orders into its matrix and
+    re-rank the neighbours they touched. ``rebuild`` starts over from the
+    first order. Returns the number of orders counted.
+    """
+    cutoff = (now or timezone.now()) - SETTLE_DELAY
+    with transaction.atomic():
+        # The row lock keeps concurrent runs from counting an order twice
+        watermark, _ = RecommendationWatermark.objects.select_for_update().get_or_create(tenant_id=tenant_id)
+        if rebuild:
+            MenuPairCount.objects.filter(tenant_id=tenant_id).delete()
+            MenuNeighbour.objects.filter(tenant_id=tenant_id).delete()
+            watermark.last_created_at = watermark.last_order_id = None
+
+        orders = _new_orders(watermark, cutoff)
+        if not orders:
+            if rebuild:
+                watermark.save()
+            return 0
+
+        baskets = defaultdict(set)
+        for order_id, menu_id in OrderItem.objects.filter(order_id__in=[pk for pk, _ in orders]).values_list(
+            'order_id', 'menu_item_id'
+        ):
+            baskets[order_id].add(menu_id)
+        counts = count_pairs(baskets.values())
+        if counts:
+            _add_counts(tenant_id, counts)
+            _refresh_neighbours(tenant_id, {menu_id for menu_id, _ in counts})
+
+        watermark.last_order_id, watermark.last_created_at = orders[-1]
+        watermark.save()
+    return len(orders)
+
+
+def ordered_together(menu_id, limit=TOP_K):
+    """Ids of the menus most often ordered with ``menu_id``, topped up with its related menus."""
+    menu_ids = list(
+        MenuNeighbour.objects.filter(menu_item_id=menu_id).order_by('rank')
+        .values_list('related_item_id', flat=True)[:limit]
+    )
+    if len(menu_ids) < limit:
+        menu_ids += RelatedMenuItem.objects.filter(menu_item_id=menu_id).exclude(
+            related_item_id__in=menu_ids
+        ).exclude(related_item__isnull=True).values_list('related_item_id', flat=True)[:limit - len(menu_ids)]
+    return menu_ids
+
+
+def recommend_for_customer(user, limit=TOP_K * 2):
+    """
+    Ids of menus ordered together with the customer's recent menus, best
+    first and excluding those menus, topped up with their related menus.
+    """
+    seeds = []
+    for menu_id in OrderItem.objects.filter(order__customer=user).order_by('-order__created_at').values_list(
+        'menu_item_id', flat=True
+    )[:CUSTOMER_SEEDS * 5]:
+        if menu_id not in seeds:
+            seeds.append(menu_id)
+    seeds = seeds[:CUSTOMER_SEEDS]
+    if not seeds:
+        return []
+
+    scores = defaultdict(float)
+    for related_id, score in MenuNeighbour.objects.filter(menu_item_id__in=seeds).exclude(
+        related_item_id__in=seeds
+    ).values_list('related_item_id', 'score'):
+        scores[related_id] += score
+    menu_ids = sorted(scores, key=lambda menu_id: (-scores[menu_id], str(menu_id)))[:limit]
+    if len(menu_ids) < limit:
+        for related_id in RelatedMenuItem.objects.filter(menu_item_id__in=seeds).exclude(
+            related_item_id__in=[*seeds, *menu_ids]
+        ).exclude(related_item__isnull=True).values_list('related_item_id', flat=True).distinct()[:limit - len(menu_ids)]:
+            menu_ids.append(related_id)
+    return menu_ids
+
+
+def available_menus(menu_ids, branch=None, limit=None):
+    """One available ``MenuAvailability`` per menu of ``menu_ids``, in their order, optionally at one ``branch``."""
+    queryset = MenuAvailability.objects.filter(menu_item_id__in=menu_ids, is_available=True)
+    if branch is not None:
+        queryset = queryset.filter(branch_id=branch)
+    by_menu = {}
+    for availability in queryset.select_related(
+        'menu_item__tenant', 'branch__tenant__admin'
+    ).order_by('menu_item_id', 'branch_id').distinct('menu_item_id'):
+        by_menu[availability.menu_item_id] = availability
+    items = [by_menu[menu_id] for menu_id in menu_ids if menu_id in by_menu]
+    return items[:limit] if limit is not None else items
@@ -0,0 +1,22 @@
+import logging
+
+from celery import shared_task
+
+from restaurant.tenant.models import Tenant
+from .recommendations import BATCH_ORDERS, update_recommendations
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def update_menu_recommendations(rebuild=False):
+    """Fold every tenant's new orders into its co-occurrence matrix, batch by batch."""
+    total = 0
+    for tenant_id in Tenant.objects.values_list('id', flat=True).iterator():
+        counted = update_recommendations(tenant_id, rebuild=rebuild)
+        total += counted
+        while counted == BATCH_ORDERS:
+            counted = update_recommendations(tenant_id)
+            total += counted
+    logger.info("Counted %d new order(s) into menu recommendations", total)
+    return total
@@ -1,14 +1,19 @@
+from datetime import timedelta
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework_api_key.models import APIKey
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.urls import reverse
+from django.utils import timezone
 from restaurant.tenant.models import Tenant
 from restaurant.menu.models import Menu
 from restaurant.branch.models import Branch
 from accounts.models import User
-from restaurant.related_menu.models import RelatedMenuItem
+from restaurant.related_menu.models import MenuPairCount, RelatedMenuItem
+from customer.order.models import Order, OrderItem
+from restaurant.related_menu.recommendations import SETTLE_DELAY, ordered_together, recommend_for_customer, update_recommendations
+from restaurant.table.models import Table
 
 class RelatedMenuItemViewSetTests(TestCase):
     def setUp(self):
@@ -100,3 +105,49 @@ class RelatedMenuItemViewSetTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()['results']), 1)
 
+
+
+class MenuRecommendationTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="owner@test.com", password="password", user_type="restaurant")
+        self.tenant = Tenant.objects.create(restaurant_name="Co-occurrence Tenant", admin=owner)
+        self.branch = Branch.objects.create(tenant=self.tenant, address="1 Pair St")
+        self.table = Table.objects.create(branch=self.branch)
+        self.customer = User.objects.create_user(email="customer@test.com", password="password", user_type="customer")
+        self.tibs, self.injera, self.tea = (
+            Menu.objects.create(name=name, price=10.00, tenant=self.tenant) for name in ("Tibs", "Injera", "Tea")
+        )
+
+    def order(self, *menus, customer=None):
+        order = Order.objects.create(
+            tenant=self.tenant, branch=self.branch, table=self.table, customer=customer or self.customer,
+        )
+        for menu in menus:
+            OrderItem.objects.create(order=order, menu_item=menu, quantity=1, price=menu.price)
+        return order
+
+    def update(self):
+        return update_recommendations(self.tenant.id, now=timezone.now() + SETTLE_DELAY + timedelta(seconds=1))
+
+    def test_neighbours_are_counted_incrementally(self):
+        self.order(self.tibs, self.injera)
+        self.order(self.tibs, self.injera, self.tea)
+        self.assertEqual(self.update(), 2)
+        self.assertEqual(ordered_together(self.tibs.id), [self.injera.id, self.tea.id])
+
+        self.order(self.tea)
+        # Only the new order is counted
+        self.assertEqual(self.update(), 1)
+        self.assertEqual(self.update(), 0)
+        pair = MenuPairCount.objects.get(menu_item=self.tibs, related_item=self.injera)
+        diagonal = MenuPairCount.objects.get(menu_item=self.tea, related_item=self.tea)
+        self.assertEqual((pair.orders, diagonal.orders), (2, 2))
+
+    def test_customer_recommendations_fall_back_to_related_items(self):
+        other = User.objects.create_user(email="other@test.com", password="password", user_type="customer")
+        self.order(self.tibs, self.injera, customer=other)
+        self.update()
+        RelatedMenuItem.objects.create(tenant=self.tenant, menu_item=self.tibs, related_item=self.tea)
+
+        self.order(self.tibs)
+        self.assertEqual(recommend_for_customer(self.customer), [self.injera.id, self.tea.id])
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TenantConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "restaurant.tenant"
+
+    def ready(self):
+        import restaurant.tenant.signals
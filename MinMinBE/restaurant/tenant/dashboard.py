@@ -0,0 +1,190 @@
+"""
+Dashboard query builder over the branch rollups.
+
+``DashboardQuery`` computes the totals of every requested period, plus the
+revenue of the period each one is compared against, in a single statement
+of conditional (``FILTER``) aggregates over ``BranchDailyStats``. Chart
+series come from one grouped statement over the daily rows, and one over
+the hourly rows when "today" is requested.
+"""
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from restaurant.table.models import Table
+from .models import BranchDailyStats, BranchHourlyStats
+from .rollups import day_start
+
+PERIODS = ('today', 'month', 'year')
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+ACTIVE_ORDER_STATUSES = ['pending_payment', 'placed', 'progress']
+
+
+class DashboardQuery:
+    """Dashboard figures for the rollup rows matching ``filters``."""
+
+    def __init__(self, filters, today=None):
+        self.filters = filters
+        self.today = today or timezone.localdate()
+
+    def period_range(self, period):
+        """``(start, end, previous_start, previous_end)`` of a named period; all inclusive."""
+        today = self.today
+        if period == 'today':
+            yesterday = today - timedelta(days=1)
+            return today, today, yesterday, yesterday
+        if period == 'month':
+            start = today.replace(day=1)
+            previous_end = start - timedelta(days=1)
+            return start, today, previous_end.replace(day=1), previous_end
+        if period == 'year':
+            start = today.replace(month=1, day=1)
+            previous_start = start.replace(year=start.year - 1)
+            return start, today, previous_start, previous_start.replace(month=12, day=31)
+        raise ValueError(f"Unknown dashboard period: {period}")
+
+    def _totals(self, ranges):
+        """One statement: orders, revenue and rating of every range, and previous revenue."""
+        aggregates = {}
+        lowest = None
+        for name, (start, end, previous_start, previous_end) in ranges.items():
+            current = Q(bucket__range=[start, end])
+            aggregates[f'{name}_orders'] = Sum('orders', filter=current)
+            aggregates[f'{name}_revenue'] = Sum('revenue', filter=current)
+            aggregates[f'{name}_rating_sum'] = Sum('rating_sum', filter=current)
+            aggregates[f'{name}_rating_count'] = Sum('rating_count', filter=current)
+            first = start
+            if previous_start is not None:
+                aggregates[f'{name}_previous_revenue'] = Sum(
+                    'revenue', filter=Q(bucket__range=[previous_start, previous_end])
+                )
+                first = min(start, previous_start)
+            lowest = first if lowest is None else min(lowest, first)
+
+        highest = max(end for _, end, _, _ in ranges.values())
+        row = BranchDailyStats.objects.filter(
+            self.filters, bucket__range=[lowest, highest]
+        ).aggregate(**aggregates)
+
+        totals = {}
+        for name in ranges:
+            rating_count = row[f'{name}_rating_count']
+            rating = row[f'{name}_rating_sum'] / rating_count if rating_count else 0
+            totals[name] = {
+                'revenue': row[f'{name}_revenue'] or 0,
+                'orders': row[f'{name}_orders'] or 0,
+                'rating': round(rating, 1),
+                'previous_revenue': row.get(f'{name}_previous_revenue') or 0,
+            }
+        return totals
+
+    def _daily_series(self, start, end):
+        """Revenue per day between ``start`` and ``end``, as ``[(date, revenue)]``."""
+        return list(
+            BranchDailyStats.objects.filter(self.filters, bucket__range=[start, end])
+            .values('bucket')
+            .annotate(total=Sum('revenue'))
+            .order_by('bucket')
+            .values_list('bucket', 'total')
+        )
+
+    def _hourly_chart(self):
+        start = day_start(self.today)
+        totals = {}
+        for bucket, total in (
+            BranchHourlyStats.objects.filter(
+                self.filters, bucket__gte=start, bucket__lt=start + timedelta(days=1)
+            )
+            .values('bucket')
+            .annotate(total=Sum('revenue'))
+            .values_list('bucket', 'total')
+        ):
+            hour = timezone.localtime(bucket).hour
+            totals[hour] = totals.get(hour, 0) + float(total or 0)
+        return {
+            'labels': [f"{hour}:00" for hour in range(24)],
+            'data': [totals.get(hour, 0) for hour in range(24)],
+        }
+
+    @staticmethod
+    def _grouped_chart(series, key, label):
+        groups = {}
+        for day, total in series:
+            groups[key(day)] = groups.get(key(day), 0) + float(total or 0)
+        return {
+            'labels': [label(k) for k in groups],
+            'data': list(groups.values()),
+        }
+
+    def _charts(self, periods, ranges):
+        charts = {}
+        if 'today' in periods:
+            charts['today'] = self._hourly_chart()
+        grouped = [p for p in periods if p != 'today']
+        if not grouped:
+            return charts
+
+        start = min(ranges[p][0] for p in grouped)
+        series = self._daily_series(start, self.today)
+        if 'month' in periods:
+            month_start = ranges['month'][0]
+            charts['month'] = self._grouped_chart(
+                [(day, total) for day, total in series if day >= month_start],
+                key=lambda day: day.isocalendar()[1],
+                label=lambda week: f"Week {week}",
+            )
+        if 'year' in periods:
+            charts['year'] = self._grouped_chart(
+                series,
+                key=lambda day: day.month,
+                label=lambda month: MONTH_NAMES[month - 1],
+            )
+        return charts
+
+    def active_tables(self):
+        """Tables that currently have an open order"""
+        return Table.objects.filter(
+            self.filters,
+            table_order__status__in=ACTIVE_ORDER_STATUSES
+        ).distinct().count()
+
+    def stats(self, periods=PERIODS):
+        """Dashboard payloads keyed by period name."""
+        ranges = {period: self.period_range(period) for period in periods}
+        totals = self._totals(ranges)
+        charts = self._charts(periods, ranges)
+        active_tables = self.active_tables()
+
+        result = {}
+        for period in periods:
+            period_totals = totals[period]
+            previous = period_totals.pop('previous_revenue')
+            current = period_totals['revenue']
+            change = round(((current - previous) / previous) * 100, 1) if previous else 0
+            result[period] = {
+                'period': period,
+                **period_totals,
+                'active_tables': active_tables,
+                'chart_data': charts[period],
+                'revenue_change': change,
+            }
+        return result
+
+    def custom_stats(self, start_date, end_date):
+        """Dashboard payload for an arbitrary inclusive date range."""
+        totals = self._totals({'custom': (start_date, end_date, None, None)})['custom']
+        totals.pop('previous_revenue')
+        series = self._daily_series(start_date, end_date)
+        return {
+            'period': 'custom',
+            **totals,
+            'active_tables': self.active_tables(),
+            'chart_data': {
+                'labels': [day.strftime('%b %d') for day, _ in series],
+                'data': [float(total or 0) for _, total in series],
+            },
+            'start_date': start_date,
+            'end_date': end_date,
+        }
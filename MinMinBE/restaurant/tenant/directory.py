@@ -0,0 +1,89 @@
+"""
+Customer-facing restaurant directory.
+
+The directory is a list of compact restaurant cards (name, image, rating,
+price band) built with one query and cached under the
+``tenant_directory`` tag; tenant and menu changes invalidate it. Pages are
+cut from that cached list, and only the tenants on the page get their
+nearest branch looked up, in one ``DISTINCT ON`` query measured from the
+centre of the customer's geo cell.
+"""
+from django.contrib.gis.db.models.functions import Distance
+from django.core.cache import cache
+from django.db.models import F
+
+from core.cache import get_tagged, invalidate_tags, tagged_key
+from restaurant.branch.models import Branch
+from .models import Tenant
+
+DIRECTORY_TAG = "tenant_directory"
+DIRECTORY_TTL = 60 * 10
+
+
+def build_directory():
+    """Cards of every tenant, best rated first."""
+    rows = list(
+        Tenant.objects.annotate(
+            avg_price=F('price_stats__avg_price'),
+            price_band=F('price_stats__price_band'),
+        ).order_by(F('rating_avg').desc(nulls_last=True), 'restaurant_name').values(
+            'id', 'restaurant_name', 'image', 'rating_avg', 'rating_count', 'avg_price', 'price_band',
+        )
+    )
+    for row in rows:
+        row['id'] = str(row['id'])
+        rating = row.pop('rating_avg')
+        row['average_rating'] = round(rating, 2) if rating is not None else None
+        row['avg_price'] = float(row['avg_price']) if row['avg_price'] is not None else None
+    return rows
+
+
+def directory_rows():
+    """The cached directory cards."""
+    key = tagged_key("tenant_directory", [DIRECTORY_TAG])
+    rows = get_tagged(key, [DIRECTORY_TAG])
+    if rows is None:
+        rows = build_directory()
+        cache.set(key, rows, DIRECTORY_TTL)
+    return rows
+
+
+def nearest_branches(tenant_ids, point):
+    """``{tenant id: nearest located branch}`` with ``distance`` annotated, in one query."""
+    branches = (
+        Branch.objects.filter(tenant_id__in=tenant_ids, location__isnull=False)
+        .annotate(distance=Distance('location', point))
+        .order_by('tenant_id', 'distance')
+        .distinct('tenant_id')
+    )
+    return {str(branch.tenant_id): branch for branch in branches}
+
+
+def invalidate_directory():
+    invalidate_tags(DIRECTORY_TAG)
+
+
+def to_card(row, branch, request=None):
+    """Directory card of a summary ``row`` and its nearest ``branch`` (or None)."""
+    image = None
+    if row['image']:
+        image = Tenant._meta.get_field('image').storage.url(row['image'])
+        if request is not None:
+            image = request.build_absolute_uri(image)
+    nearest = None
+    if branch is not None:
+        nearest = {
+            'id': branch.id,
+            'address': branch.address,
+            'distance_km': round(branch.distance.km, 2),
+        }
+    return {
+        'id': row['id'],
+        'restaurant_name': row['restaurant_name'],
+        'image': image,
+        'average_rating': row['average_rating'],
+        'rating_count': row['rating_count'],
+        'avg_price': row['avg_price'],
+        'price_band': row['price_band'],
+        'nearest_branch': nearest,
+    }
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from customer.order.models import Order
+from restaurant.tenant.rollups import rebuild_branch_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly and daily dashboard rollups from orders, payments and feedback."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="First day to rebuild (YYYY-MM-DD); defaults to the oldest order",
+        )
+        parser.add_argument(
+            "--branch",
+            action="append",
+            dest="branches",
+            help="Only rebuild this branch id (repeatable)",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=31,
+            help="Number of days recomputed per pass",
+        )
+
+    def handle(self, *args, **options):
+        if options["since"]:
+            try:
+                first_day = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+        else:
+            oldest = Order.objects.order_by("created_at").values_list("created_at", flat=True).first()
+            if oldest is None:
+                self.stdout.write("No orders to roll up.")
+                return
+            first_day = timezone.localdate(oldest)
+
+        today = timezone.localdate()
+        chunk = timedelta(days=max(options["chunk_days"], 1))
+        written = 0
+        while first_day <= today:
+            last_day = min(first_day + chunk - timedelta(days=1), today)
+            written += rebuild_branch_stats(first_day, last_day, options["branches"])
+            self.stdout.write(f"Rebuilt {first_day} .. {last_day}")
+            first_day = last_day + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Daily rollup rows written: {written}"))
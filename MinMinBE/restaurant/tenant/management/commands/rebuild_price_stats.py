@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.tenant.price_stats import rebuild_price_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every tenant's menu price statistics and price band."
+
+    def handle(self, *args, **options):
+        tenants = rebuild_price_stats()
+        self.stdout.write(self.style.SUCCESS(f"Price statistics rebuilt for {tenants} tenant(s)."))
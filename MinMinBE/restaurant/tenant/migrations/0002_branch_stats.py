@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branch', '0001_initial'),
+        ('tenant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchDailyStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bucket', models.DateField()),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='branch.branch')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tenant.tenant')),
+            ],
+            options={
+                'db_table': 'tenant_branch_daily_stats',
+                'indexes': [models.Index(fields=['tenant', 'bucket'], name='branch_daily_tenant_idx')],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'bucket'), name='uniq_branch_daily_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchHourlyStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bucket', models.DateTimeField()),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='branch.branch')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tenant.tenant')),
+            ],
+            options={
+                'db_table': 'tenant_branch_hourly_stats',
+                'indexes': [models.Index(fields=['tenant', 'bucket'], name='branch_hourly_tenant_idx')],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'bucket'), name='uniq_branch_hourly_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:10
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import PercentRank
+
+
+class Median(models.Aggregate):
+    function = 'percentile_cont'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = models.FloatField()
+
+
+def _money(value):
+    return None if value is None else Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def _band(percentile):
+    if percentile < 1 / 3:
+        return 'budget'
+    if percentile < 2 / 3:
+        return 'moderate'
+    return 'premium'
+
+
+def backfill_price_stats(apps, schema_editor):
+    # Historical models only; the directory cache is empty for a table that did not exist
+    Tenant = apps.get_model('tenant', 'Tenant')
+    Menu = apps.get_model('menu', 'Menu')
+    TenantPriceStats = apps.get_model('tenant', 'TenantPriceStats')
+
+    for tenant_id in Tenant.objects.values_list('id', flat=True).iterator():
+        row = Menu.objects.filter(tenant_id=tenant_id).aggregate(
+            menu_count=models.Count('id'),
+            min_price=models.Min('price'),
+            max_price=models.Max('price'),
+            avg_price=models.Avg('price'),
+            median_price=Median('price'),
+        )
+        TenantPriceStats.objects.create(
+            tenant_id=tenant_id,
+            menu_count=row['menu_count'],
+            min_price=row['min_price'],
+            max_price=row['max_price'],
+            avg_price=_money(row['avg_price']),
+            median_price=_money(row['median_price']),
+        )
+
+    ranked = TenantPriceStats.objects.filter(avg_price__isnull=False).annotate(
+        rank=models.Window(PercentRank(), order_by=models.F('avg_price').asc())
+    )
+    changed = []
+    for stats in ranked:
+        stats.price_percentile, stats.price_band = stats.rank, _band(stats.rank)
+        changed.append(stats)
+    TenantPriceStats.objects.bulk_update(changed, ['price_percentile', 'price_band'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_menu_rating_aggregates'),
+        ('tenant', '0003_tenant_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantPriceStats',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_stats', serialize=False, to='tenant.tenant')),
+                ('menu_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('avg_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('median_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('price_percentile', models.FloatField(null=True)),
+                ('price_band', models.CharField(choices=[('budget', 'Budget'), ('moderate', 'Moderate'), ('premium', 'Premium')], max_length=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tenant_price_stats',
+                'indexes': [models.Index(fields=['price_band', 'avg_price'], name='tenant_price_band_idx'), models.Index(fields=['avg_price'], name='tenant_price_avg_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_price_stats, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from core.models import RatingAggregate
 from django.core.exceptions import ValidationError
 from minminbe.settings import MEDIA_ROOT
 import uuid
@@ -21,7 +22,7 @@ def user_image_path(instance, filename):
 
     return os.path.join(user_folder, filename)
 
-class Tenant(models.Model):
+class Tenant(RatingAggregate):
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
@@ -71,12 +72,91 @@ class Tenant(models.Model):
             raise ValidationError("This tenant cannot be deleted because it has related records.")
         return super().delete(using, keep_parents)
     
-    @property
-    def average_rating(self):
-        reviews = self.restaurant_feedbacks.all()
-        if reviews.exists():
-            return round(reviews.aggregate(models.Avg('overall_rating'))['overall_rating__avg'], 2)
-        return None
 
     def __str__(self):
         return self.restaurant_name
+
+
+class BranchStats(models.Model):
+    """
+    Order activity of one branch rolled up into a time bucket. Orders,
+    revenue, items and ratings are attributed to the bucket the order was
+    created in. Rows are rebuilt from the source tables by
+    ``restaurant.tenant.rollups``, never edited by hand.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='+')
+    branch = models.ForeignKey('branch.Branch', on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class BranchHourlyStats(BranchStats):
+    bucket = models.DateTimeField()
+
+    class Meta:
+        db_table = 'tenant_branch_hourly_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'bucket'], name='uniq_branch_hourly_bucket')
+        ]
+        indexes = [models.Index(fields=['tenant', 'bucket'], name='branch_hourly_tenant_idx')]
+
+    def __str__(self):
+        return f"{self.branch_id} @ {self.bucket:%Y-%m-%d %H}:00"
+
+
+class BranchDailyStats(BranchStats):
+    bucket = models.DateField()
+
+    class Meta:
+        db_table = 'tenant_branch_daily_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'bucket'], name='uniq_branch_daily_bucket')
+        ]
+        indexes = [models.Index(fields=['tenant', 'bucket'], name='branch_daily_tenant_idx')]
+
+    def __str__(self):
+        return f"{self.branch_id} @ {self.bucket}"
+
+
+class TenantPriceStats(models.Model):
+    """
+    Menu price statistics of one tenant, refreshed on menu writes by
+    ``restaurant.tenant.price_stats``. ``price_percentile`` ranks the
+    tenant's average price among all tenants and picks its ``price_band``.
+    """
+    BAND_BUDGET = 'budget'
+    BAND_MODERATE = 'moderate'
+    BAND_PREMIUM = 'premium'
+    BAND_CHOICES = [
+        (BAND_BUDGET, 'Budget'),
+        (BAND_MODERATE, 'Moderate'),
+        (BAND_PREMIUM, 'Premium'),
+    ]
+
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, primary_key=True, related_name='price_stats')
+    menu_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    avg_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    median_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    price_percentile = models.FloatField(null=True)
+    price_band = models.CharField(max_length=10, choices=BAND_CHOICES, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tenant_price_stats'
+        indexes = [
+            models.Index(fields=['price_band', 'avg_price'], name='tenant_price_band_idx'),
+            models.Index(fields=['avg_price'], name='tenant_price_avg_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant_id}: {self.avg_price}"
@@ -0,0 +1,150 @@
+"""
+Per-tenant menu price statistics.
+
+A menu write refreshes its tenant's row in ``TenantPriceStats`` with one
+aggregate over the tenant's menus (count, min, max, average and median)
+and ranks the new average against the other tenants with one more query.
+Other tenants' percentiles drift slightly as averages change, so
+``rebalance_price_bands`` periodically re-ranks every tenant with a
+``percent_rank()`` window. The ``rebuild_price_stats`` command recomputes
+every tenant from scratch.
+
+``price_extremes`` reads the cheapest, middle and most expensive tenant
+(optionally within one band) back in a single windowed query.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Max, Min, Q, Window
+from django.db.models.functions import PercentRank, RowNumber
+
+from .directory import invalidate_directory
+from .models import Tenant, TenantPriceStats
+
+# Upper percentile bound of each band
+BAND_LIMITS = (
+    (1 / 3, TenantPriceStats.BAND_BUDGET),
+    (2 / 3, TenantPriceStats.BAND_MODERATE),
+    (1.0, TenantPriceStats.BAND_PREMIUM),
+)
+
+
+class Median(Aggregate):
+    function = 'percentile_cont'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+def band_for(percentile):
+    if percentile is None:
+        return None
+    for limit, band in BAND_LIMITS:
+        if percentile < limit:
+            return band
+    return BAND_LIMITS[-1][1]
+
+
+def _money(value):
+    return None if value is None else Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def compute_price_stats(tenant_id):
+    """Price aggregates of one tenant's menus."""
+    from restaurant.menu.models import Menu
+
+    row = Menu.objects.filter(tenant_id=tenant_id).aggregate(
+        menu_count=Count('id'),
+        min_price=Min('price'),
+        max_price=Max('price'),
+        avg_price=Avg('price'),
+        median_price=Median('price'),
+    )
+    return {
+        'menu_count': row['menu_count'],
+        'min_price': row['min_price'],
+        'max_price': row['max_price'],
+        'avg_price': _money(row['avg_price']),
+        'median_price': _money(row['median_price']),
+    }
+
+
+def refresh_price_stats(tenant_id):
+    """Recompute one tenant's price statistics and place it in a band."""
+    # Deleting a tenant deletes its menus, whose refreshes run after the tenant is gone
+    if not Tenant.objects.filter(pk=tenant_id).exists():
+        return
+    stats = compute_price_stats(tenant_id)
+    percentile = None
+    if stats['avg_price'] is not None:
+        ranks = TenantPriceStats.objects.exclude(tenant_id=tenant_id).filter(
+            avg_price__isnull=False
+        ).aggregate(
+            below=Count('pk', filter=Q(avg_price__lt=stats['avg_price'])),
+            total=Count('pk'),
+        )
+        # Same definition as percent_rank(): share of the other tenants priced below
+        percentile = ranks['below'] / ranks['total'] if ranks['total'] else 0.0
+    TenantPriceStats.objects.update_or_create(
+        tenant_id=tenant_id,
+        defaults={**stats, 'price_percentile': percentile, 'price_band': band_for(percentile)},
+    )
+    invalidate_directory()
+
+
+def schedule_price_refresh(tenant_id):
+    transaction.on_commit(lambda: refresh_price_stats(tenant_id))
+
+
+def rebalance_price_bands():
+    """Re-rank every tenant's average price and update the bands that moved. Returns the number changed."""
+    ranked = TenantPriceStats.objects.filter(avg_price__isnull=False).annotate(
+        rank=Window(PercentRank(), order_by=F('avg_price').asc())
+    )
+    changed = []
+    for stats in ranked:
+        band = band_for(stats.rank)
+        if stats.price_band != band or stats.price_percentile != stats.rank:
+            stats.price_percentile, stats.price_band = stats.rank, band
+            changed.append(stats)
+    TenantPriceStats.objects.bulk_update(changed, ['price_percentile', 'price_band'], batch_size=500)
+    if changed:
+        invalidate_directory()
+    return len(changed)
+
+
+def price_extremes(price_band=None):
+    """
+    ``{'cheapest', 'middle', 'expensive'}`` price statistics (with their
+    tenant) by average price, or None when no tenant has a priced menu.
+    """
+    queryset = TenantPriceStats.objects.filter(avg_price__isnull=False)
+    if price_band:
+        queryset = queryset.filter(price_band=price_band)
+    rows = list(
+        queryset.select_related('tenant').annotate(
+            position=Window(RowNumber(), order_by=[F('avg_price').asc(), F('tenant_id').asc()]),
+            total=Window(Count('pk')),
+        ).filter(
+            Q(position=1) | Q(position=F('total')) | Q(position=F('total') / 2 + 1)
+        ).order_by('position')
+    )
+    if not rows:
+        return None
+    total = rows[0].total
+    by_position = {stats.position: stats for stats in rows}
+    return {
+        'cheapest': by_position[1],
+        'middle': by_position[total // 2 + 1],
+        'expensive': by_position[total],
+    }
+
+
+def rebuild_price_stats():
+    """Recompute the statistics of every tenant, then rank them. Returns the number of tenants."""
+    tenants = 0
+    for tenant_id in Tenant.objects.values_list('id', flat=True).iterator():
+        TenantPriceStats.objects.update_or_create(tenant_id=tenant_id, defaults=compute_price_stats(tenant_id))
+        tenants += 1
+    rebalance_price_bands()
+    invalidate_directory()
+    return tenants
@@ -0,0 +1,164 @@
+"""
+Hourly and daily per-branch rollups behind the restaurant dashboard.
+
+Orders, revenue, item counts and service ratings are attributed to the
+bucket the order was created in. A bucket is always recomputed from the
+source tables instead of being adjusted by deltas, so refreshing it twice
+is harmless. Order, payment and feedback signals schedule a refresh of the
+day an event touches; ``compact_branch_stats`` re-derives recently changed
+days as a safety net and prunes hourly rows once the daily rows cover them.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncHour
+from django.utils import timezone
+
+from customer.feedback.models import Feedback
+from customer.order.models import MONEY, Order, OrderItem
+from customer.payment.models import Payment
+from .models import BranchDailyStats, BranchHourlyStats
+
+# Hourly rows only feed the "today" chart; older days are served from daily rows
+HOURLY_RETENTION_DAYS = 7
+
+STAT_FIELDS = ['orders', 'items', 'revenue', 'rating_sum', 'rating_count', 'updated_at']
+
+
+def day_bucket(moment):
+    """Local date of the daily bucket ``moment`` falls into."""
+    return timezone.localtime(moment).date()
+
+
+def day_start(day):
+    """Aware datetime at the start of ``day``."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _rollup_rows(orders, trunc):
+    """Aggregate ``orders`` per branch and bucket in a single grouped query."""
+    paid = (
+        Payment.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(total=Sum('amount_paid'))
+        .values('total')
+    )
+    quantity = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    rating = Feedback.objects.filter(order=OuterRef('pk')).values('service_rating')[:1]
+    return (
+        orders.order_by()
+        .annotate(
+            bucket=trunc('created_at'),
+            paid=Coalesce(Subquery(paid, output_field=MONEY), 0, output_field=MONEY),
+            quantity=Coalesce(Subquery(quantity, output_field=IntegerField()), 0),
+            order_rating=Subquery(rating, output_field=IntegerField()),
+        )
+        .values('tenant_id', 'branch_id', 'bucket')
+        .annotate(
+            order_count=Count('id'),
+            item_count=Sum('quantity'),
+            revenue_total=Sum('paid'),
+            rating_sum=Coalesce(Sum('order_rating'), 0),
+            rating_count=Count('order_rating'),
+        )
+    )
+
+
+def _replace_buckets(model, rows, scope, start, end):
+    """Upsert ``rows`` and drop buckets of ``scope`` in [start, end) that lost all their orders."""
+    stats = [
+        model(
+            tenant_id=row['tenant_id'],
+            branch_id=row['branch_id'],
+            bucket=row['bucket'],
+            orders=row['order_count'],
+            items=row['item_count'] or 0,
+            revenue=row['revenue_total'] or 0,
+            rating_sum=row['rating_sum'],
+            rating_count=row['rating_count'],
+        )
+        for row in rows
+    ]
+    live = {(s.branch_id, s.bucket) for s in stats}
+    with transaction.atomic():
+        if stats:
+            model.objects.bulk_create(
+                stats,
+                update_conflicts=True,
+                unique_fields=['branch', 'bucket'],
+                update_fields=STAT_FIELDS,
+            )
+        stale = [
+            pk for pk, branch_id, bucket in model.objects.filter(
+                scope, bucket__gte=start, bucket__lt=end
+            ).values_list('pk', 'branch_id', 'bucket')
+            if (branch_id, bucket) not in live
+        ]
+        if stale:
+            model.objects.filter(pk__in=stale).delete()
+    return len(stats)
+
+
+def rebuild_branch_stats(first_day, last_day, branch_ids=None):
+    """
+    Recompute the rollups of every day in [first_day, last_day], for all
+    branches or only ``branch_ids``. Returns the number of daily rows written.
+    """
+    scope = Q()
+    orders = Order.objects.all()
+    if branch_ids is not None:
+        scope = Q(branch_id__in=branch_ids)
+        orders = orders.filter(scope)
+
+    end_day = last_day + timedelta(days=1)
+    hourly_from = max(first_day, timezone.localdate() - timedelta(days=HOURLY_RETENTION_DAYS))
+    if hourly_from < end_day:
+        start, end = day_start(hourly_from), day_start(end_day)
+        hourly = orders.filter(created_at__gte=start, created_at__lt=end)
+        _replace_buckets(BranchHourlyStats, _rollup_rows(hourly, TruncHour), scope, start, end)
+
+    daily = orders.filter(created_at__gte=day_start(first_day), created_at__lt=day_start(end_day))
+    return _replace_buckets(BranchDailyStats, _rollup_rows(daily, TruncDate), scope, first_day, end_day)
+
+
+def refresh_branch_day(branch_id, day):
+    """Recompute the hourly and daily buckets of one branch for one day."""
+    return rebuild_branch_stats(day, day, [branch_id])
+
+
+def schedule_refresh(branch_id, moment):
+    """Refresh the buckets ``moment`` belongs to once the current transaction commits."""
+    from .tasks import refresh_branch_stats
+
+    day = day_bucket(moment).isoformat()
+    transaction.on_commit(lambda: refresh_branch_stats.delay(str(branch_id), day))
+
+
+def changed_branch_days(since):
+    """(branch_id, day) pairs whose orders, payments or feedback changed after ``since``."""
+    sources = [
+        Order.objects.filter(updated_at__gte=since).values_list('branch_id', 'created_at'),
+        Payment.objects.filter(updated_at__gte=since).values_list('order__branch_id', 'order__created_at'),
+        Feedback.objects.filter(updated_at__gte=since, order__isnull=False)
+        .values_list('order__branch_id', 'order__created_at'),
+    ]
+    return {
+        (branch_id, day_bucket(created_at))
+        for source in sources
+        for branch_id, created_at in source.distinct()
+    }
+
+
+def prune_hourly_stats(now=None):
+    """Delete hourly rows older than the retention window."""
+    cutoff = day_start(timezone.localdate(now) - timedelta(days=HOURLY_RETENTION_DAYS))
+    deleted, _ = BranchHourlyStats.objects.filter(bucket__lt=cutoff).delete()
+    return deleted
@@ -1,11 +1,10 @@
 from rest_framework import serializers
-from .models import Tenant
-from restaurant.branch.serializers import BranchSerializer
-from restaurant.menu.serializers import MenuSerializer
+from .models import Tenant, TenantPriceStats
 
 class TenantSerializer(serializers.ModelSerializer):
-    branches = BranchSerializer(many=True,read_only=True)
-    menus = MenuSerializer(many=True,read_only=True)
+    # Compact summaries of the related branches and menus
+    branches = serializers.SerializerMethodField()
+    menus = serializers.SerializerMethodField()
     image = serializers.ImageField(required=False, allow_null=True)
     average_rating = serializers.SerializerMethodField()
     class Meta:
@@ -16,13 +15,13 @@ class TenantSerializer(serializers.ModelSerializer):
     def get_average_rating(self, obj):
         return obj.average_rating if obj.average_rating else None
     
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['branches'] = self.get_branches(instance)
-        representation['menus'] = self.get_menus(instance)
-        return representation
-    
     def get_branches(self, obj):
+        return list(self._branches(obj))
+
+    def get_menus(self, obj):
+        return list(self._menus(obj))
+
+    def _branches(self, obj):
         for branch in obj.branches.all():
             distance_km = None
             if hasattr(branch, 'distance') and branch.distance is not None:
@@ -35,7 +34,7 @@ class TenantSerializer(serializers.ModelSerializer):
             yield branch_data
 
     
-    def get_menus(self, obj):
+    def _menus(self, obj):
         for menu in obj.menus.all():
             yield {
                 'id': menu.id,
@@ -50,6 +49,22 @@ class TenantSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(menu.image.url) if request else menu.image.url
         return None
 
+class TenantPriceStatsSerializer(serializers.ModelSerializer):
+    # Compact restaurant summary with its menu price statistics
+    id = serializers.UUIDField(source='tenant_id', read_only=True)
+    restaurant_name = serializers.CharField(source='tenant.restaurant_name', read_only=True)
+    image = serializers.ImageField(source='tenant.image', read_only=True)
+    avg_price = serializers.FloatField(read_only=True)
+    median_price = serializers.FloatField(read_only=True)
+    min_price = serializers.FloatField(read_only=True)
+    max_price = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = TenantPriceStats
+        fields = ['id', 'restaurant_name', 'image', 'menu_count', 'avg_price', 'median_price',
+                  'min_price', 'max_price', 'price_percentile', 'price_band']
+        read_only_fields = fields
+
 class DashboardSerializer(serializers.Serializer):
     period = serializers.CharField()
     revenue = serializers.DecimalField(max_digits=10, decimal_places=2)
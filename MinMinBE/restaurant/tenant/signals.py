@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from customer.feedback.models import Feedback
+from customer.order.models import Order, OrderItem
+from customer.payment.models import Payment
+from restaurant.menu.models import Menu
+from .directory import invalidate_directory
+from .models import Tenant
+from .price_stats import schedule_price_refresh
+from .rollups import schedule_refresh
+
+
+def _refresh_for_order(order_id):
+    order = Order.objects.filter(pk=order_id).values_list('branch_id', 'created_at').first()
+    # A missing order was deleted; its own post_delete refreshes the rollups
+    if order:
+        schedule_refresh(*order)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    # Status changes do not move any rolled-up figure
+    if created:
+        schedule_refresh(instance.branch_id, instance.created_at)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    schedule_refresh(instance.branch_id, instance.created_at)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def order_child_changed(sender, instance, **kwargs):
+    _refresh_for_order(instance.order_id)
+
+
+@receiver(post_save, sender=Feedback)
+@receiver(post_delete, sender=Feedback)
+def feedback_changed(sender, instance, **kwargs):
+    if instance.order_id:
+        _refresh_for_order(instance.order_id)
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def directory_changed(sender, instance, **kwargs):
+    # Ratings are written with plain updates and reach the directory when it expires
+    invalidate_directory()
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def menu_price_changed(sender, instance, **kwargs):
+    schedule_price_refresh(instance.tenant_id)
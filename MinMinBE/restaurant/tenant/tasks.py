@@ -0,0 +1,40 @@
+import logging
+from datetime import date, timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .price_stats import rebalance_price_bands
+from .rollups import changed_branch_days, prune_hourly_stats, refresh_branch_day
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_branch_stats(branch_id, day):
+    """Recompute the dashboard rollups of one branch for one day (ISO date)."""
+    refresh_branch_day(branch_id, date.fromisoformat(day))
+
+
+@shared_task
+def compact_branch_stats(lookback_minutes=20):
+    """
+    Re-derive the rollups of every branch day that changed recently, in case
+    an on-commit refresh was lost or rows were written without signals, then
+    prune hourly rows that only the daily rollups still need.
+    """
+    since = timezone.now() - timedelta(minutes=lookback_minutes)
+    touched = changed_branch_days(since)
+    for branch_id, day in touched:
+        refresh_branch_day(branch_id, day)
+    pruned = prune_hourly_stats()
+    logger.info("Compacted %d branch day(s), pruned %d hourly row(s)", len(touched), pruned)
+    return len(touched)
+
+
+@shared_task
+def rebalance_tenant_price_bands():
+    """Re-rank every tenant's average menu price; menu writes only rank the tenant they touch."""
+    changed = rebalance_price_bands()
+    logger.info("Rebalanced the price band of %d tenant(s)", changed)
+    return changed
@@ -1,14 +1,17 @@
 from django_filters import rest_framework as filters
-from .models import Tenant
+from .models import Tenant, TenantPriceStats
 
 class TenantFilter(filters.FilterSet):
     restaurant_name = filters.CharFilter(lookup_expr='icontains')  # Case-insensitive substring search for restaurant name
     admin = filters.UUIDFilter(field_name='admin')  # Exact match for admin user
     start_date = filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')  # Created after
     end_date = filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')  # Created before
+    price_band = filters.ChoiceFilter(field_name='price_stats__price_band', choices=TenantPriceStats.BAND_CHOICES)  # Budget, moderate or premium
+    min_avg_price = filters.NumberFilter(field_name='price_stats__avg_price', lookup_expr='gte')  # Average menu price at least
+    max_avg_price = filters.NumberFilter(field_name='price_stats__avg_price', lookup_expr='lte')  # Average menu price at most
 
     class Meta:
         model = Tenant
         fields = [
-            'restaurant_name', 'admin', 'start_date', 'end_date'
+            'restaurant_name', 'admin', 'start_date', 'end_date', 'price_band', 'min_avg_price', 'max_avg_price'
         ]
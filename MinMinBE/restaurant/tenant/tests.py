@@ -1,11 +1,24 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 from rest_framework_api_key.models import APIKey
+from django.db.models import Q
 from django.urls import reverse
+from django.utils import timezone
 from accounts.models import User
-from restaurant.tenant.models import Tenant
+from restaurant.menu.models import Menu
+from restaurant.tenant.models import BranchDailyStats, BranchHourlyStats, Tenant, TenantPriceStats
+from restaurant.tenant.price_stats import rebalance_price_bands
+from customer.order.models import Order
+from customer.payment.models import Payment
+from restaurant.branch.models import Branch
+from restaurant.table.models import Table
+from restaurant.tenant.rollups import rebuild_branch_stats
+from restaurant.tenant.dashboard import DashboardQuery
 
 class TenantViewSetTests(TestCase):
     def setUp(self):
@@ -81,3 +94,98 @@ class TenantViewSetTests(TestCase):
         response = self.client.get(reverse('tenant-list'))
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+
+
+    def test_customer_directory_returns_compact_cards(self):
+        customer = User.objects.create_user(
+            email="customer@test.com", password="password", user_type="customer")
+        self.authenticate(customer)
+        response = self.client.get(reverse('tenant-directory'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        card = response.json()['results'][0]
+        self.assertEqual(card['restaurant_name'], "Test Restaurant")
+        self.assertNotIn('CHAPA_API_KEY', card)
+        self.assertNotIn('menus', card)
+
+    def test_price_stats_follow_menu_writes(self):
+        cheap = Tenant.objects.create(restaurant_name="Cheap Eats", profile="Cheap", admin=self.admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            for tenant, prices in ((self.tenant, (100, 200, 600)), (cheap, (50,))):
+                for price in prices:
+                    Menu.objects.create(name=f"Dish {price}", image="menu.jpg", tenant=tenant,
+                                        description="Dish", price=Decimal(price))
+        rebalance_price_bands()
+        stats = TenantPriceStats.objects.get(tenant=self.tenant)
+        self.assertEqual((stats.menu_count, stats.min_price, stats.max_price), (3, Decimal('100'), Decimal('600')))
+        self.assertEqual(stats.median_price, Decimal('200.00'))
+        self.assertEqual(stats.price_band, TenantPriceStats.BAND_PREMIUM)
+
+        self.authenticate(self.admin_user)
+        response = self.client.get(reverse('tenant-get-price-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['cheapest']['restaurant_name'], "Cheap Eats")
+        self.assertEqual(response.json()['expensive']['avg_price'], 300.0)
+        response = self.client.get(reverse('tenant-list'), {'price_band': TenantPriceStats.BAND_BUDGET})
+        self.assertEqual([row['restaurant_name'] for row in response.json()['results']], ["Cheap Eats"])
+
+    def test_delete_tenant_with_menus(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.create(name="Dish", image="menu.jpg", tenant=self.tenant, description="Dish", price=Decimal(80))
+        self.authenticate(self.admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('tenant-detail', args=[self.tenant.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(TenantPriceStats.objects.filter(tenant_id=self.tenant.id).exists())
+
+class BranchStatsRollupTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email="customer@test.com", password="password", user_type="customer"
+        )
+        self.tenant_user = User.objects.create_user(
+            email="tenant@test.com", password="password", user_type="restaurant")
+        self.tenant = Tenant.objects.create(
+            restaurant_name="Test Restaurant",
+            profile="A test profile description.",
+            admin=self.tenant_user
+        )
+        self.branch = Branch.objects.create(tenant=self.tenant, address="123 Main St")
+        self.table = Table.objects.create(branch=self.branch)
+
+    def test_rebuild_rolls_up_orders_and_payments(self):
+        order = Order.objects.create(
+            tenant=self.tenant, branch=self.branch, table=self.table, customer=self.customer
+        )
+        Payment.objects.create(order=order, transaction_id="tx-1", amount_paid=25)
+        today = timezone.localdate()
+
+        rebuild_branch_stats(today, today)
+        daily = BranchDailyStats.objects.get(branch=self.branch, bucket=today)
+        self.assertEqual(daily.orders, 1)
+        self.assertEqual(daily.revenue, 25)
+        self.assertEqual(BranchHourlyStats.objects.filter(branch=self.branch).count(), 1)
+
+        # Buckets whose orders disappeared are dropped on the next rebuild
+        order.payments.all().delete()
+        order.delete()
+        rebuild_branch_stats(today, today)
+        self.assertFalse(BranchDailyStats.objects.filter(branch=self.branch).exists())
+
+
+class DashboardQueryPeriodTests(SimpleTestCase):
+    def test_period_ranges(self):
+        query = DashboardQuery(Q(), today=date(2024, 3, 15))
+        self.assertEqual(
+            query.period_range('today'),
+            (date(2024, 3, 15), date(2024, 3, 15), date(2024, 3, 14), date(2024, 3, 14)),
+        )
+        self.assertEqual(
+            query.period_range('month'),
+            (date(2024, 3, 1), date(2024, 3, 15), date(2024, 2, 1), date(2024, 2, 29)),
+        )
+        self.assertEqual(
+            query.period_range('year'),
+            (date(2024, 1, 1), date(2024, 3, 15), date(2023, 1, 1), date(2023, 12, 31)),
+        )
+        with self.assertRaises(ValueError):
+            query.period_range('week')
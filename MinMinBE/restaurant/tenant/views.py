@@ -12,28 +12,40 @@ from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.gis.db.models.functions import Distance
-from .models import Tenant
+from .models import BranchDailyStats, Tenant, TenantPriceStats
+from .dashboard import PERIODS, DashboardQuery
+from .directory import directory_rows, nearest_branches, to_card
+from .price_stats import price_extremes
 from restaurant.menu.models import Menu
 from customer.order.models import Order
-from customer.payment.models import Payment
 from django_filters.rest_framework import DjangoFilterBackend
-from django.contrib.gis.geos import Point
-from .serializers import TenantSerializer
+from .serializers import TenantPriceStatsSerializer, TenantSerializer
 from .tenantFilter import TenantFilter
 from restaurant.table.models import Table
 from restaurant.branch.models import Branch
 from customer.feedback.models import Feedback
 from restaurant.menu.models import Menu
-from core.redis_client import redis_client
-from datetime import timedelta
-from django.db.models.functions import ExtractHour, ExtractWeek, ExtractMonth
+from core.location import user_location
 from .serializers import DashboardSerializer
-from django.db.models.functions import TruncDate
 from rest_framework.viewsets import ModelViewSet
 from accounts.utils import get_user_branch, get_user_tenant
 from django.shortcuts import get_object_or_404
 import json
 
+def get_tenant_or_error(user):
+    """Resolve tenant context for the current user or return an error message."""
+    tenant = get_user_tenant(user)
+    if tenant:
+        return tenant, None
+
+    if user.user_type == 'branch':
+        return None, "Your account is not assigned to a branch. Please contact your administrator."
+
+    if user.user_type == 'restaurant':
+        return None, "Your account is not linked to a restaurant profile. Please contact your administrator."
+
+    return None, None
+
 class TenantPagination(PageNumberPagination):
     page_size = 10
 
@@ -49,31 +61,31 @@ class TenantView(ModelViewSet):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['list', 'retrieve']:  # Actions that use get_queryset
+        if self.action in ['list', 'retrieve', 'directory', 'get_price_stats']:  # Actions that use get_queryset
             # Remove IsAdminOrRestaurant for these actions
             return [permission() for permission in [IsAuthenticated, HasCustomAPIKey]]
         else:
             # Use default permissions for other actions
             return [permission() for permission in self.permission_classes]
 
+    def _customer_queryset(self):
+        """Tenants with their menus and branches, branches measured from the customer's cell."""
+        branches_qs = Branch.objects.all()
+        location = user_location(self.request.user)
+        if location:
+            # Measured from the centre of the customer's geo cell so results are shareable per cell
+            branches_qs = branches_qs.annotate(distance=Distance('location', location.cell_point))
+        return Tenant.objects.prefetch_related(
+            Prefetch('branches', queryset=branches_qs),
+            'menus'
+        ).order_by('restaurant_name', 'id')
+
     def get_queryset(self):
         # Get the currently authenticated user
         user = self.request.user
-        user_location = redis_client.get(str(user.id))
         if self.action in ['list'] and user.user_type == 'customer':
-            branches_qs = Branch.objects.all()
-            if user_location:
-                latitude_str, longitude_str = user_location.split(',')
-                latitude = float(latitude_str)
-                longitude = float(longitude_str)
-                user_location = Point(longitude, latitude, srid=4326)
-                branches_qs = branches_qs.annotate(distance=Distance('location', user_location))
-
-            queryset = Tenant.objects.prefetch_related(
-                Prefetch('branches', queryset=branches_qs),
-                'menus'
-            )
-            return list(queryset)
+            # Lazy, so pagination only loads the requested page
+            return self._customer_queryset()
         else:
             tenant = get_user_tenant(user)
 
@@ -94,16 +106,35 @@ class TenantView(ModelViewSet):
         user = self.request.user
         tenant_id = self.kwargs.get('pk')
         
-        # Manually fetch the single Tenant object
+        # Manually fetch the single Tenant object; customers load only this tenant's branches and menus
         if user.user_type == 'customer':
-            queryset = self.get_queryset()
-            tenant = get_object_or_404(queryset, id=tenant_id)
+            tenant = get_object_or_404(self._customer_queryset(), id=tenant_id)
         else:
             # Assuming other user types have a simpler queryset without Prefetch
             tenant = get_object_or_404(Tenant, id=tenant_id)
         
         serializer = self.get_serializer(tenant)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='directory')
+    def directory(self, request):
+        """
+        Paginated restaurant cards (name, image, rating, price band and
+        nearest branch) read from the cached directory.
+        """
+        rows = directory_rows()
+        name = request.query_params.get('restaurant_name')
+        if name:
+            rows = [row for row in rows if name.lower() in row['restaurant_name'].lower()]
+        price_band = request.query_params.get('price_band')
+        if price_band:
+            rows = [row for row in rows if row['price_band'] == price_band]
+
+        page = self.paginate_queryset(rows)
+        location = user_location(request.user)
+        nearest = nearest_branches([row['id'] for row in page], location.cell_point) if location and page else {}
+        cards = [to_card(row, nearest.get(row['id']), request) for row in page]
+        return self.get_paginated_response(cards)
     
     def perform_create(self, serializer):
         return serializer.save(admin=self.request.user)
@@ -111,7 +142,7 @@ class TenantView(ModelViewSet):
     @action(detail=False, methods=['get'], url_path='dashboard')
     def get_dashboard(self, request):
         user = request.user
-        tenant, context_error = self._get_tenant_or_error(user)
+        tenant, context_error = get_tenant_or_error(user)
         if context_error:
             return Response({"error": context_error}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -130,14 +161,17 @@ class TenantView(ModelViewSet):
             table_filter &= Q(branch=user.branch)
             feedback_filter &= Q(order__branch=user.branch)
 
-        # Order statistics
+        # Order and revenue statistics from the daily rollups
+        today = timezone.localdate()
         orders = Order.objects.filter(order_filter)
-        total_orders = orders.count()
-        
-        # Revenue calculations (assuming Payment model exists with amount_paid field)
-        total_revenue = Payment.objects.filter(order__in=orders).aggregate(
-            total=Sum('amount_paid')
-        )['total'] or 0
+        rollup = BranchDailyStats.objects.filter(order_filter).aggregate(
+            orders=Sum('orders'),
+            revenue=Sum('revenue'),
+            today_revenue=Sum('revenue', filter=Q(bucket=today)),
+        )
+        total_orders = rollup['orders'] or 0
+        total_revenue = rollup['revenue'] or 0
+        today_revenue = rollup['today_revenue'] or 0
         
         # Active tables (tables with active orders)
         active_tables = Table.objects.filter(table_filter).filter(
@@ -149,13 +183,6 @@ class TenantView(ModelViewSet):
             avg_rating=Avg('service_rating'),
             total_reviews=Count('id')
         )
-        
-        # Today's metrics
-        today = timezone.now().date()
-        today_orders = orders.filter(created_at__date=today)
-        today_revenue = Payment.objects.filter(
-            order__in=today_orders
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
 
         # Order status breakdown
         status_counts = list(
@@ -195,37 +222,21 @@ class TenantView(ModelViewSet):
     @action(detail=False, methods=['get'], url_path='price-stats')
     def get_price_stats(self, request):
         """
-        Custom action to find the cheapest, expensive, and middle restaurants based on average menu prices.
+        Cheapest, middle and most expensive restaurants by average menu price,
+        optionally within one ``price_band``, read from the precomputed price statistics.
         """
-        # Annotate each tenant with their average menu price and exclude those without menus
-        tenants = self.get_queryset().annotate(
-            avg_price=Avg('menus__price')
-        ).exclude(avg_price__isnull=True).order_by('avg_price')
+        price_band = request.query_params.get('price_band')
+        if price_band and price_band not in dict(TenantPriceStats.BAND_CHOICES):
+            return Response({"error": "Invalid price_band."}, status=Status.HTTP_400_BAD_REQUEST)
 
-        count = tenants.count()
-        if count == 0:
+        extremes = price_extremes(price_band)
+        if extremes is None:
             return Response({"message": "No restaurants with menus found."}, status=Status.HTTP_404_NOT_FOUND)
 
-        # Determine cheapest, expensive, and middle restaurants
-        cheapest = tenants.first()
-        expensive = tenants.last()
-        middle_index = count // 2
-        middle = tenants[middle_index] if count > 0 else None
-
-        # Helper function to serialize tenant data and include avg_price
-        def serialize_tenant(tenant):
-            if not tenant:
-                return None
-            data = self.get_serializer(tenant).data
-            data['avg_price'] = float(tenant.avg_price)  # Convert Decimal to float for JSON compatibility
-            return data
-
         response_data = {
-            "cheapest": serialize_tenant(cheapest),
-            "expensive": serialize_tenant(expensive),
-            "middle": serialize_tenant(middle),
+            key: TenantPriceStatsSerializer(stats, context={'request': request}).data
+            for key, stats in extremes.items()
         }
-
         return Response(response_data, status=Status.HTTP_200_OK)
 
     def perform_update(self, serializer):
@@ -251,17 +262,7 @@ class DashboardViewSet(viewsets.ViewSet):
 
     def _get_tenant_or_error(self, user):
         """Resolve tenant context for the current user or return an error message."""
-        tenant = get_user_tenant(user)
-        if tenant:
-            return tenant, None
-
-        if user.user_type == 'branch':
-            return None, "Your account is not assigned to a branch. Please contact your administrator."
-
-        if user.user_type == 'restaurant':
-            return None, "Your account is not linked to a restaurant profile. Please contact your administrator."
-
-        return None, None
+        return get_tenant_or_error(user)
 
     def _get_base_filters(self, user, tenant=None, branch_id=None):
         """
@@ -297,7 +298,8 @@ class DashboardViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='stats')
     def get_dashboard_stats(self, request):
         """
-        Get dashboard statistics based on time period and branch filter
+        Get dashboard statistics based on time period and branch filter.
+        ``period`` is one of today, month, year, all or custom.
         """
         # Get parameters from request
         period = request.query_params.get('period', 'today')
@@ -314,329 +316,32 @@ class DashboardViewSet(viewsets.ViewSet):
             error_detail = exc.messages[0] if hasattr(exc, 'messages') else str(exc)
             return Response({"error": error_detail}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            # Get data based on period
-            if period == 'today':
-                data = self._get_today_stats(filters)
-            elif period == 'month':
-                data = self._get_month_stats(filters)
-            elif period == 'year':
-                data = self._get_year_stats(filters)
-            else:
-                # Custom date range
-                start_date = request.query_params.get('start_date')
-                end_date = request.query_params.get('end_date')
-                if not start_date or not end_date:
-                    return Response(
-                        {"error": "Both start_date and end_date are required for custom range"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                data = self._get_custom_range_stats(filters, start_date, end_date)
-        except ValidationError as exc:
-            error_detail = exc.messages[0] if hasattr(exc, 'messages') else str(exc)
-            return Response({"error": error_detail}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Calculate revenue change percentage
-        if period != 'custom':
-            data['revenue_change'] = self._calculate_revenue_change(filters, period)
-        
-        serializer = DashboardSerializer(data)
-        return Response(serializer.data)
-
-    def _get_today_stats(self, filters):
-        """Get statistics for today"""
-        today = timezone.now().date()
-        today_start = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.min.time()))
-
-        # Orders
-        orders = Order.objects.filter(filters & Q(created_at__gte=today_start))
-        total_orders = orders.count()
-        
-        # Revenue
-        revenue = Payment.objects.filter(
-            order__in=orders
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-
-        # Active tables
-        active_tables = Table.objects.filter(
-            filters,
-            table_order__status__in=['pending_payment', 'placed', 'progress']
-        ).distinct().count()
-        
-        # Rating
-        rating = Feedback.objects.filter(
-            order__in=orders
-        ).aggregate(avg_rating=Avg('service_rating'))['avg_rating'] or 0
-        
-        # Hourly revenue for chart
-        hourly_data = self._get_hourly_revenue(filters, today_start)
-        
-        return {
-            'period': 'today',
-            'revenue': revenue,
-            'orders': total_orders,
-            'active_tables': active_tables,
-            'rating': round(rating, 1),
-            'chart_data': hourly_data,
-        }
-
-    def _get_month_stats(self, filters):
-        """Get statistics for current month"""
-        today = timezone.now().date()
-        month_start = today.replace(day=1)
-
-        # Orders
-        orders = Order.objects.filter(filters & Q(created_at__date__gte=month_start))
-        total_orders = orders.count()
-        
-        # Revenue
-        revenue = Payment.objects.filter(
-            order__in=orders
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-
-        # Active tables
-        active_tables = Table.objects.filter(
-            filters,
-            table_order__status__in=['pending_payment', 'placed', 'progress']
-        ).distinct().count()
-        
-        # Rating
-        rating = Feedback.objects.filter(
-            order__in=orders
-        ).aggregate(avg_rating=Avg('service_rating'))['avg_rating'] or 0
-        
-        # Weekly revenue for chart
-        weekly_data = self._get_weekly_revenue(filters, month_start)
-        
-        return {
-            'period': 'month',
-            'revenue': revenue,
-            'orders': total_orders,
-            'active_tables': active_tables,
-            'rating': round(rating, 1),
-            'chart_data': weekly_data,
-        }
+        query = DashboardQuery(filters)
+        if period == 'all':
+            # Every standard period in one response, sharing the same statements
+            stats = query.stats()
+            return Response({name: DashboardSerializer(data).data for name, data in stats.items()})
 
-    def _get_year_stats(self, filters):
-        """Get statistics for current year"""
-        today = timezone.now().date()
-        year_start = today.replace(month=1, day=1)
-
-        # Orders
-        orders = Order.objects.filter(filters & Q(created_at__date__gte=year_start))
-        total_orders = orders.count()
-        
-        # Revenue
-        revenue = Payment.objects.filter(
-            order__in=orders
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-
-        # Active tables
-        active_tables = Table.objects.filter(
-            filters,
-            table_order__status__in=['pending_payment', 'placed', 'progress']
-        ).distinct().count()
-        
-        # Rating
-        rating = Feedback.objects.filter(
-            order__in=orders
-        ).aggregate(avg_rating=Avg('service_rating'))['avg_rating'] or 0
-        
-        # Monthly revenue for chart
-        monthly_data = self._get_monthly_revenue(filters, year_start)
-        
-        return {
-            'period': 'year',
-            'revenue': revenue,
-            'orders': total_orders,
-            'active_tables': active_tables,
-            'rating': round(rating, 1),
-            'chart_data': monthly_data,
-        }
-
-    def _get_custom_range_stats(self, filters, start_date, end_date):
-        """Get statistics for custom date range"""
-        try:
-            start_date = timezone.datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = timezone.datetime.strptime(end_date, '%Y-%m-%d').date()
-        except ValueError:
-            raise ValidationError("Invalid date format. Use YYYY-MM-DD")
-            
-        # Orders
-        orders = Order.objects.filter(
-            filters & Q(created_at__date__range=[start_date, end_date])
-        )
-        total_orders = orders.count()
-        
-        # Revenue
-        revenue = Payment.objects.filter(
-            order__in=orders
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-
-        # Active tables
-        active_tables = Table.objects.filter(
-            filters,
-            table_order__status__in=['pending_payment', 'placed', 'progress']
-        ).distinct().count()
-        
-        # Rating
-        rating = Feedback.objects.filter(
-            order__in=orders
-        ).aggregate(avg_rating=Avg('service_rating'))['avg_rating'] or 0
-        
-        # Daily revenue for chart
-        daily_data = self._get_daily_revenue(filters, start_date, end_date)
-        
-        return {
-            'period': 'custom',
-            'revenue': revenue,
-            'orders': total_orders,
-            'active_tables': active_tables,
-            'rating': round(rating, 1),
-            'chart_data': daily_data,
-            'start_date': start_date,
-            'end_date': end_date
-        }
-
-    def _calculate_revenue_change(self, filters, period):
-        """Calculate revenue change percentage compared to previous period"""
-        today = timezone.now().date()
-        
-        if period == 'today':
-            # Compare with yesterday
-            current_start = today
-            previous_start = today - timedelta(days=1)
-            current_revenue = self._get_revenue_for_date(filters, current_start)
-            previous_revenue = self._get_revenue_for_date(filters, previous_start)
-        elif period == 'month':
-            # Compare with previous month
-            current_start = today.replace(day=1)
-            previous_start = (current_start - timedelta(days=1)).replace(day=1)
-            current_revenue = self._get_revenue_for_date_range(filters, current_start, today)
-            previous_revenue = self._get_revenue_for_date_range(filters, previous_start, current_start - timedelta(days=1))
-        elif period == 'year':
-            # Compare with previous year
-            current_start = today.replace(month=1, day=1)
-            previous_start = current_start.replace(year=current_start.year-1)
-            current_revenue = self._get_revenue_for_date_range(filters, current_start, today)
-            previous_revenue = self._get_revenue_for_date_range(filters, previous_start, previous_start.replace(month=12, day=31))
-        
-        if previous_revenue == 0:
-            return 0
-        return round(((current_revenue - previous_revenue) / previous_revenue) * 100, 1)
-
-    def _get_revenue_for_date(self, filters, date):
-        """Get revenue for a specific date"""
-        return Payment.objects.filter(
-            order__in=Order.objects.filter(
-                filters & Q(created_at__date=date)
-            )
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-
-    def _get_revenue_for_date_range(self, filters, start_date, end_date):
-        """Get revenue for a date range"""
-        return Payment.objects.filter(
-            order__in=Order.objects.filter(
-                filters & Q(created_at__date__range=[start_date, end_date])
-            )
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-
-    def _get_hourly_revenue(self, filters, start_time):
-        """Get hourly revenue data for chart"""
-        end_time = start_time + timedelta(days=1)
-        
-        hourly_data = Payment.objects.filter(
-            order__in=Order.objects.filter(
-                filters & Q(created_at__range=[start_time, end_time])
-            )
-        ).annotate(
-            hour=ExtractHour('created_at')
-        ).values('hour').annotate(
-            total=Sum('amount_paid')
-        ).order_by('hour')
-        
-        # Fill in missing hours with 0
-        full_data = []
-        for hour in range(24):
-            hour_data = next((h for h in hourly_data if h['hour'] == hour), {'total': 0})
-            full_data.append({
-                'hour': hour,
-                'total': float(hour_data['total'] or 0)
-            })
-        
-        # Format for chart
-        labels = [f"{h['hour']}:00" for h in full_data]
-        data = [h['total'] for h in full_data]
-        
-        return {
-            'labels': labels,
-            'data': data
-        }
-
-    def _get_weekly_revenue(self, filters, start_date):
-        """Get weekly revenue data for chart"""
-        weekly_data = Payment.objects.filter(
-            order__in=Order.objects.filter(
-                filters & Q(created_at__date__gte=start_date)
-            )
-        ).annotate(
-            week=ExtractWeek('created_at')
-        ).values('week').annotate(
-            total=Sum('amount_paid')
-        ).order_by('week')
-        
-        # Format for chart
-        labels = [f"Week {w['week']}" for w in weekly_data]
-        data = [float(w['total'] or 0) for w in weekly_data]
-        
-        return {
-            'labels': labels,
-            'data': data
-        }
-
-    def _get_monthly_revenue(self, filters, start_date):
-        """Get monthly revenue data for chart"""
-        monthly_data = Payment.objects.filter(
-            order__in=Order.objects.filter(
-                filters & Q(created_at__date__gte=start_date)
-            )
-        ).annotate(
-            month=ExtractMonth('created_at')
-        ).values('month').annotate(
-            total=Sum('amount_paid')
-        ).order_by('month')
-        
-        # Format for chart
-        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        labels = [month_names[m['month']-1] for m in monthly_data]
-        data = [float(m['total'] or 0) for m in monthly_data]
-        
-        return {
-            'labels': labels,
-            'data': data
-        }
+        if period in PERIODS:
+            data = query.stats([period])[period]
+        else:
+            # Custom date range
+            start_date = request.query_params.get('start_date')
+            end_date = request.query_params.get('end_date')
+            if not start_date or not end_date:
+                return Response(
+                    {"error": "Both start_date and end_date are required for custom range"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                start_date = timezone.datetime.strptime(start_date, '%Y-%m-%d').date()
+                end_date = timezone.datetime.strptime(end_date, '%Y-%m-%d').date()
+            except ValueError:
+                return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+            data = query.custom_stats(start_date, end_date)
 
-    def _get_daily_revenue(self, filters, start_date, end_date):
-        """Get daily revenue data for chart"""
-        daily_data = Payment.objects.filter(
-            order__in=Order.objects.filter(
-                filters & Q(created_at__date__range=[start_date, end_date])
-            )
-        ).annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            total=Sum('amount_paid')
-        ).order_by('date')
-        
-        # Format for chart
-        labels = [d['date'].strftime('%b %d') for d in daily_data]
-        data = [float(d['total'] or 0) for d in daily_data]
-        
-        return {
-            'labels': labels,
-            'data': data
-        }
+        serializer = DashboardSerializer(data)
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='top-items')
     def get_top_menu_items(self, request):